@@ -0,0 +1,185 @@
+"""
+Сравнение пропускной способности WSGI и ASGI при медленных клиентах.
+
+Скрипт по очереди запускает сервер WSGI и сервер ASGI, нагружает их
+заданным числом одновременных соединений, каждое из которых читает ответ
+маленькими порциями с паузами, и печатает сводку в формате JSON.
+
+Пример запуска из корня репозитория::
+
+    python benchmarks/asgi_vs_wsgi.py --concurrency 500 --path /posts/1/
+
+Команды серверов можно заменить параметрами --wsgi-cmd и --asgi-cmd;
+по умолчанию используются gunicorn и uvicorn с одинаковым числом
+процессов.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shlex
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent / 'blogicum'
+DEFAULT_WSGI_CMD = (
+    'gunicorn blogicum.wsgi:application --bind {host}:{port} '
+    '--workers {workers} --threads 8'
+)
+DEFAULT_ASGI_CMD = (
+    'uvicorn blogicum.asgi:application --host {host} --port {port} '
+    '--workers {workers} --no-access-log'
+)
+# Маленький буфер приёма, чтобы медленное чтение действительно
+# удерживало отправляющую сторону.
+CLIENT_RCVBUF = 4096
+
+
+def percentile(values, fraction):
+    """Возвращает перцентиль отсортированного списка."""
+    if not values:
+        return None
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+async def fetch(host, port, path, chunk_size, read_delay):
+    """Выполняет запрос и медленно читает ответ; возвращает статус."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, CLIENT_RCVBUF)
+    sock.setblocking(False)
+    await asyncio.get_running_loop().sock_connect(sock, (host, port))
+    reader, writer = await asyncio.open_connection(sock=sock)
+    try:
+        writer.write(
+            f'GET {path} HTTP/1.1\r\nHost: {host}\r\n'
+            'Connection: close\r\n\r\n'.encode('ascii')
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        while await reader.read(chunk_size):
+            await asyncio.sleep(read_delay)
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def run_load(args, paths):
+    """Нагружает сервер в течение args.duration секунд."""
+    latencies, errors = [], 0
+    deadline = time.monotonic() + args.duration
+
+    async def worker(number):
+        nonlocal errors
+        path_index = number
+        while time.monotonic() < deadline:
+            path = paths[path_index % len(paths)]
+            path_index += 1
+            started = time.perf_counter()
+            try:
+                status = await fetch(
+                    args.host, args.port, path,
+                    args.chunk_size, args.read_delay
+                )
+            except (OSError, ValueError, IndexError, asyncio.TimeoutError):
+                errors += 1
+                continue
+            if status >= 400:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'latency_ms': {
+            name: round(value * 1000, 2) if value is not None else None
+            for name, value in (
+                ('p50', percentile(latencies, 0.5)),
+                ('p90', percentile(latencies, 0.9)),
+                ('p99', percentile(latencies, 0.99)),
+                ('mean', statistics.fmean(latencies) if latencies else None),
+            )
+        },
+    }
+
+
+def wait_for_port(host, port, timeout=30):
+    """Ждёт, пока сервер начнёт принимать соединения."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Сервер не запустился на {host}:{port}')
+
+
+def benchmark_server(name, command, args):
+    """Запускает сервер, нагружает его и останавливает."""
+    command = command.format(
+        host=args.host, port=args.port, workers=args.workers
+    )
+    print(f'[{name}] {command}', file=sys.stderr)
+    server = subprocess.Popen(
+        shlex.split(command),
+        cwd=PROJECT_DIR,
+        env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'blogicum.settings'},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(args.host, args.port)
+        result = asyncio.run(run_load(args, args.path or ['/']))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {'command': command, **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--wsgi-cmd', default=DEFAULT_WSGI_CMD)
+    parser.add_argument('--asgi-cmd', default=DEFAULT_ASGI_CMD)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--path', action='append',
+                        help='Адрес страницы; можно указать несколько раз.')
+    parser.add_argument('--concurrency', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--chunk-size', type=int, default=1024)
+    parser.add_argument('--read-delay', type=float, default=0.05,
+                        help='Пауза медленного клиента между порциями, с.')
+    parser.add_argument('--output', help='Файл для результатов в JSON.')
+    args = parser.parse_args()
+
+    results = {
+        'params': {
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'chunk_size': args.chunk_size,
+            'read_delay': args.read_delay,
+            'paths': args.path or ['/'],
+        },
+        'wsgi': benchmark_server('wsgi', args.wsgi_cmd, args),
+        'asgi': benchmark_server('asgi', args.asgi_cmd, args),
+    }
+    report = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(report, encoding='utf-8')
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
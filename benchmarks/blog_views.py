@@ -0,0 +1,436 @@
+"""
+Замеры страниц блога на синтетических наборах данных разного размера.
+
+Для каждого масштаба (по умолчанию 10k, 100k и 1M постов) скрипт один раз
+создаёт базу в benchmarks/data/ командами migrate и generate_dataset, а
+затем измеряет задержки и пропускную способность страниц: главной (первой
+и последней), категории, профиля, поста с наибольшим числом комментариев
+и отправки комментария. Каждая страница замеряется в процессе через
+django.test.Client и через настоящий WSGI-сервер. Результаты печатаются
+в формате JSON; с параметром --baseline они сравниваются с сохранённым
+прогоном, и при замедлении сверх допуска скрипт завершается с кодом 1.
+
+Пример запуска из корня репозитория::
+
+    python benchmarks/blog_views.py --scale 10k --output base.json
+    python benchmarks/blog_views.py --scale 10k --baseline base.json
+
+Команду сервера можно заменить параметром --wsgi-cmd; по умолчанию
+используется gunicorn. Базы в benchmarks/data/ переиспользуются между
+запусками; удалите файл, чтобы сгенерировать набор заново.
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from urllib.parse import urlencode
+
+from asgi_vs_wsgi import percentile, wait_for_port
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = BENCHMARKS_DIR.parent / 'blogicum'
+DATA_DIR = BENCHMARKS_DIR / 'data'
+SETTINGS_MODULE = 'blogicum.settings_benchmark'
+DEFAULT_SCALES = ('10k', '100k', '1M')
+DEFAULT_WSGI_CMD = (
+    'gunicorn blogicum.wsgi:application --bind {host}:{port} '
+    '--workers {workers}'
+)
+MODES = ('inprocess', 'wsgi')
+BENCHMARK_USERNAME = 'benchmark'
+COMMENT_TEXT = 'Комментарий для замера'
+# Метрики, по которым прогон сравнивается с базовым: задержки не должны
+# расти, пропускная способность — падать.
+LATENCY_METRICS = ('p50', 'p90')
+
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ['DJANGO_SETTINGS_MODULE'] = SETTINGS_MODULE
+
+
+@dataclass
+class Scenario:
+    """Замеряемый запрос."""
+
+    name: str
+    path: str
+    method: str = 'GET'
+    data: dict = field(default_factory=dict)
+    expected_status: int = 200
+
+
+def parse_scale(value):
+    """Превращает '10k', '1M' или '5000' в число постов."""
+    multipliers = {'k': 1_000, 'M': 1_000_000}
+    if value[-1:] in multipliers:
+        return int(value[:-1]) * multipliers[value[-1]]
+    return int(value)
+
+
+def database_path(posts, seed):
+    return DATA_DIR / f'blog-{posts}-seed{seed}.sqlite3'
+
+
+def create_database(path, posts, seed):
+    """Создаёт базу с набором данных; на это уходят минуты."""
+    DATA_DIR.mkdir(exist_ok=True)
+    partial = path.with_suffix('.partial')
+    partial.unlink(missing_ok=True)
+    env = {**os.environ, 'BLOGICUM_BENCHMARK_DB': str(partial)}
+    for command in (
+        ['migrate', '--run-syncdb', '--noinput'],
+        ['generate_dataset', f'--posts={posts}', f'--seed={seed}'],
+    ):
+        print(f'[{path.name}] manage.py {" ".join(command)}', file=sys.stderr)
+        subprocess.run(
+            [sys.executable, 'manage.py', *command],
+            cwd=PROJECT_DIR, env=env, check=True, stdout=subprocess.DEVNULL
+        )
+    partial.rename(path)
+
+
+def use_database(path):
+    """Переключает соединение Django на базу набора данных."""
+    from django.core.cache import cache
+    from django.db import connection
+
+    connection.close()
+    connection.settings_dict['NAME'] = str(path)
+    os.environ['BLOGICUM_BENCHMARK_DB'] = str(path)
+    cache.clear()
+
+
+def get_benchmark_user():
+    from django.contrib.auth.models import User
+
+    user, _ = User.objects.get_or_create(username=BENCHMARK_USERNAME)
+    return user
+
+
+def build_scenarios():
+    """Выбирает самые тяжёлые страницы набора данных."""
+    from django.db.models import Count
+    from django.urls import reverse
+
+    from blog.timeline import get_timeline_entries
+    from blog.views import POSTS_ON_PAGE
+
+    entries = get_timeline_entries()
+    last_page = max(1, math.ceil(entries.count() / POSTS_ON_PAGE))
+    busiest_post = entries.order_by('-comment_count').first().post_id
+
+    def largest(column):
+        return entries.order_by().values(column).annotate(
+            total=Count('post')
+        ).order_by('-total')[0][column]
+
+    return [
+        Scenario('index', reverse('blog:index')),
+        Scenario('index_deep', f'{reverse("blog:index")}?page={last_page}'),
+        Scenario('category_posts', reverse(
+            'blog:category_posts', args=[largest('category_slug')]
+        )),
+        Scenario('profile', reverse(
+            'blog:profile', args=[largest('author_username')]
+        )),
+        Scenario('post_detail', reverse(
+            'blog:post_detail', args=[busiest_post]
+        )),
+        Scenario(
+            'add_comment',
+            reverse('blog:add_comment', args=[busiest_post]),
+            method='POST',
+            data={'text': COMMENT_TEXT},
+            expected_status=302,
+        ),
+    ]
+
+
+def remove_benchmark_comments(user):
+    """Удаляет комментарии, оставленные замером add_comment."""
+    from blog import timeline
+    from blog.models import Comment
+
+    comments = Comment.all_objects.filter(author=user)
+    post_ids = set(comments.values_list('post_id', flat=True))
+    comments.delete()
+    timeline.recount_comments(post_ids)
+
+
+def run_load(make_sender, requests, concurrency, warmup):
+    """
+    Выполняет requests запросов в concurrency потоков.
+
+    :param make_sender: Создаёт для каждого потока функцию, которая
+        выполняет один запрос и возвращает код ответа и ожидаемый код.
+    """
+    per_worker = [requests // concurrency] * concurrency
+    per_worker[0] += requests % concurrency
+    # Отсчёт времени начинается, когда все потоки закончили прогрев.
+    warmed_up = threading.Barrier(concurrency + 1)
+
+    def worker(count):
+        send = make_sender()
+        for _ in range(warmup):
+            send()
+        warmed_up.wait()
+        latencies, errors = [], 0
+        for _ in range(count):
+            started = time.perf_counter()
+            try:
+                status, expected = send()
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                continue
+            if status != expected:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+        return latencies, errors
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        futures = [executor.submit(worker, count) for count in per_worker]
+        warmed_up.wait()
+        started = time.perf_counter()
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+    latencies = sorted(value for result in results for value in result[0])
+    return {
+        'requests': len(latencies),
+        'errors': sum(result[1] for result in results),
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'latency_ms': {
+            name: round(value * 1000, 2) if value is not None else None
+            for name, value in (
+                ('p50', percentile(latencies, 0.5)),
+                ('p90', percentile(latencies, 0.9)),
+                ('p99', percentile(latencies, 0.99)),
+                ('mean', statistics.fmean(latencies) if latencies else None),
+            )
+        },
+    }
+
+
+def inprocess_sender(scenario, user):
+    """Запросы через django.test.Client без сетевого стека."""
+    from django.test import Client
+
+    def make_sender():
+        client = Client()
+        client.force_login(user)
+
+        def send():
+            if scenario.method == 'POST':
+                response = client.post(scenario.path, scenario.data)
+            else:
+                response = client.get(scenario.path)
+            return response.status_code, scenario.expected_status
+        return send
+    return make_sender
+
+
+def http_sender(scenario, host, port, cookies):
+    """Запросы к WSGI-серверу по HTTP с постоянным соединением."""
+    headers = {
+        'Cookie': '; '.join(f'{key}={value}' for key, value in cookies),
+    }
+    body = None
+    if scenario.method == 'POST':
+        body = urlencode(scenario.data)
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        headers['X-CSRFToken'] = dict(cookies)['csrftoken']
+
+    def make_sender():
+        connection = http.client.HTTPConnection(host, port, timeout=60)
+
+        def send():
+            connection.request(
+                scenario.method, scenario.path, body, headers
+            )
+            response = connection.getresponse()
+            response.read()
+            return response.status, scenario.expected_status
+        return send
+    return make_sender
+
+
+def server_cookies(user):
+    """Сессия пользователя и CSRF-токен для запросов к серверу."""
+    from django.conf import settings
+    from django.test import Client
+    from django.utils.crypto import get_random_string
+
+    client = Client()
+    client.force_login(user)
+    return [
+        (settings.SESSION_COOKIE_NAME,
+         client.cookies[settings.SESSION_COOKIE_NAME].value),
+        (settings.CSRF_COOKIE_NAME, get_random_string(64)),
+    ]
+
+
+def benchmark_inprocess(scenarios, user, args):
+    results = {}
+    for scenario in scenarios:
+        results[scenario.name] = run_load(
+            inprocess_sender(scenario, user), args.requests, 1, args.warmup
+        )
+    return results
+
+
+def benchmark_wsgi(scenarios, user, args):
+    """Запускает WSGI-сервер на текущей базе и нагружает его."""
+    command = args.wsgi_cmd.format(
+        host=args.host, port=args.port, workers=args.workers
+    )
+    print(f'[wsgi] {command}', file=sys.stderr)
+    cookies = server_cookies(user)
+    server = subprocess.Popen(
+        shlex.split(command),
+        cwd=PROJECT_DIR,
+        env=dict(os.environ),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(args.host, args.port)
+        return {
+            scenario.name: run_load(
+                http_sender(scenario, args.host, args.port, cookies),
+                args.requests, args.concurrency, args.warmup
+            )
+            for scenario in scenarios
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def benchmark_scale(scale, args):
+    posts = parse_scale(scale)
+    path = database_path(posts, args.seed)
+    if not path.exists():
+        create_database(path, posts, args.seed)
+    use_database(path)
+    user = get_benchmark_user()
+    scenarios = build_scenarios()
+    result = {
+        'posts': posts,
+        'paths': {scenario.name: scenario.path for scenario in scenarios},
+    }
+    for mode in args.mode:
+        print(f'[{scale}] {mode}', file=sys.stderr)
+        benchmark = (
+            benchmark_inprocess if mode == 'inprocess' else benchmark_wsgi
+        )
+        try:
+            result[mode] = benchmark(scenarios, user, args)
+        finally:
+            remove_benchmark_comments(user)
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Список метрик, ухудшившихся относительно базового прогона."""
+    regressions = []
+    for scale, modes in results['scales'].items():
+        for mode in MODES:
+            for name, current in modes.get(mode, {}).items():
+                try:
+                    previous = baseline['scales'][scale][mode][name]
+                except KeyError:
+                    continue
+                checks = [
+                    (metric, previous['latency_ms'][metric],
+                     current['latency_ms'][metric], 1)
+                    for metric in LATENCY_METRICS
+                ]
+                checks.append((
+                    'throughput_rps', previous['throughput_rps'],
+                    current['throughput_rps'], -1
+                ))
+                for metric, before, after, direction in checks:
+                    if not before or after is None:
+                        continue
+                    change = (after - before) / before
+                    if change * direction > tolerance:
+                        regressions.append({
+                            'scale': scale,
+                            'mode': mode,
+                            'scenario': name,
+                            'metric': metric,
+                            'baseline': before,
+                            'current': after,
+                            'change': round(change, 3),
+                        })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--scale', action='append',
+                        help='Число постов: 10k, 100k, 1M или целое число; '
+                             'можно указать несколько раз.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--mode', action='append', choices=MODES)
+    parser.add_argument('--requests', type=int, default=200,
+                        help='Число запросов к каждой странице.')
+    parser.add_argument('--warmup', type=int, default=10,
+                        help='Число запросов прогрева в каждом потоке.')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Число одновременных клиентов WSGI-сервера.')
+    parser.add_argument('--wsgi-cmd', default=DEFAULT_WSGI_CMD)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--output', help='Файл для результатов в JSON.')
+    parser.add_argument('--baseline',
+                        help='Результаты прошлого прогона для сравнения.')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Допустимое ухудшение метрики, доля.')
+    args = parser.parse_args()
+    args.mode = args.mode or list(MODES)
+
+    DATA_DIR.mkdir(exist_ok=True)
+    os.environ.setdefault(
+        'BLOGICUM_BENCHMARK_DB', str(DATA_DIR / 'blog.sqlite3')
+    )
+    import django
+    django.setup()
+
+    results = {
+        'params': {
+            'seed': args.seed,
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'concurrency': args.concurrency,
+            'wsgi_cmd': args.wsgi_cmd,
+            'workers': args.workers,
+        },
+        'scales': {
+            scale: benchmark_scale(scale, args)
+            for scale in args.scale or DEFAULT_SCALES
+        },
+    }
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        results['regressions'] = compare(results, baseline, args.tolerance)
+    report = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(report, encoding='utf-8')
+    print(report)
+    if results.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
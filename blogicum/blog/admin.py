@@ -1,5 +1,8 @@
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin
+from django.contrib.auth.models import User
 
+from .deletion import soft_delete_user
 from .models import Category, Post, Location, Comment
 
 
@@ -27,6 +30,33 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = 'Не задано'
 
 
+@admin.register(Comment)
+class CommentAdmin(admin.ModelAdmin):
+    """CommentAdmin."""
+
+    list_display = ('__str__', 'created_at')
+    # __str__ обращается к автору и посту.
+    list_select_related = ('author', 'post')
+
+
 admin.site.register(Category)
 admin.site.register(Location)
-admin.site.register(Comment)
+
+
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class BlogUserAdmin(UserAdmin):
+    """Пользователи с удалением, не блокирующим базу."""
+
+    actions = ('soft_delete_users',)
+
+    @admin.action(description='Удалить пользователей и их публикации')
+    def soft_delete_users(self, request, queryset):
+        for user in queryset:
+            soft_delete_user(user)
+        self.message_user(
+            request,
+            'Публикации скрыты, строки удалит команда purge_deleted.'
+        )
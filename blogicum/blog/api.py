@@ -0,0 +1,247 @@
+"""
+JSON API только для чтения: ленты, пост и комментарии.
+
+Видимость постов та же, что на HTML-страницах: списки строятся через
+get_published_posts, отдельный пост — через get_visible_post_or_404.
+Строки читаются через values(), без создания объектов моделей.
+Списки листаются курсором (?cursor=...&limit=...), состав полей
+задаётся параметром ?fields=id,title; ответы снабжаются ETag.
+"""
+import base64
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_GET
+
+from .models import Category, Comment, count_comments
+from .views import get_published_posts, get_visible_post_or_404
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+# Поле API -> поле values().
+POST_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'category': 'category__slug',
+    'location': 'location__name',
+    'image': 'image',
+    'comment_count': 'comment_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created_at': 'created_at',
+    'author': 'author__username',
+}
+
+
+class BadRequest(Exception):
+    """Некорректные параметры запроса к API."""
+
+
+def selected_fields(request, available):
+    """Возвращает запрошенные в ?fields= поля или все доступные."""
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(available)
+    fields = [field for field in requested.split(',') if field]
+    unknown = set(fields) - set(available)
+    if unknown:
+        raise BadRequest(f'Неизвестные поля: {", ".join(sorted(unknown))}')
+    return fields
+
+
+def get_limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise BadRequest('Параметр limit должен быть числом')
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def encode_cursor(*values):
+    raw = json.dumps(values)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(request, length):
+    """Курсор запроса — список из length значений — или None."""
+    cursor = request.GET.get('cursor')
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise BadRequest('Некорректный курсор')
+    if not isinstance(values, list) or len(values) != length:
+        raise BadRequest('Некорректный курсор')
+    return values
+
+
+def api_response(request, payload):
+    """Сериализует ответ и отвечает 304, если ETag клиента совпал."""
+    body = json.dumps(payload, cls=DjangoJSONEncoder, ensure_ascii=False)
+    etag = f'"{hashlib.md5(body.encode()).hexdigest()}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    return response
+
+
+def api_view(view):
+    """Превращает BadRequest в ответ 400 и разрешает только GET."""
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as error:
+            return JsonResponse({'error': str(error)}, status=400)
+    return wrapper
+
+
+def serialize_posts(rows, fields):
+    """Приводит строки values() к полям API."""
+    media_url = settings.MEDIA_URL
+    result = []
+    for row in rows:
+        item = {field: row[POST_FIELDS[field]] for field in fields}
+        if 'location' in item and not row['location__is_published']:
+            item['location'] = None
+        if 'image' in item:
+            item['image'] = (
+                f'{media_url}{item["image"]}' if item['image'] else None
+            )
+        result.append(item)
+    return result
+
+
+def post_page(request, posts):
+    """Страница ленты по курсору (pub_date, id) от новых к старым."""
+    fields = selected_fields(request, POST_FIELDS)
+    limit = get_limit(request)
+    cursor = decode_cursor(request, 2)
+    if cursor:
+        try:
+            pub_date, post_id = parse_datetime(cursor[0]), int(cursor[1])
+        except (TypeError, ValueError):
+            raise BadRequest('Некорректный курсор')
+        if pub_date is None:
+            raise BadRequest('Некорректный курсор')
+        posts = posts.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=post_id)
+        )
+    if 'comment_count' in fields:
+        posts = posts.annotate(comment_count=count_comments())
+    columns = {POST_FIELDS[field] for field in fields} | {'id', 'pub_date'}
+    if 'location' in fields:
+        columns.add('location__is_published')
+    rows = list(
+        posts.order_by('-pub_date', '-id').values(*columns)[:limit + 1]
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(
+            rows[-1]['pub_date'].isoformat(), rows[-1]['id']
+        )
+    return api_response(request, {
+        'results': serialize_posts(rows, fields),
+        'next': next_cursor,
+    })
+
+
+@api_view
+def post_list(request):
+    """Лента опубликованных постов."""
+    return post_page(request, get_published_posts(
+        use_select_related=False, use_annotation=False
+    ))
+
+
+@api_view
+def category_posts(request, category_slug):
+    """Лента постов опубликованной категории."""
+    category = get_object_or_404(
+        Category, slug=category_slug, is_published=True
+    )
+    return post_page(request, get_published_posts(
+        category.posts, use_select_related=False, use_annotation=False
+    ))
+
+
+@api_view
+def profile_posts(request, username):
+    """Лента постов автора; автору видны и неопубликованные."""
+    author = get_object_or_404(User, username=username, is_active=True)
+    return post_page(request, get_published_posts(
+        author.posts,
+        use_filtering=request.user != author,
+        use_select_related=False,
+        use_annotation=False
+    ))
+
+
+@api_view
+def post_detail(request, post_id):
+    """Пост, если он виден пользователю."""
+    post = get_visible_post_or_404(post_id, request.user)
+    fields = selected_fields(request, POST_FIELDS)
+    row = {
+        'id': post.id,
+        'title': post.title,
+        'text': post.text,
+        'pub_date': post.pub_date,
+        'author__username': post.author.username,
+        'category__slug': post.category.slug if post.category else None,
+        'location__name': post.location.name if post.location else None,
+        'location__is_published': (
+            post.location is not None and post.location.is_published
+        ),
+        'image': post.image.name if post.image else None,
+    }
+    if 'comment_count' in fields:
+        row['comment_count'] = post.comments.count()
+    return api_response(request, serialize_posts([row], fields)[0])
+
+
+@api_view
+def post_comments(request, post_id):
+    """Комментарии к видимому посту, от старых к новым."""
+    post = get_visible_post_or_404(post_id, request.user)
+    fields = selected_fields(request, COMMENT_FIELDS)
+    limit = get_limit(request)
+    comments = Comment.objects.filter(post=post)
+    cursor = decode_cursor(request, 1)
+    if cursor:
+        try:
+            comments = comments.filter(id__gt=int(cursor[0]))
+        except (TypeError, ValueError):
+            raise BadRequest('Некорректный курсор')
+    columns = {COMMENT_FIELDS[field] for field in fields} | {'id'}
+    rows = list(comments.order_by('id').values(*columns)[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['id'])
+    return api_response(request, {
+        'results': [
+            {field: row[COMMENT_FIELDS[field]] for field in fields}
+            for row in rows
+        ],
+        'next': next_cursor,
+    })
@@ -0,0 +1,64 @@
+"""
+Асинхронные варианты представлений для чтения ленты и постов.
+
+Под ASGI синхронные представления Django 3.2 выполняются в одном общем
+потоке, поэтому медленные запросы к БД выстраиваются в очередь. Здесь
+работа с БД и отрисовка шаблонов выносятся в ограниченный пул потоков,
+а цикл событий остаётся свободным для отдачи ответов медленным клиентам.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from .views import (
+    CategoryPostListView, PostDetailView, PostListView, UserDetailView
+)
+
+_db_executor = None
+
+
+def get_db_executor():
+    """Возвращает общий для процесса пул потоков для работы с БД."""
+    global _db_executor
+    if _db_executor is None:
+        _db_executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_DB_POOL_SIZE,
+            thread_name_prefix='blog-db'
+        )
+    return _db_executor
+
+
+def run_in_db_pool(func):
+    """Превращает синхронную функцию в корутину, работающую в пуле БД."""
+    @wraps(func)
+    def call(*args, **kwargs):
+        close_old_connections()
+        return func(*args, **kwargs)
+
+    return sync_to_async(
+        call, thread_sensitive=False, executor=get_db_executor()
+    )
+
+
+def async_view(view):
+    """Асинхронная обёртка над синхронным представлением только для чтения."""
+    def handle(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        return await run_in_db_pool(handle)(request, *args, **kwargs)
+
+    return wrapper
+
+
+post_list = async_view(PostListView.as_view())
+category_posts = async_view(CategoryPostListView.as_view())
+profile = async_view(UserDetailView.as_view())
+post_detail = async_view(PostDetailView.as_view())
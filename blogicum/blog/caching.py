@@ -0,0 +1,49 @@
+"""
+Версия содержимого блога для кеширования и условных запросов.
+
+Любое изменение постов и категорий увеличивает версию; кеши, в ключ
+которых она входит, становятся неактуальными сами собой, а ETag и
+Last-Modified ответов строятся по версии без запросов к БД. Наступление
+даты отложенной публикации тоже меняет версию.
+
+Версия хранится в файле CONTENT_VERSION_PATH (core.sharedstate), а не в
+кеше: кеш у каждого процесса свой, и после правки в одном воркере
+остальные продолжали бы отдавать старые ленты с прежним ETag.
+"""
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.sharedstate import read_state, write_state
+
+from .models import Post
+
+
+def bump_content_version():
+    """Отмечает изменение содержимого блога."""
+    now = timezone.now()
+    next_scheduled = (
+        Post.objects.filter(is_published=True, pub_date__gt=now)
+        .order_by('pub_date').values_list('pub_date', flat=True).first()
+    )
+    state = {
+        'version': time.time_ns(),
+        'changed_at': now.timestamp(),
+        'next_scheduled': (
+            next_scheduled.timestamp() if next_scheduled else None
+        ),
+    }
+    write_state(settings.CONTENT_VERSION_PATH, state)
+    return state
+
+
+def get_content_version():
+    """Возвращает пару (версия, время изменения в секундах эпохи)."""
+    state = read_state(settings.CONTENT_VERSION_PATH)
+    if state is None or (
+        state['next_scheduled'] is not None
+        and state['next_scheduled'] <= time.time()
+    ):
+        state = bump_content_version()
+    return state['version'], state['changed_at']
@@ -0,0 +1,274 @@
+"""
+Генератор большого синтетического набора данных для нагрузочных тестов.
+
+Пользователи, категории и места создаются через bulk_create. Посты, их
+комментарии и записи материализованной ленты строятся за один проход и
+пишутся пачками через executemany: id постов назначаются здесь же, а
+bulk_create в SQLite разбивал бы вставку на запросы по 999 параметров.
+Тексты берутся из заранее сгенерированных Faker пулов. Всё определяется
+зерном seed и моментом now: на пустой базе одни и те же seed и now дают
+одни и те же данные, включая даты.
+Поля, которые обычно считают save() и сигналы (hidden_by, лента),
+заполняются здесь же.
+"""
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+
+from .caching import bump_content_version
+from .models import (
+    HIDDEN_CATEGORY, HIDDEN_UNPUBLISHED, Category, Comment, Location, Post,
+    TimelineEntry
+)
+from .timeline import entry_fields
+
+# Размер пулов готовых текстов.
+POOL_SIZE = 2000
+# Доли отложенных и снятых с публикации постов, категорий и мест.
+FUTURE_SHARE = 0.02
+UNPUBLISHED_POST_SHARE = 0.05
+UNPUBLISHED_CATEGORY_SHARE = 0.1
+UNPUBLISHED_LOCATION_SHARE = 0.1
+NO_LOCATION_SHARE = 0.3
+# Вес часа суток при выборе времени публикации: днём пишут чаще.
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 3, 5, 7, 8, 8, 8, 9, 9, 8, 8, 8, 8, 9, 10,
+                10, 8, 5, 2]
+MAX_COMMENTS_PER_POST = 5000
+
+
+def insert_rows(model, field_names, rows):
+    """Вставляет готовые значения полей одним executemany."""
+    quote = connection.ops.quote_name
+    columns = [model._meta.get_field(name).column for name in field_names]
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table),
+        ', '.join(map(quote, columns)),
+        ', '.join(['%s'] * len(columns)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def model_rows(objects, model, field_names):
+    """Значения полей объектов в виде, готовом для БД."""
+    fields = [model._meta.get_field(name) for name in field_names]
+    return [
+        [
+            field.get_db_prep_save(getattr(obj, field.attname), connection)
+            for field in fields
+        ]
+        for obj in objects
+    ]
+
+
+POST_FIELDS = (
+    'id', 'title', 'text', 'pub_date', 'author', 'category', 'location',
+    'is_published', 'hidden_by', 'created_at', 'image_placeholder',
+)
+COMMENT_FIELDS = ('text', 'author', 'post', 'created_at')
+TIMELINE_FIELDS = (
+    'post', 'pub_date', 'title', 'excerpt', 'image', 'image_placeholder',
+    'image_aspect_ratio', 'author', 'author_username', 'category',
+    'category_slug', 'category_title', 'location', 'location_name',
+    'comment_count',
+)
+
+
+@contextmanager
+def fast_sqlite_writes():
+    """
+    Отключает fsync SQLite на время генерации и затем восстанавливает его.
+
+    Соединение переиспользуется, и без восстановления обычные запросы
+    после генерации тоже шли бы без fsync.
+    """
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA synchronous')
+        synchronous = cursor.fetchone()[0]
+        cursor.execute('PRAGMA synchronous = OFF')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA synchronous = {int(synchronous)}')
+
+
+class DatasetGenerator:
+    """Строит набор данных заданного размера."""
+
+    def __init__(self, seed=0, batch_size=10_000, years=5, log=None,
+                 now=None):
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.faker = Faker('ru_RU')
+        self.faker.seed_instance(seed)
+        self.batch_size = batch_size
+        self.years = years
+        self.log = log or (lambda message: None)
+        # От now отсчитываются даты публикации и created_at.
+        self.now = (now or timezone.now()).replace(microsecond=0)
+        self.titles = [
+            self.faker.sentence(nb_words=6)[:-1] for _ in range(POOL_SIZE)
+        ]
+        self.texts = [
+            self.faker.paragraph(nb_sentences=8) for _ in range(POOL_SIZE)
+        ]
+        self.comments = [
+            self.faker.sentence(nb_words=12) for _ in range(POOL_SIZE)
+        ]
+
+    def batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield start, min(self.batch_size, total - start)
+
+    def pub_date(self):
+        """Дата публикации: чаще недавняя, днём; изредка — в будущем."""
+        if self.random.random() < FUTURE_SHARE:
+            return self.now + timedelta(
+                minutes=self.random.randint(1, 30 * 24 * 60)
+            )
+        age = self.years * 365 * (1 - self.random.random() ** 0.5)
+        day = self.now - timedelta(days=int(age))
+        hour = self.random.choices(range(24), HOUR_WEIGHTS)[0]
+        return day.replace(
+            hour=hour, minute=self.random.randrange(60),
+            second=self.random.randrange(60)
+        )
+
+    def comment_count(self, mean):
+        """Число комментариев с тяжёлым хвостом и средним около mean."""
+        return min(
+            int(mean * (self.random.paretovariate(2.0) - 1)),
+            MAX_COMMENTS_PER_POST
+        )
+
+    def create_users(self, total):
+        # Соль из зерна: случайная соль make_password меняла бы хеш
+        # пароля при каждом запуске.
+        password = make_password('password', salt=f'dataset{self.seed}')
+        for start, size in self.batches(total):
+            User.objects.bulk_create(
+                User(
+                    username=f'{self.faker.user_name()}{start + i}',
+                    first_name=self.faker.first_name(),
+                    last_name=self.faker.last_name(),
+                    email=f'user{start + i}@example.com',
+                    password=password,
+                )
+                for i in range(size)
+            )
+            self.log(f'Пользователи: {start + size}/{total}')
+
+    def create_categories(self, total):
+        Category.objects.bulk_create(
+            Category(
+                title=self.faker.word().capitalize(),
+                description=self.faker.sentence(),
+                slug=f'category-{i}',
+                is_published=(
+                    self.random.random() >= UNPUBLISHED_CATEGORY_SHARE
+                ),
+            )
+            for i in range(total)
+        )
+
+    def create_locations(self, total):
+        Location.objects.bulk_create(
+            Location(
+                name=self.faker.city(),
+                is_published=(
+                    self.random.random() >= UNPUBLISHED_LOCATION_SHARE
+                ),
+            )
+            for _ in range(total)
+        )
+
+    def make_post(self, post_id, authors, categories, locations):
+        """Несохранённый пост со связанными объектами для entry_fields."""
+        category = self.random.choice(categories)
+        is_published = self.random.random() >= UNPUBLISHED_POST_SHARE
+        post = Post(
+            id=post_id,
+            title=self.random.choice(self.titles),
+            text=self.random.choice(self.texts),
+            pub_date=self.pub_date(),
+            is_published=is_published,
+            hidden_by=(
+                (0 if is_published else HIDDEN_UNPUBLISHED)
+                | (0 if category.is_published else HIDDEN_CATEGORY)
+            ),
+            created_at=self.now,
+        )
+        post.author = self.random.choice(authors)
+        post.category = category
+        post.location = (
+            None if self.random.random() < NO_LOCATION_SHARE
+            else self.random.choice(locations)
+        )
+        return post
+
+    def create_posts(self, total, mean_comments):
+        """Создаёт посты вместе с комментариями и записями ленты."""
+        authors = list(User.objects.only('id', 'username').order_by('id'))
+        categories = list(Category.objects.order_by('id'))
+        locations = list(Location.objects.order_by('id'))
+        next_id = (Post.all_objects.aggregate(Max('id'))['id__max'] or 0) + 1
+        adapt_datetime = connection.ops.adapt_datetimefield_value
+        comments_created = 0
+        for start, size in self.batches(total):
+            posts = [
+                self.make_post(next_id + start + i, authors, categories,
+                               locations)
+                for i in range(size)
+            ]
+            comments, entries = [], []
+            for post in posts:
+                count = self.comment_count(mean_comments)
+                created_at = adapt_datetime(post.pub_date)
+                comments.extend(
+                    (self.random.choice(self.comments),
+                     self.random.choice(authors).id, post.id, created_at)
+                    for _ in range(count)
+                )
+                if not post.hidden_by:
+                    entries.append(TimelineEntry(
+                        post_id=post.id, comment_count=count,
+                        **entry_fields(post)
+                    ))
+            with transaction.atomic():
+                insert_rows(
+                    Post, POST_FIELDS, model_rows(posts, Post, POST_FIELDS)
+                )
+                insert_rows(Comment, COMMENT_FIELDS, comments)
+                insert_rows(
+                    TimelineEntry, TIMELINE_FIELDS,
+                    model_rows(entries, TimelineEntry, TIMELINE_FIELDS)
+                )
+            comments_created += len(comments)
+            self.log(
+                f'Посты: {start + size}/{total}, '
+                f'комментарии: {comments_created}'
+            )
+
+    def generate(self, users, categories, locations, posts, comments):
+        """
+        Создаёт набор данных и заполняет денормализованные поля.
+
+        :param comments: Среднее число комментариев на пост.
+        """
+        with fast_sqlite_writes():
+            self.create_users(users)
+            self.create_categories(categories)
+            self.create_locations(locations)
+            self.create_posts(posts, comments)
+        bump_content_version()
@@ -0,0 +1,75 @@
+"""
+Мягкое удаление пользователей и фоновая очистка удалённых строк.
+
+Удаление только помечает строки записью Deletion (у пользователя ещё и
+снимается is_active): они сразу пропадают из всех querysets. Сами строки
+вместе с зависимыми удаляет purge_batch небольшими порциями, каждая в
+своей транзакции, чтобы блокировка записи SQLite отпускалась между ними.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .caching import bump_content_version
+from .models import Comment, Deletion, InboxEntry, Post, TimelineEntry
+from .sitemaps import mark_dirty, shard_number
+from .timeline import recount_comments
+
+
+def soft_delete_user(user):
+    """Блокирует пользователя и сразу скрывает его посты и комментарии."""
+    with transaction.atomic():
+        User.objects.filter(id=user.id).update(is_active=False)
+        deletion, _ = Deletion.objects.get_or_create(user=user)
+        comments = Comment.objects.filter(author=user)
+        commented = list(
+            comments.values_list('post_id', flat=True).distinct()
+        )
+        comments.update(deletion=deletion)
+        Post.objects.filter(author=user).update(deletion=deletion)
+        TimelineEntry.objects.filter(author=user).delete()
+        InboxEntry.objects.filter(author=user).delete()
+        recount_comments(commented)
+    user.is_active = False
+    mark_dirty('posts')
+    mark_dirty('profiles', [shard_number(user.id)])
+    bump_content_version()
+
+
+def purge_querysets():
+    """
+    Очереди на удаление в порядке очистки.
+
+    Пост удаляется, только когда удалены все его комментарии, а
+    пользователь — когда не осталось помеченных постов и комментариев,
+    поэтому каскад при удалении строки всегда небольшой.
+    """
+    deleted_posts = Post.all_objects.filter(deletion__isnull=False)
+    deleted_comments = Comment.all_objects.filter(deletion__isnull=False)
+    return (
+        deleted_comments,
+        Comment.all_objects.filter(post__deletion__isnull=False),
+        deleted_posts,
+        User.objects.filter(deletion__isnull=False),
+        # Записи, помеченные после выборки очередей выше, ещё ссылаются
+        # на своё удаление.
+        Deletion.objects.filter(user__isnull=True).exclude(
+            id__in=deleted_posts.values('deletion_id')
+        ).exclude(id__in=deleted_comments.values('deletion_id')),
+    )
+
+
+def purge_batch(batch_size=None):
+    """
+    Окончательно удаляет одну порцию мягко удалённых строк.
+
+    :param batch_size: Размер порции (по умолчанию PURGE_BATCH_SIZE).
+    :return: Число удалённых строк вместе с каскадом.
+    """
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    for queryset in purge_querysets():
+        ids = list(queryset.values_list('id', flat=True)[:batch_size])
+        if ids:
+            deleted, _ = queryset.filter(id__in=ids).delete()
+            return deleted
+    return 0
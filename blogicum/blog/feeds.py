@@ -0,0 +1,149 @@
+"""
+RSS и Atom: общая лента, ленты категорий и авторов.
+
+Посты выбираются тем же get_published_posts, что и на HTML-страницах.
+Готовые ответы кешируются по версии содержимого (blog.caching), а
+повторный опрос с If-None-Match или If-Modified-Since получает 304 без
+обращения к БД.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.http import http_date
+
+from .caching import get_content_version
+from .models import Category
+from .views import get_published_posts
+
+
+def cached_feed(feed):
+    """
+    Кеширует ленту до изменения содержимого блога; отвечает 304.
+
+    Категория или автор ищутся до проверки условного запроса, чтобы на
+    несуществующий адрес ответить 404, а не 304. Ключ кеша — путь без
+    строки запроса: произвольные ?x=N не плодят записи.
+    """
+    @wraps(feed)
+    def wrapper(request, *args, **kwargs):
+        obj = feed.get_object(request, *args, **kwargs)
+        version, changed_at = get_content_version()
+        etag = f'"{version}"'
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(changed_at)
+        )
+        if response is None:
+            key = f'blog:feed:{version}:{request.path}'
+            cached = cache.get(key)
+            if cached is None:
+                generator = feed.get_feed(obj, request)
+                cached = (
+                    generator.writeString('utf-8'), generator.content_type
+                )
+                cache.set(key, cached, settings.FEED_CACHE_TIMEOUT)
+            response = HttpResponse(cached[0], content_type=cached[1])
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(changed_at)
+        return response
+    return wrapper
+
+
+class LatestPostsFeed(Feed):
+    """Последние публикации блога."""
+
+    title = 'Блогикум'
+    description = 'Новые публикации'
+
+    def link(self):
+        return reverse('blog:index')
+
+    def get_posts(self, obj):
+        return get_published_posts(use_annotation=False)
+
+    def items(self, obj):
+        return self.get_posts(obj)[:settings.FEED_ITEMS]
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('blog:post_detail', args=[item.id])
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.username
+
+    def item_categories(self, item):
+        return [item.category.title] if item.category else []
+
+
+class CategoryPostsFeed(LatestPostsFeed):
+    """Последние публикации категории."""
+
+    def get_object(self, request, category_slug):
+        return get_object_or_404(
+            Category, slug=category_slug, is_published=True
+        )
+
+    def title(self, obj):
+        return f'Блогикум: {obj.title}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('blog:category_posts', args=[obj.slug])
+
+    def get_posts(self, obj):
+        return get_published_posts(obj.posts, use_annotation=False)
+
+
+class AuthorPostsFeed(LatestPostsFeed):
+    """Последние публикации автора."""
+
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username, is_active=True)
+
+    def title(self, obj):
+        return f'Блогикум: публикации @{obj.username}'
+
+    def description(self, obj):
+        return f'Новые публикации автора @{obj.username}'
+
+    def link(self, obj):
+        return reverse('blog:profile', args=[obj.username])
+
+    def get_posts(self, obj):
+        return get_published_posts(obj.posts, use_annotation=False)
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class CategoryPostsAtomFeed(CategoryPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+class AuthorPostsAtomFeed(AuthorPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
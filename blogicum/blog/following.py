@@ -0,0 +1,188 @@
+"""
+Лента подписок с заранее собранными входящими (inbox) пользователей.
+
+Новый пост обычного автора сразу раскладывается по входящим подписчиков
+(fan-out on write). Посты авторов, у которых подписчиков больше
+FEED_FANOUT_MAX_FOLLOWERS, не раскладываются, а подмешиваются при чтении из
+материализованной ленты (fan-in on read). Число подписчиков хранится в
+FollowerCount и не пересчитывается при чтении. Когда автор возвращается
+под порог, его недавние посты раскладываются по входящим всех подписчиков:
+иначе посты, подмешанные при чтении, пропали бы из лент. Во входящих
+хранится не больше FEED_INBOX_SIZE последних постов: старые удаляет
+команда trim_feed_inboxes, и глубже этого лента подписок не листается.
+"""
+import heapq
+
+from django.conf import settings
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Follow, FollowerCount, InboxEntry, TimelineEntry
+from .timeline import get_timeline_entries, is_listed
+
+
+def is_fanned_out(author_id):
+    """Раскладываются ли посты автора по входящим при записи."""
+    return not FollowerCount.objects.filter(
+        author_id=author_id, count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).exists()
+
+
+def fill_inboxes(author_id, user_ids):
+    """Раскладывает последние посты автора по входящим пользователей."""
+    recent = list(
+        TimelineEntry.objects.filter(author_id=author_id)
+        .order_by('-pub_date')
+        .values_list('post_id', 'pub_date')[:settings.FEED_INBOX_SIZE]
+    )
+    InboxEntry.objects.bulk_create(
+        (InboxEntry(user_id=user_id, post_id=post_id, author_id=author_id,
+                    pub_date=pub_date)
+         for user_id in user_ids for post_id, pub_date in recent),
+        batch_size=settings.FEED_INBOX_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def fan_out_author(author_id):
+    """Заполняет входящие всех подписчиков автора, вернувшегося под порог."""
+    fill_inboxes(author_id, Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True).iterator())
+
+
+def add_follower(author_id, delta):
+    """Меняет счётчик подписчиков автора на delta."""
+    if delta > 0:
+        FollowerCount.objects.get_or_create(author_id=author_id)
+    FollowerCount.objects.filter(author_id=author_id).update(
+        count=F('count') + delta
+    )
+    if delta < 0 and FollowerCount.objects.filter(
+        author_id=author_id,
+        count__lte=settings.FEED_FANOUT_MAX_FOLLOWERS,
+        count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS + delta,
+    ).exists():
+        fan_out_author(author_id)
+
+
+def recount_followers():
+    """
+    Пересчитывает FollowerCount по подпискам.
+
+    :return: Число исправленных счётчиков.
+    """
+    actual = Follow.objects.filter(
+        author_id=OuterRef('author_id')
+    ).values('author_id').annotate(total=Count('id')).values('total')
+    FollowerCount.objects.bulk_create(
+        (FollowerCount(author_id=author_id) for author_id in
+         Follow.objects.values_list('author_id', flat=True).distinct()),
+        ignore_conflicts=True
+    )
+    counts = FollowerCount.objects.annotate(
+        actual=Coalesce(Subquery(actual), 0)
+    ).exclude(count=F('actual'))
+    limit = settings.FEED_FANOUT_MAX_FOLLOWERS
+    fixed = 0
+    for author_id, stored, count in counts.values_list(
+        'author_id', 'count', 'actual'
+    ):
+        fixed += FollowerCount.objects.filter(author_id=author_id).update(
+            count=count
+        )
+        if stored > limit >= count:
+            fan_out_author(author_id)
+    return fixed
+
+
+def sync_post(post):
+    """Добавляет пост во входящие подписчиков автора или убирает из них."""
+    entries = InboxEntry.objects.filter(post_id=post.id)
+    if not is_listed(post):
+        entries.delete()
+        return
+    if entries.update(pub_date=post.pub_date) or not is_fanned_out(
+        post.author_id
+    ):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    InboxEntry.objects.bulk_create(
+        (InboxEntry(user_id=user_id, post_id=post.id,
+                    author_id=post.author_id, pub_date=post.pub_date)
+         for user_id in followers.iterator()),
+        ignore_conflicts=True
+    )
+
+
+def follow(user, author):
+    """Подписывает пользователя на автора и заполняет его входящие."""
+    _, created = Follow.objects.get_or_create(user=user, author=author)
+    if created and is_fanned_out(author.id):
+        fill_inboxes(author.id, [user.id])
+
+
+def unfollow(user, author):
+    Follow.objects.filter(user=user, author=author).delete()
+    InboxEntry.objects.filter(user=user, author=author).delete()
+
+
+def get_feed_post_ids(user):
+    """
+    Возвращает id постов ленты подписок, от новых к старым.
+
+    Слияние входящих пользователя с постами популярных авторов, не больше
+    FEED_INBOX_SIZE штук. Посты, которых уже нет в материализованной ленте
+    (сняты с публикации вместе с категорией), пропускаются.
+    """
+    limit = settings.FEED_INBOX_SIZE
+    now = timezone.now()
+    inbox = InboxEntry.objects.filter(
+        user=user, pub_date__lt=now
+    ).order_by('-pub_date').values_list('pub_date', 'post_id')[:limit]
+    popular = Follow.objects.filter(
+        user=user,
+        author__follower_count__count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).values_list('author_id', flat=True)
+    sources = [inbox]
+    popular = list(popular)
+    if popular:
+        sources.append(
+            get_timeline_entries().filter(author_id__in=popular)
+            .values_list('pub_date', 'post_id')[:limit]
+        )
+    post_ids = list(dict.fromkeys(
+        post_id for _, post_id in heapq.merge(*sources, reverse=True)
+    ))[:limit]
+    listed = set(TimelineEntry.objects.filter(
+        post_id__in=post_ids
+    ).values_list('post_id', flat=True))
+    return [post_id for post_id in post_ids if post_id in listed]
+
+
+def get_feed_posts(post_ids):
+    """Посты для карточек по id из записей материализованной ленты."""
+    entries = TimelineEntry.objects.in_bulk(post_ids)
+    return [
+        entries[post_id].as_post() for post_id in post_ids
+        if post_id in entries
+    ]
+
+
+def trim_inboxes():
+    """Удаляет из входящих посты старше FEED_INBOX_SIZE последних."""
+    limit = settings.FEED_INBOX_SIZE
+    overflowing = InboxEntry.objects.values('user_id').annotate(
+        total=Count('post_id')
+    ).filter(total__gt=limit).values_list('user_id', flat=True)
+    deleted = 0
+    for user_id in overflowing:
+        entries = InboxEntry.objects.filter(user_id=user_id)
+        oldest_kept = entries.order_by('-pub_date').values_list(
+            'pub_date', flat=True
+        )[limit - 1]
+        deleted += entries.filter(pub_date__lt=oldest_kept).delete()[0]
+    return deleted
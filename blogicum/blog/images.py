@@ -0,0 +1,35 @@
+import base64
+from io import BytesIO
+
+from PIL import Image, ImageFilter, UnidentifiedImageError
+
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_BLUR_RADIUS = 1
+PLACEHOLDER_QUALITY = 40
+
+
+def make_placeholder(image_file):
+    """
+    Строит размытое превью изображения для показа до загрузки оригинала.
+
+    :param image_file: Файл изображения (загруженный или из хранилища).
+    :return: Пара из data URI крошечного JPEG и соотношения сторон
+        ширина/высота; для нечитаемого файла — ('', None).
+    """
+    try:
+        image_file.seek(0)
+        with Image.open(image_file) as image:
+            width, height = image.size
+            image = image.convert('RGB')
+            image.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+            image = image.filter(
+                ImageFilter.GaussianBlur(PLACEHOLDER_BLUR_RADIUS)
+            )
+            buffer = BytesIO()
+            image.save(buffer, format='JPEG', quality=PLACEHOLDER_QUALITY)
+    except (OSError, UnidentifiedImageError, ValueError):
+        return '', None
+    finally:
+        image_file.seek(0)
+    encoded = base64.b64encode(buffer.getvalue()).decode('ascii')
+    return f'data:image/jpeg;base64,{encoded}', round(width / height, 4)
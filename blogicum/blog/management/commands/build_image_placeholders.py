@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from blog.images import make_placeholder
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Строит превью для изображений, загруженных до их появления.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересчитать превью и для постов, у которых оно уже есть.'
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['force']:
+            posts = posts.filter(image_placeholder='')
+        built = 0
+        for post in posts.only('id', 'image').iterator():
+            try:
+                with post.image.open('rb') as image_file:
+                    placeholder, ratio = make_placeholder(image_file)
+            except OSError:
+                continue
+            Post.objects.filter(id=post.id).update(
+                image_placeholder=placeholder,
+                image_aspect_ratio=ratio
+            )
+            built += 1
+        self.stdout.write(f'Построено превью: {built}')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from blog.models import SitemapShard
+from blog.sitemaps import build_sitemaps
+
+
+class Command(BaseCommand):
+    help = (
+        'Собирает карту сайта в gzip-файлы SITEMAP_ROOT. По умолчанию '
+        'пересобирает только изменившиеся части; запускается по расписанию.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересобрать все части карты сайта.'
+        )
+
+    def handle(self, *args, **options):
+        since = SitemapShard.objects.aggregate(Max('built_at'))
+        built = build_sitemaps(
+            full=options['full'], since=since['built_at__max']
+        )
+        self.stdout.write(f'Пересобрано частей карты сайта: {built}')
@@ -0,0 +1,66 @@
+from argparse import ArgumentTypeError
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from blog.dataset import DatasetGenerator
+
+
+def moment(value):
+    """Разбирает --now; время без часового пояса считается локальным."""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ArgumentTypeError(f'Некорректная дата: {value}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, категориями, местами, '
+        'постами и комментариями для нагрузочных тестов. Одинаковые --seed '
+        'и --now на пустой базе дают одинаковые данные. После генерации '
+        'запустите build_sitemaps --full.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10_000)
+        parser.add_argument(
+            '--users',
+            type=int,
+            help='Число пользователей (по умолчанию — десятая часть постов).'
+        )
+        parser.add_argument('--categories', type=int, default=50)
+        parser.add_argument('--locations', type=int, default=200)
+        parser.add_argument(
+            '--comments',
+            type=float,
+            default=3,
+            help='Среднее число комментариев на пост.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument(
+            '--now',
+            type=moment,
+            help='Момент, от которого отсчитываются даты, например '
+                 '2024-01-01T12:00 (по умолчанию — текущее время).'
+        )
+
+    def handle(self, *args, **options):
+        posts = options['posts']
+        generator = DatasetGenerator(
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write,
+            now=options['now'],
+        )
+        generator.generate(
+            users=options['users'] or max(posts // 10, 1),
+            categories=options['categories'],
+            locations=options['locations'],
+            posts=posts,
+            comments=options['comments'],
+        )
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.deletion import purge_batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Окончательно удаляет мягко удалённые посты, комментарии и '
+        'пользователей небольшими порциями, каждую в своей транзакции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Сколько строк удалять за одну транзакцию.'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Работать постоянно, проверяя очередь каждые --interval '
+                 'секунд.'
+        )
+        parser.add_argument('--interval', type=float, default=60)
+
+    def handle(self, *args, **options):
+        while True:
+            total = 0
+            while True:
+                deleted = purge_batch(options['batch_size'])
+                if not deleted:
+                    break
+                total += deleted
+            if total:
+                self.stdout.write(f'Удалено строк: {total}')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
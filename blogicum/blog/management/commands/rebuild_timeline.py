@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import recompute_hidden_by
+from blog.timeline import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает Post.hidden_by и полностью перестраивает '
+        'материализованную ленту главной страницы. Нужна после первого '
+        'развёртывания и массовых правок в обход ORM.'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Исправлено постов: {recompute_hidden_by()}')
+        self.stdout.write(f'Записей в ленте: {rebuild()}')
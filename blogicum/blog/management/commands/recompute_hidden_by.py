@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import recompute_hidden_by
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает Post.hidden_by по публикации поста и его категории. '
+        'Нужна после появления поля и правок в обход ORM; её же выполняет '
+        'rebuild_timeline.'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Исправлено постов: {recompute_hidden_by()}')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from blog.following import recount_followers
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает FollowerCount по подпискам. Нужна после появления '
+        'модели и правок подписок в обход ORM.'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Исправлено счётчиков: {recount_followers()}')
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from blog.notifications import send_comment_digests
+
+
+class Command(BaseCommand):
+    help = (
+        'Рассылает авторам дайджесты новых комментариев, не чаще одного '
+        'письма в интервал. Запускается по расписанию (например, cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            help='Минимальный интервал между дайджестами одному автору, '
+                 'в минутах (по умолчанию COMMENT_DIGEST_INTERVAL).'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        sent = send_comment_digests(
+            timedelta(minutes=interval) if interval is not None else None
+        )
+        self.stdout.write(f'Отправлено дайджестов: {sent}')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from blog.following import trim_inboxes
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из лент подписок посты старше FEED_INBOX_SIZE последних. '
+        'Запускается по расписанию (например, cron).'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Удалено записей: {trim_inboxes()}')
@@ -1,9 +1,79 @@
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
 
+from .images import make_placeholder
 
 CHARFIELD_MAX_LENGTH = 256
 
+# Причины, по которым пост скрыт из лент (биты Post.hidden_by).
+HIDDEN_UNPUBLISHED = 1
+HIDDEN_CATEGORY = 2
+
+
+class Deletion(models.Model):
+    """
+    Мягкое удаление.
+
+    Помеченные им посты и комментарии сразу пропадают из всех querysets,
+    а строки с зависимыми удаляет команда purge_deleted. Удаление
+    пользователя помечает одной записью все его посты и комментарии.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='deletion',
+        verbose_name='Удаляемый пользователь'
+    )
+    created_at = models.DateTimeField('Удалено', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'удаление'
+        verbose_name_plural = 'Удаления'
+
+    def __str__(self):
+        return f'Удаление {self.id}'
+
+
+class SoftDeleteManager(models.Manager):
+    """Менеджер, скрывающий мягко удалённые записи."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deletion__isnull=True)
+
+
+class SoftDeleteModel(models.Model):
+    """Абстрактная модель с мягким удалением (см. Deletion)."""
+
+    deletion = models.ForeignKey(
+        Deletion,
+        on_delete=models.PROTECT,
+        blank=True,
+        null=True,
+        editable=False,
+        related_name='+',
+        verbose_name='Удаление'
+    )
+
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        abstract = True
+
+    def soft_delete(self):
+        self.deletion = Deletion.objects.create()
+        self.save(update_fields=['deletion'])
+
+
+def count_comments():
+    """Выражение для аннотации постов числом неудалённых комментариев."""
+    return models.Count(
+        'comments', filter=models.Q(comments__deletion__isnull=True)
+    )
+
 
 class TimestampModel(models.Model):
     """Абстрактная модель с полями для публикации и времени создания."""
@@ -40,6 +110,30 @@ class Category(TimestampModel):
     def __str__(self):
         return self.title[:50]
 
+    def save(self, *args, **kwargs):
+        """
+        Переносит смену публикации на посты категории одним запросом.
+
+        Посты обновляются до сохранения категории, чтобы обработчики
+        post_save уже видели новые значения Post.hidden_by.
+        """
+        with transaction.atomic():
+            was_published = self.pk and Category.objects.filter(
+                pk=self.pk
+            ).values_list('is_published', flat=True).first()
+            if was_published is not None and (
+                was_published != self.is_published
+            ):
+                hidden_by = models.F('hidden_by')
+                Post.all_objects.filter(category=self).update(
+                    hidden_by=(
+                        hidden_by.bitand(HIDDEN_UNPUBLISHED)
+                        if self.is_published
+                        else hidden_by.bitor(HIDDEN_CATEGORY)
+                    )
+                )
+            super().save(*args, **kwargs)
+
 
 class Location(TimestampModel):
     """Местоположение."""
@@ -55,7 +149,7 @@ class Location(TimestampModel):
         return self.name[:50]
 
 
-class Post(TimestampModel):
+class Post(SoftDeleteModel, TimestampModel):
     """Публикация."""
 
     title = models.CharField('Заголовок', max_length=CHARFIELD_MAX_LENGTH)
@@ -66,6 +160,18 @@ class Post(TimestampModel):
         blank=True,
         null=True
     )
+    image_placeholder = models.TextField(
+        'Превью изображения',
+        blank=True,
+        editable=False,
+        help_text='Размытая уменьшенная копия изображения в виде data URI.'
+    )
+    image_aspect_ratio = models.FloatField(
+        'Соотношение сторон изображения',
+        blank=True,
+        null=True,
+        editable=False
+    )
     pub_date = models.DateTimeField(
         'Дата и время публикации',
         help_text='Если установить дату и время в будущем — можно делать '
@@ -89,18 +195,89 @@ class Post(TimestampModel):
         null=True,
         verbose_name='Категория'
     )
+    hidden_by = models.PositiveSmallIntegerField(
+        'Причины скрытия',
+        default=0,
+        editable=False,
+        help_text='Биты HIDDEN_*: пост снят с публикации, его категория '
+                  'снята или не задана. 0 — пост виден в лентах.'
+    )
 
     class Meta:
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
         ordering = ('-pub_date',)
         default_related_name = 'posts'
+        indexes = (
+            models.Index(
+                fields=('hidden_by', '-pub_date'), name='post_feed'
+            ),
+        )
 
     def __str__(self):
         return self.title[:50]
 
+    def save(self, *args, **kwargs):
+        """
+        Пересчитывает hidden_by и строит превью изображения.
+
+        Превью строится один раз — при загрузке файла.
+        """
+        # Флаг категории читается из БД: закешированный self.category мог
+        # устареть или не совпадать с category_id.
+        category_published = self.category_id is not None and (
+            Category.objects.filter(
+                pk=self.category_id, is_published=True
+            ).exists()
+        )
+        self.hidden_by = (
+            (0 if self.is_published else HIDDEN_UNPUBLISHED)
+            | (0 if category_published else HIDDEN_CATEGORY)
+        )
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'hidden_by' not in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'hidden_by'}
+        if not self.image:
+            self.image_placeholder, self.image_aspect_ratio = '', None
+        elif not self.image._committed:
+            self.image_placeholder, self.image_aspect_ratio = (
+                make_placeholder(self.image)
+            )
+        super().save(*args, **kwargs)
 
-class Comment(models.Model):
+
+def hidden_by_expression():
+    """Значение Post.hidden_by, вычисленное в БД по полям поста."""
+    return models.Case(
+        models.When(is_published=True, then=0),
+        default=HIDDEN_UNPUBLISHED,
+    ) + models.Case(
+        models.When(
+            models.Exists(Category.objects.filter(
+                pk=models.OuterRef('category_id'), is_published=True
+            )),
+            then=0,
+        ),
+        default=HIDDEN_CATEGORY,
+    )
+
+
+def recompute_hidden_by():
+    """
+    Пересчитывает Post.hidden_by у постов, где он разошёлся с данными.
+
+    Нужен для строк, записанных до появления поля или в обход save().
+
+    :return: Число исправленных постов.
+    """
+    return Post.all_objects.alias(
+        expected=hidden_by_expression()
+    ).exclude(hidden_by=models.F('expected')).update(
+        hidden_by=hidden_by_expression()
+    )
+
+
+class Comment(SoftDeleteModel):
     """Комментарий."""
 
     text = models.TextField('Текст')
@@ -123,3 +300,253 @@ class Comment(models.Model):
 
     def __str__(self):
         return f'Комментарий {self.author.username} поста {self.post.title}'
+
+
+class CommentNotification(models.Model):
+    """Уведомление автора поста о новом комментарии."""
+
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='comment_notifications',
+        verbose_name='Получатель'
+    )
+    comment = models.ForeignKey(
+        Comment,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Комментарий'
+    )
+    created_at = models.DateTimeField('Добавлено', auto_now_add=True)
+    sent_at = models.DateTimeField(
+        'Отправлено в дайджесте',
+        blank=True,
+        null=True,
+        db_index=True
+    )
+    claimed_until = models.DateTimeField(
+        'Забрано рассылкой до',
+        blank=True,
+        null=True
+    )
+
+    class Meta:
+        verbose_name = 'уведомление о комментарии'
+        verbose_name_plural = 'Уведомления о комментариях'
+        ordering = ('created_at',)
+
+    def __str__(self):
+        return f'Уведомление о комментарии {self.comment_id}'
+
+
+class SitemapShard(models.Model):
+    """Часть карты сайта, собираемая в отдельный файл."""
+
+    section = models.CharField('Раздел', max_length=32)
+    number = models.PositiveIntegerField('Номер части')
+    is_dirty = models.BooleanField(
+        'Требует пересборки',
+        default=True,
+        help_text='Содержимое части изменилось после последней сборки.'
+    )
+    built_at = models.DateTimeField('Собрана', blank=True, null=True)
+
+    class Meta:
+        verbose_name = 'часть карты сайта'
+        verbose_name_plural = 'Части карты сайта'
+        ordering = ('section', 'number')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('section', 'number'), name='unique_sitemap_shard'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.section}-{self.number}'
+
+
+class TimelineEntry(models.Model):
+    """
+    Пост в материализованной ленте главной страницы.
+
+    Содержит только опубликованные посты опубликованных категорий вместе с
+    полями карточки, так что лента читается диапазоном по индексу pub_date
+    без соединений. Поддерживается модулем blog.timeline.
+    """
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='timeline_entry',
+        verbose_name='Публикация'
+    )
+    pub_date = models.DateTimeField('Дата и время публикации', db_index=True)
+    title = models.CharField('Заголовок', max_length=CHARFIELD_MAX_LENGTH)
+    excerpt = models.TextField('Начало текста')
+    image = models.CharField('Изображение', max_length=100, blank=True)
+    image_placeholder = models.TextField('Превью изображения', blank=True)
+    image_aspect_ratio = models.FloatField(
+        'Соотношение сторон изображения', blank=True, null=True
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор публикации'
+    )
+    author_username = models.CharField('Имя автора', max_length=150)
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Категория'
+    )
+    category_slug = models.CharField('Идентификатор категории', max_length=64)
+    category_title = models.CharField(
+        'Заголовок категории', max_length=CHARFIELD_MAX_LENGTH
+    )
+    location = models.ForeignKey(
+        Location,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='+',
+        verbose_name='Местоположение'
+    )
+    location_name = models.CharField(
+        'Название места',
+        max_length=CHARFIELD_MAX_LENGTH,
+        blank=True,
+        help_text='Пусто, если место не задано или снято с публикации.'
+    )
+    comment_count = models.PositiveIntegerField('Комментарии', default=0)
+
+    class Meta:
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'Лента главной страницы'
+        ordering = ('-pub_date',)
+
+    def __str__(self):
+        return self.title[:50]
+
+    def as_post(self):
+        """Несохраняемый пост со связанными объектами для карточки."""
+        post = Post(
+            id=self.post_id,
+            title=self.title,
+            text=self.excerpt,
+            image=self.image or None,
+            image_placeholder=self.image_placeholder,
+            image_aspect_ratio=self.image_aspect_ratio,
+            pub_date=self.pub_date,
+            is_published=True,
+        )
+        post.author = User(id=self.author_id, username=self.author_username)
+        post.category = Category(
+            id=self.category_id,
+            slug=self.category_slug,
+            title=self.category_title,
+            is_published=True,
+        )
+        post.location = Location(
+            id=self.location_id, name=self.location_name, is_published=True
+        ) if self.location_name else None
+        post.comment_count = self.comment_count
+        return post
+
+
+class Follow(models.Model):
+    """Подписка пользователя на автора."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+        verbose_name='Подписчик'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='followers',
+        verbose_name='Автор'
+    )
+    created_at = models.DateTimeField('Добавлено', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'подписка'
+        verbose_name_plural = 'Подписки'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user_id} → {self.author_id}'
+
+
+class FollowerCount(models.Model):
+    """
+    Число подписчиков автора.
+
+    Поддерживается сигналами Follow, чтобы лента подписок и раскладка
+    постов не считали подписчиков при каждом обращении.
+    """
+
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='follower_count',
+        verbose_name='Автор'
+    )
+    count = models.PositiveIntegerField('Подписчиков', default=0)
+
+    class Meta:
+        verbose_name = 'число подписчиков'
+        verbose_name_plural = 'Числа подписчиков'
+
+    def __str__(self):
+        return f'{self.author_id}: {self.count}'
+
+
+class InboxEntry(models.Model):
+    """Пост автора в заранее собранной ленте подписок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='inbox',
+        verbose_name='Получатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Публикация'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор публикации'
+    )
+    pub_date = models.DateTimeField('Дата и время публикации')
+
+    class Meta:
+        verbose_name = 'запись ленты подписок'
+        verbose_name_plural = 'Ленты подписок'
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date'), name='inbox_user_pub_date'
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_inbox_post'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
@@ -0,0 +1,158 @@
+"""Дайджесты уведомлений о новых комментариях для авторов постов."""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from core.mail import reopen
+
+from .models import CommentNotification
+
+logger = logging.getLogger(__name__)
+
+DIGEST_SUBJECT = 'Новые комментарии к вашим публикациям'
+
+
+def build_digest(recipient, notifications):
+    """Собирает письмо-дайджест для одного автора."""
+    posts = defaultdict(list)
+    shown = notifications[:settings.COMMENT_DIGEST_MAX_COMMENTS]
+    for notification in shown:
+        comment = notification.comment
+        posts[comment.post].append(comment)
+    body = render_to_string('emails/comment_digest.txt', {
+        'recipient': recipient,
+        'posts': posts.items(),
+        'total': len(notifications),
+        'hidden': len(notifications) - len(shown),
+        'site_url': settings.SITE_URL,
+    })
+    return EmailMessage(DIGEST_SUBJECT, body, to=[recipient.email])
+
+
+def pending_notifications(now, interval):
+    """Неотправленные и не забранные уведомления авторов вне интервала."""
+    recently_notified = (
+        CommentNotification.objects
+        .filter(sent_at__gt=now - interval)
+        .values('recipient_id')
+    )
+    return (
+        CommentNotification.objects
+        .filter(sent_at__isnull=True, comment__deletion__isnull=True)
+        .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lte=now))
+        .exclude(recipient_id__in=recently_notified)
+    )
+
+
+def claim_notifications(now, interval, limit):
+    """
+    Забирает уведомления не больше чем limit авторов.
+
+    Как и claim_batch очереди писем (core.mail): забранные уведомления
+    получают claimed_until через COMMENT_DIGEST_CLAIM_TIMEOUT, и
+    параллельная рассылка их не видит, а если рассылка упадёт, они
+    вернутся по истечении срока. Где СУБД умеет SKIP LOCKED, строки
+    выбираются с блокировкой; иначе каждая забирается условным UPDATE.
+    """
+    claimed_until = now + timedelta(
+        seconds=settings.COMMENT_DIGEST_CLAIM_TIMEOUT
+    )
+    pending = pending_notifications(now, interval)
+    recipients = list(
+        pending.order_by('recipient_id')
+        .values_list('recipient_id', flat=True).distinct()[:limit]
+    )
+    rows = pending.filter(recipient_id__in=recipients)
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(
+                rows.select_for_update(skip_locked=True, of=('self',))
+                .values_list('id', flat=True)
+            )
+            CommentNotification.objects.filter(id__in=ids).update(
+                claimed_until=claimed_until
+            )
+    else:
+        ids = [
+            notification_id for notification_id, current
+            in rows.values_list('id', 'claimed_until')
+            if CommentNotification.objects.filter(
+                id=notification_id, claimed_until=current
+            ).update(claimed_until=claimed_until)
+        ]
+    return list(
+        CommentNotification.objects.filter(id__in=ids)
+        .select_related('recipient', 'comment__author', 'comment__post')
+        .order_by('recipient_id', 'created_at')
+    )
+
+
+def deliver_digests(notifications):
+    """
+    Отправляет дайджесты забранных уведомлений через одно соединение.
+
+    :return: Пара (число отправленных писем, id обработанных уведомлений).
+        Уведомления авторов без адреса тоже считаются обработанными, чтобы
+        очередь не росла; уведомления неотправленных писем остаются
+        забранными и вернутся в очередь по истечении срока.
+    """
+    by_recipient = defaultdict(list)
+    for notification in notifications:
+        by_recipient[notification.recipient].append(notification)
+    sent, done = 0, []
+    mail_connection = get_connection()
+    try:
+        mail_connection.open()
+        for recipient, received in by_recipient.items():
+            if recipient.email:
+                try:
+                    delivered = mail_connection.send_messages(
+                        [build_digest(recipient, received)]
+                    )
+                except Exception as error:
+                    logger.warning('Не удалось отправить дайджест %s: %s',
+                                   recipient.id, error)
+                    reopen(mail_connection)
+                    continue
+                if not delivered:
+                    continue
+                sent += 1
+            done.extend(notification.id for notification in received)
+    finally:
+        mail_connection.close()
+    return sent, done
+
+
+def send_comment_digests(interval=None):
+    """
+    Отправляет накопившиеся уведомления — не чаще раза в интервал на автора.
+
+    Уведомления забираются пачками по COMMENT_DIGEST_BATCH_SIZE авторов, и
+    отправленными помечаются только те, чьё письмо принял бэкенд.
+
+    :param interval: Минимальный промежуток между дайджестами одному автору.
+    :return: Число отправленных дайджестов.
+    """
+    now = timezone.now()
+    if interval is None:
+        interval = timedelta(seconds=settings.COMMENT_DIGEST_INTERVAL)
+    total = 0
+    while True:
+        notifications = claim_notifications(
+            now, interval, settings.COMMENT_DIGEST_BATCH_SIZE
+        )
+        if not notifications:
+            break
+        sent, done = deliver_digests(notifications)
+        CommentNotification.objects.filter(id__in=done).update(sent_at=now)
+        total += sent
+    # Отправленные уведомления нужны, только пока идёт интервал.
+    CommentNotification.objects.filter(sent_at__lte=now - interval).delete()
+    return total
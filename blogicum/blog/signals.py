@@ -0,0 +1,124 @@
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import following, timeline
+from .caching import bump_content_version
+from .models import (
+    HIDDEN_CATEGORY, Category, Comment, Follow, Location, Post, TimelineEntry
+)
+from .sitemaps import mark_dirty, shard_number
+
+# Поля пользователя, от которых зависит его строка в карте профилей.
+PROFILE_SITEMAP_FIELDS = {'username', 'is_active'}
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def content_changed(sender, **kwargs):
+    """Сбрасывает кеши, зависящие от содержимого блога."""
+    bump_content_version()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_sitemap_changed(sender, instance, **kwargs):
+    """Помечает для пересборки часть карты сайта с этим постом."""
+    mark_dirty('posts', [shard_number(instance.id)])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_sitemap_changed(sender, instance, **kwargs):
+    """Снятие категории с публикации меняет и список её постов."""
+    mark_dirty('categories', [shard_number(instance.id)])
+    mark_dirty('posts')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_sitemap_changed(sender, instance, update_fields=None, **kwargs):
+    """
+    Помечает часть карты профилей, если мог измениться адрес профиля.
+
+    Вход в систему сохраняет только last_login: без этой проверки каждый
+    вход делал бы запись в SitemapShard.
+    """
+    if update_fields is None or PROFILE_SITEMAP_FIELDS & set(update_fields):
+        mark_dirty('profiles', [shard_number(instance.id)])
+
+
+@receiver(post_save, sender=Post)
+def post_timeline_changed(sender, instance, **kwargs):
+    timeline.sync_post(instance)
+    following.sync_post(instance)
+
+
+@receiver(post_save, sender=Category)
+def category_timeline_changed(sender, instance, **kwargs):
+    timeline.sync_category(instance)
+
+
+@receiver(post_save, sender=Location)
+def location_timeline_changed(sender, instance, **kwargs):
+    timeline.sync_location(instance)
+
+
+@receiver(pre_delete, sender=Location)
+def location_timeline_deleted(sender, instance, **kwargs):
+    timeline.sync_location(instance, deleted=True)
+
+
+@receiver(post_save, sender=User)
+def author_timeline_changed(sender, instance, update_fields=None, **kwargs):
+    """Имя автора в ленте; вход в систему сохраняет только last_login."""
+    if update_fields is None or 'username' in update_fields:
+        timeline.sync_author(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        following.add_follower(instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    """Срабатывает и при каскадном удалении подписок с пользователем."""
+    following.add_follower(instance.author_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        TimelineEntry.objects.filter(post_id=instance.post_id).update(
+            comment_count=F('comment_count') + 1
+        )
+    elif update_fields and 'deletion' in update_fields:
+        comment_removed(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    """Мягко удалённый комментарий уже вычтен из счётчика."""
+    if instance.deletion_id is None:
+        comment_removed(instance)
+
+
+def comment_removed(comment):
+    TimelineEntry.objects.filter(
+        post_id=comment.post_id, comment_count__gt=0
+    ).update(comment_count=F('comment_count') - 1)
+
+
+@receiver(pre_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    """Посты удаляемой категории остаются без неё и скрываются."""
+    Post.all_objects.filter(category=instance).update(
+        hidden_by=F('hidden_by').bitor(HIDDEN_CATEGORY)
+    )
@@ -0,0 +1,226 @@
+"""
+Карта сайта, заранее собранная в gzip-файлы.
+
+Посты и профили делятся на части по диапазонам id (SITEMAP_SHARD_SIZE
+записей на часть), каждая часть читается из БД порциями по ключу id и
+пишется в свой файл. Сигналы помечают изменившиеся части, и команда
+build_sitemaps пересобирает только их; запросы поисковых роботов читают
+готовые файлы и в БД не ходят.
+"""
+import gzip
+import os
+import tempfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.http import FileResponse, Http404, HttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+
+from core.static import parse_accept_encoding
+
+from .models import Category, Post, SitemapShard
+from .views import get_published_posts
+
+SECTIONS = ('posts', 'categories', 'profiles')
+INDEX_FILENAME = 'sitemap.xml.gz'
+# Сколько строк читать из БД за один запрос при обходе части.
+CHUNK_SIZE = 2000
+
+
+def shard_filename(section, number):
+    return f'sitemap-{section}-{number}.xml.gz'
+
+
+def shard_number(object_id):
+    return object_id // settings.SITEMAP_SHARD_SIZE
+
+
+def mark_dirty(section, numbers=None):
+    """Помечает части раздела для пересборки; без numbers — все части."""
+    if numbers is None:
+        SitemapShard.objects.filter(section=section).update(is_dirty=True)
+        return
+    for number in set(numbers):
+        SitemapShard.objects.update_or_create(
+            section=section, number=number, defaults={'is_dirty': True}
+        )
+
+
+def iterate_keyset(queryset, lower, upper, fields):
+    """Обходит строки с id в [lower, upper) порциями, без OFFSET."""
+    last_id = lower - 1
+    while True:
+        rows = list(
+            queryset.filter(id__gt=last_id, id__lt=upper)
+            .order_by('id').values_list('id', *fields)[:CHUNK_SIZE]
+        )
+        yield from rows
+        if len(rows) < CHUNK_SIZE:
+            return
+        last_id = rows[-1][0]
+
+
+def shard_urls(section, number):
+    """Возвращает пары (адрес, дата изменения) для части раздела."""
+    size = settings.SITEMAP_SHARD_SIZE
+    lower, upper = number * size, (number + 1) * size
+    if section == 'posts':
+        posts = get_published_posts(
+            use_select_related=False, use_annotation=False
+        )
+        for post_id, pub_date in iterate_keyset(
+            posts, lower, upper, ('pub_date',)
+        ):
+            yield reverse('blog:post_detail', args=[post_id]), pub_date
+    elif section == 'profiles':
+        users = User.objects.filter(is_active=True)
+        for _, username in iterate_keyset(
+            users, lower, upper, ('username',)
+        ):
+            yield reverse('blog:profile', args=[username]), None
+    elif section == 'categories':
+        categories = Category.objects.filter(is_published=True)
+        for _, slug in iterate_keyset(categories, lower, upper, ('slug',)):
+            yield reverse('blog:category_posts', args=[slug]), None
+
+
+def write_gzip(filename, lines):
+    """Атомарно записывает строки в gzip-файл каталога SITEMAP_ROOT."""
+    root = Path(settings.SITEMAP_ROOT)
+    root.mkdir(parents=True, exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(dir=root, suffix='.tmp')
+    with os.fdopen(descriptor, 'wb') as raw, gzip.GzipFile(
+        fileobj=raw, mode='wb', mtime=0
+    ) as output:
+        for line in lines:
+            output.write(line.encode('utf-8'))
+    os.replace(temp_path, root / filename)
+
+
+def build_shard(section, number):
+    """Собирает файл одной части; пустую часть удаляет."""
+    site_url = settings.SITE_URL
+    urls = shard_urls(section, number)
+    first = next(urls, None)
+    path = Path(settings.SITEMAP_ROOT) / shard_filename(section, number)
+    if first is None:
+        path.unlink(missing_ok=True)
+        SitemapShard.objects.filter(section=section, number=number).delete()
+        return False
+
+    def lines():
+        yield ('<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns='
+               '"http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        for url, modified in (first, *urls):
+            lastmod = (
+                f'<lastmod>{modified.date().isoformat()}</lastmod>'
+                if modified else ''
+            )
+            yield f'<url><loc>{escape(site_url + url)}</loc>{lastmod}</url>\n'
+        yield '</urlset>\n'
+
+    write_gzip(shard_filename(section, number), lines())
+    SitemapShard.objects.update_or_create(
+        section=section, number=number,
+        defaults={'is_dirty': False, 'built_at': timezone.now()}
+    )
+    return True
+
+
+def build_index():
+    """Собирает индекс карты сайта по таблице частей."""
+    def lines():
+        yield ('<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex '
+               'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        for shard in SitemapShard.objects.filter(built_at__isnull=False):
+            url = reverse('blog:sitemap_section', args=[
+                shard.section, shard.number
+            ])
+            yield (f'<sitemap><loc>{escape(settings.SITE_URL + url)}</loc>'
+                   f'<lastmod>{shard.built_at.date().isoformat()}</lastmod>'
+                   '</sitemap>\n')
+        yield '</sitemapindex>\n'
+
+    write_gzip(INDEX_FILENAME, lines())
+
+
+def all_shard_numbers(section):
+    """Номера всех частей раздела по максимальному id."""
+    model = {'posts': Post, 'profiles': User, 'categories': Category}[section]
+    last_id = model.objects.order_by('-id').values_list('id', flat=True)
+    last_id = last_id.first()
+    return range(shard_number(last_id) + 1) if last_id else range(0)
+
+
+def build_sitemaps(full=False, since=None):
+    """
+    Пересобирает изменившиеся части карты сайта и индекс.
+
+    :param full: Пересобрать все части.
+    :param since: Время прошлой сборки: части с постами, дата публикации
+        которых наступила после него, тоже пересобираются.
+    :return: Число пересобранных частей.
+    """
+    if since is not None:
+        arrived = Post.objects.filter(
+            pub_date__gt=since, pub_date__lte=timezone.now()
+        ).values_list('id', flat=True)
+        mark_dirty('posts', map(shard_number, arrived.iterator()))
+    built = 0
+    for section in SECTIONS:
+        if full:
+            numbers = all_shard_numbers(section)
+        else:
+            numbers = SitemapShard.objects.filter(
+                section=section, is_dirty=True
+            ).values_list('number', flat=True)
+        for number in list(numbers):
+            build_shard(section, number)
+            built += 1
+    build_index()
+    return built
+
+
+def serve_file(request, filename):
+    """
+    Отдаёт готовый файл карты сайта.
+
+    Клиентам, принимающим gzip, файл отдаётся как есть с
+    Content-Encoding: gzip, остальным — распакованным целиком: у
+    FileResponse над gzip.open Content-Length был бы размером сжатого
+    файла, и такие клиенты получали бы обрезанную карту.
+    """
+    path = Path(settings.SITEMAP_ROOT) / filename
+    if not path.is_file():
+        raise Http404('Карта сайта ещё не собрана')
+    accepted = parse_accept_encoding(
+        request.headers.get('Accept-Encoding', '')
+    )
+    if accepted.get('gzip', accepted.get('*', 0)) > 0:
+        response = FileResponse(
+            path.open('rb'), content_type='application/xml'
+        )
+        response['Content-Encoding'] = 'gzip'
+    else:
+        with gzip.open(path, 'rb') as source:
+            response = HttpResponse(
+                source.read(), content_type='application/xml'
+            )
+    response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+@require_GET
+def sitemap_index(request):
+    return serve_file(request, INDEX_FILENAME)
+
+
+@require_GET
+def sitemap_section(request, section, number):
+    if section not in SECTIONS:
+        raise Http404('Нет такого раздела карты сайта')
+    return serve_file(request, shard_filename(section, number))
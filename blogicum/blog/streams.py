@@ -0,0 +1,215 @@
+"""
+Поток новых комментариев к посту по протоколу server-sent events.
+
+Работает только под ASGI: CommentStreamRouter перехватывает адрес
+blog:comment_stream раньше Django. На каждый пост, у которого есть
+слушатели, приходится один опрашивающий БД CommentBroker; новые
+комментарии он отрисовывает один раз и раздаёт всем подключённым
+клиентам через их очереди. Простаивающее соединение стоит одной
+корутины и не обращается к БД.
+"""
+import asyncio
+import logging
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.urls import Resolver404, resolve
+
+from .async_views import run_in_db_pool
+from .models import Comment, Post
+from .views import get_published_posts
+
+logger = logging.getLogger(__name__)
+
+# Сколько пропущенных комментариев досылать клиенту при переподключении.
+BACKLOG_LIMIT = 50
+
+
+def fetch_comments(post_id, after_id, limit=None):
+    """Возвращает пары (id, html) комментариев поста с id больше after_id."""
+    comments = (
+        Comment.objects
+        .filter(post_id=post_id, id__gt=after_id)
+        .select_related('author')
+        .order_by('id')
+    )
+    if limit:
+        comments = comments[:limit]
+    return [
+        (comment.id,
+         render_to_string('includes/comment.html', {'comment': comment}))
+        for comment in comments
+    ]
+
+
+def last_comment_id(post_id):
+    """Возвращает id последнего комментария или None, если пост скрыт."""
+    if not get_published_posts(
+        Post.objects.filter(id=post_id),
+        use_select_related=False,
+        use_annotation=False,
+    ).exists():
+        return None
+    last = (
+        Comment.objects.filter(post_id=post_id)
+        .order_by('-id').values_list('id', flat=True).first()
+    )
+    return last or 0
+
+
+def format_event(comment_id, html):
+    """Кодирует комментарий в событие SSE."""
+    data = ''.join(f'data: {line}\n' for line in html.splitlines())
+    return f'event: comment\nid: {comment_id}\n{data}\n'.encode('utf-8')
+
+
+class CommentBroker:
+    """Опрашивает БД за всех слушателей одного поста."""
+
+    def __init__(self, post_id, last_id, registry):
+        self.post_id = post_id
+        self.last_id = last_id
+        self.registry = registry
+        self.subscribers = set()
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=settings.COMMENT_STREAM_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    async def run(self):
+        try:
+            while self.subscribers:
+                await asyncio.sleep(settings.COMMENT_STREAM_POLL_INTERVAL)
+                try:
+                    comments = await run_in_db_pool(fetch_comments)(
+                        self.post_id, self.last_id
+                    )
+                except Exception:
+                    logger.exception(
+                        'Не удалось получить комментарии поста %s',
+                        self.post_id
+                    )
+                    continue
+                for comment_id, html in comments:
+                    self.last_id = comment_id
+                    self.publish(format_event(comment_id, html))
+        finally:
+            self.registry.pop(self.post_id, None)
+
+    def publish(self, event):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Клиент не успевает читать: отключаем его, он
+                # переподключится с Last-Event-ID и получит пропущенное.
+                self.subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+
+class CommentStreamRouter:
+    """ASGI-приложение: отдаёт потоки комментариев, остальное — Django."""
+
+    def __init__(self, application):
+        self.application = application
+        self.brokers = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            try:
+                match = resolve(scope['path'])
+            except Resolver404:
+                match = None
+            if match and match.view_name == 'blog:comment_stream':
+                return await self.stream(
+                    scope, receive, send, match.kwargs['post_id']
+                )
+        return await self.application(scope, receive, send)
+
+    async def stream(self, scope, receive, send, post_id):
+        last_id = await run_in_db_pool(last_comment_id)(post_id)
+        if last_id is None:
+            await send({'type': 'http.response.start', 'status': 404,
+                        'headers': [(b'content-type', b'text/plain')]})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        broker = self.brokers.get(post_id)
+        if broker is None:
+            broker = self.brokers[post_id] = CommentBroker(
+                post_id, last_id, self.brokers
+            )
+        queue = broker.subscribe()
+        disconnected = asyncio.get_running_loop().create_task(
+            self.wait_disconnect(receive)
+        )
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream; charset=utf-8'),
+                    (b'cache-control', b'no-cache'),
+                    (b'x-accel-buffering', b'no'),
+                ],
+            })
+            await send({'type': 'http.response.body',
+                        'body': b'retry: 5000\n\n', 'more_body': True})
+            await self.send_backlog(scope, send, post_id, broker.last_id)
+            await self.pump(queue, send, disconnected)
+            if not disconnected.done():
+                await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            broker.unsubscribe(queue)
+            disconnected.cancel()
+
+    async def send_backlog(self, scope, send, post_id, broker_last_id):
+        """Досылает комментарии, пропущенные клиентом до переподключения."""
+        headers = dict(scope.get('headers', ()))
+        try:
+            client_last_id = int(headers.get(b'last-event-id', b''))
+        except ValueError:
+            return
+        if client_last_id >= broker_last_id:
+            return
+        backlog = await run_in_db_pool(fetch_comments)(
+            post_id, client_last_id, BACKLOG_LIMIT
+        )
+        for comment_id, html in backlog:
+            if comment_id <= broker_last_id:
+                await send({'type': 'http.response.body',
+                            'body': format_event(comment_id, html),
+                            'more_body': True})
+
+    async def pump(self, queue, send, disconnected):
+        """Пересылает события клиенту, пока он подключён."""
+        while not disconnected.done():
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {getter, disconnected},
+                timeout=settings.COMMENT_STREAM_HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if getter not in done:
+                getter.cancel()
+                if not done:
+                    await send({'type': 'http.response.body',
+                                'body': b': keepalive\n\n',
+                                'more_body': True})
+                continue
+            event = getter.result()
+            if event is None:
+                return
+            await send({'type': 'http.response.body',
+                        'body': event, 'more_body': True})
+
+    @staticmethod
+    async def wait_disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
@@ -0,0 +1,137 @@
+"""
+Материализованная лента главной страницы (fan-out on write).
+
+Записи TimelineEntry обновляются при сохранении постов, категорий, мест,
+авторов и комментариев (см. blog.signals). Отложенные посты попадают в
+таблицу сразу и отсекаются при чтении условием pub_date < now, поэтому
+наступление даты публикации не требует отдельного обновления.
+"""
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.text import Truncator
+
+from .models import Comment, Post, TimelineEntry
+
+# Сколько слов текста хранить для карточки поста.
+EXCERPT_WORDS = 10
+# Сколько постов перестраивать за один запрос.
+BATCH_SIZE = 1000
+
+
+def get_timeline_entries():
+    """Возвращает видимые записи ленты, от новых к старым."""
+    return TimelineEntry.objects.filter(
+        pub_date__lt=timezone.now()
+    ).order_by('-pub_date')
+
+
+def is_listed(post):
+    """Должен ли пост (без учёта даты публикации) быть в ленте."""
+    return not post.hidden_by and post.deletion_id is None
+
+
+def entry_fields(post):
+    """Поля карточки поста для записи ленты."""
+    location = post.location
+    return {
+        'pub_date': post.pub_date,
+        'title': post.title,
+        'excerpt': Truncator(post.text).words(EXCERPT_WORDS),
+        'image': post.image.name if post.image else '',
+        'image_placeholder': post.image_placeholder,
+        'image_aspect_ratio': post.image_aspect_ratio,
+        'author_id': post.author_id,
+        'author_username': post.author.username,
+        'category_id': post.category_id,
+        'category_slug': post.category.slug,
+        'category_title': post.category.title,
+        'location_id': post.location_id,
+        'location_name': (
+            location.name if location and location.is_published else ''
+        ),
+    }
+
+
+def sync_post(post):
+    """Добавляет, обновляет или убирает запись ленты для поста."""
+    if not is_listed(post):
+        TimelineEntry.objects.filter(post_id=post.id).delete()
+        return
+    fields = entry_fields(post)
+    if not TimelineEntry.objects.filter(post_id=post.id).update(**fields):
+        TimelineEntry.objects.create(
+            post_id=post.id, comment_count=post.comments.count(), **fields
+        )
+
+
+def rebuild(posts=None):
+    """
+    Перестраивает записи ленты для постов порциями по BATCH_SIZE.
+
+    :param posts: Queryset постов; по умолчанию — все посты.
+    :return: Число записей в ленте после перестройки.
+    """
+    if posts is None:
+        TimelineEntry.objects.all().delete()
+        posts = Post.objects.all()
+    posts = posts.filter(hidden_by=0).select_related(
+        'author', 'category', 'location'
+    ).order_by('id')
+    total, last_id = 0, 0
+    while True:
+        batch = list(posts.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not batch:
+            return total
+        post_ids = [post.id for post in batch]
+        # Отдельный запрос по индексу post_id: GROUP BY вместе с выборкой
+        # постов заставил бы SQLite группировать всю таблицу на каждой порции.
+        comment_counts = dict(
+            Comment.objects.filter(post_id__in=post_ids).order_by()
+            .values_list('post_id').annotate(Count('id'))
+        )
+        with transaction.atomic():
+            TimelineEntry.objects.filter(post_id__in=post_ids).delete()
+            TimelineEntry.objects.bulk_create(
+                TimelineEntry(
+                    post_id=post.id,
+                    comment_count=comment_counts.get(post.id, 0),
+                    **entry_fields(post)
+                )
+                for post in batch
+            )
+        total += len(batch)
+        last_id = batch[-1].id
+
+
+def recount_comments(post_ids):
+    """Пересчитывает число комментариев в записях ленты постов."""
+    counts = Comment.objects.filter(
+        post_id=OuterRef('post_id')
+    ).order_by().values('post_id').annotate(total=Count('id'))
+    TimelineEntry.objects.filter(post_id__in=post_ids).update(
+        comment_count=Coalesce(Subquery(counts.values('total')), 0)
+    )
+
+
+def sync_category(category):
+    """Обновляет ленту после изменения категории."""
+    if category.is_published:
+        rebuild(category.posts.all())
+    else:
+        TimelineEntry.objects.filter(category_id=category.id).delete()
+
+
+def sync_location(location, deleted=False):
+    TimelineEntry.objects.filter(location_id=location.id).update(
+        location_name=(
+            location.name if location.is_published and not deleted else ''
+        )
+    )
+
+
+def sync_author(user):
+    TimelineEntry.objects.filter(author_id=user.id).update(
+        author_username=user.username
+    )
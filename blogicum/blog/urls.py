@@ -1,13 +1,26 @@
+from django.conf import settings
 from django.urls import path, include
 
-from . import views
+from . import api, async_views, feeds, sitemaps, views
 
 app_name = 'blog'
 
+# Под ASGI ленты и страницы постов обслуживаются асинхронными вариантами.
+if settings.ASYNC_READ_VIEWS:
+    index_view = async_views.post_list
+    post_detail_view = async_views.post_detail
+    profile_view = async_views.profile
+    category_posts_view = async_views.category_posts
+else:
+    index_view = views.PostListView.as_view()
+    post_detail_view = views.PostDetailView.as_view()
+    profile_view = views.UserDetailView.as_view()
+    category_posts_view = views.CategoryPostListView.as_view()
+
 # Пути, связанные с постами
 post_urls = [
     path('create/', views.PostCreateView.as_view(), name='create_post'),
-    path('<int:post_id>/', views.PostDetailView.as_view(), name='post_detail'),
+    path('<int:post_id>/', post_detail_view, name='post_detail'),
     path('<int:post_id>/edit/', views.edit_post, name='edit_post'),
     path('<int:post_id>/delete/', views.delete_post, name='delete_post'),
 ]
@@ -15,19 +28,61 @@ post_urls = [
 # Пути, связанные с комментариями
 comment_urls = [
     path('<int:post_id>/comment/', views.add_comment, name='add_comment'),
+    path('<int:post_id>/comments/stream/', views.comment_stream,
+         name='comment_stream'),
     path('<int:post_id>/edit_comment/<int:comment_id>/',
          views.edit_comment, name='edit_comment'),
     path('<int:post_id>/delete_comment/<int:comment_id>/',
          views.delete_comment, name='delete_comment'),
 ]
 
+# JSON API только для чтения
+api_urls = [
+    path('posts/', api.post_list, name='api_posts'),
+    path('posts/<int:post_id>/', api.post_detail, name='api_post_detail'),
+    path('posts/<int:post_id>/comments/', api.post_comments,
+         name='api_post_comments'),
+    path('category/<slug:category_slug>/posts/', api.category_posts,
+         name='api_category_posts'),
+    path('profile/<str:username>/posts/', api.profile_posts,
+         name='api_profile_posts'),
+]
+
+# Ленты RSS и Atom
+feed_urls = [
+    path('rss/', feeds.cached_feed(feeds.LatestPostsFeed()), name='feed_rss'),
+    path('atom/', feeds.cached_feed(feeds.LatestPostsAtomFeed()),
+         name='feed_atom'),
+    path('category/<slug:category_slug>/rss/',
+         feeds.cached_feed(feeds.CategoryPostsFeed()),
+         name='category_feed_rss'),
+    path('category/<slug:category_slug>/atom/',
+         feeds.cached_feed(feeds.CategoryPostsAtomFeed()),
+         name='category_feed_atom'),
+    path('profile/<str:username>/rss/',
+         feeds.cached_feed(feeds.AuthorPostsFeed()),
+         name='profile_feed_rss'),
+    path('profile/<str:username>/atom/',
+         feeds.cached_feed(feeds.AuthorPostsAtomFeed()),
+         name='profile_feed_atom'),
+]
+
 urlpatterns = [
-    path('', views.PostListView.as_view(), name='index'),
+    path('', index_view, name='index'),
     path('posts/', include(post_urls)),
     path('posts/', include(comment_urls)),
+    path('api/', include(api_urls)),
+    path('feeds/', include(feed_urls)),
+    path('sitemap.xml', sitemaps.sitemap_index, name='sitemap_index'),
+    path('sitemap-<slug:section>-<int:number>.xml', sitemaps.sitemap_section,
+         name='sitemap_section'),
     path('edit_profile/', views.edit_profile, name='edit_profile'),
-    path('profile/<str:username>/', views.UserDetailView.as_view(),
-         name='profile'),
-    path('category/<slug:category_slug>/',
-         views.CategoryPostListView.as_view(), name='category_posts'),
+    path('follow/', views.follow_feed, name='follow_feed'),
+    path('profile/<str:username>/', profile_view, name='profile'),
+    path('profile/<str:username>/follow/', views.follow_author,
+         name='follow_author'),
+    path('profile/<str:username>/unfollow/', views.unfollow_author,
+         name='unfollow_author'),
+    path('category/<slug:category_slug>/', category_posts_view,
+         name='category_posts'),
 ]
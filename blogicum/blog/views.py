@@ -1,18 +1,26 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.models import User
 from django.contrib.auth.views import LoginView
 from django.core.paginator import Paginator
-from django.db.models import Count
 from django.db.models.query import QuerySet
-from django.http import Http404
+from django.http import Http404, HttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.utils import timezone
 from django.urls import reverse_lazy, reverse
+from django.utils.decorators import method_decorator
 from django.views.generic import CreateView, ListView, DetailView
 
+from core.brownout import is_brownout
+from core.ratelimit import ratelimit
+
+from .following import follow, get_feed_post_ids, get_feed_posts, unfollow
 from .forms import CommentCreateForm, PostForm, UserEditForm
-from .models import Category, Post, Comment
+from .models import (
+    Category, Comment, CommentNotification, Follow, Post, count_comments
+)
+from .timeline import get_timeline_entries
 
 POSTS_ON_PAGE = 10
 
@@ -39,38 +47,63 @@ def get_published_posts(
     :return: Отфильтрованный и оптимизированный queryset.
     """
     if use_filtering:
-        posts = posts.filter(
-            pub_date__lt=timezone.now(),
-            is_published=True,
-            category__is_published=True,
-        )
+        posts = posts.filter(pub_date__lt=timezone.now(), hidden_by=0)
     if use_select_related:
         posts = posts.select_related('category', 'location', 'author')
     if use_annotation:
-        posts = posts.annotate(comment_count=Count('comments'))
+        posts = posts.annotate(comment_count=count_comments())
     return posts.order_by('-pub_date')
 
 
+def get_visible_post_or_404(post_id, user):
+    """
+    Возвращает пост, если пользователь может его видеть, иначе 404.
+
+    Автор видит свой пост всегда, остальные — только опубликованный,
+    в опубликованной категории и с наступившей датой публикации.
+    """
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'category', 'location'),
+        id=post_id
+    )
+    if post.author_id != user.id and (
+        post.hidden_by or post.pub_date > timezone.now()
+    ):
+        raise Http404("Пост не найден")
+    return post
+
+
 class PostListView(ListView):
     """Отображает список опубликованных постов."""
 
     paginate_by = POSTS_ON_PAGE
     template_name = 'blog/index.html'
-    queryset = get_published_posts(
-        use_filtering=True,
-        use_select_related=True,
-        use_annotation=True
-    )
+
+    def get_queryset(self):
+        """Возвращает записи материализованной ленты главной страницы."""
+        return get_timeline_entries()
+
+    def paginate_queryset(self, queryset, page_size):
+        """Превращает записи ленты на странице в посты для карточек."""
+        paginator, page, entries, is_paginated = super().paginate_queryset(
+            queryset, page_size
+        )
+        page.object_list = [entry.as_post() for entry in entries]
+        return paginator, page, page.object_list, is_paginated
 
 
 @login_required
 def delete_post(request, post_id):
-    """Удаляет пост, если пользователь является его автором."""
+    """
+    Удаляет пост, если пользователь является его автором.
+
+    Пост скрывается сразу, а строки с комментариями удалит purge_deleted.
+    """
     post = get_object_or_404(Post, id=post_id)
-    if post.author != request.user:
+    if post.author_id != request.user.id:
         return redirect('blog:post_detail', post_id)
     if request.method == 'POST':
-        post.delete()
+        post.soft_delete()
         return redirect('blog:profile', request.user.username)
     return render(
         request,
@@ -83,7 +116,7 @@ def delete_post(request, post_id):
 def edit_post(request, post_id):
     """Редактирует пост, если пользователь является его автором."""
     post = get_object_or_404(Post, id=post_id)
-    if post.author != request.user:
+    if post.author_id != request.user.id:
         return redirect('blog:post_detail', post_id=post_id)
 
     form = PostForm(request.POST or None, instance=post)
@@ -100,7 +133,7 @@ def edit_post(request, post_id):
 def edit_comment(request, post_id, comment_id):
     """Редактирует комментарий, если пользователь является его автором."""
     comment = get_object_or_404(Comment, id=comment_id, post_id=post_id)
-    if comment.author != request.user:
+    if comment.author_id != request.user.id:
         return redirect('blog:post_detail', post_id=post_id)
 
     form = CommentCreateForm(request.POST or None, instance=comment)
@@ -117,11 +150,11 @@ def edit_comment(request, post_id, comment_id):
 def delete_comment(request, post_id, comment_id):
     """Удаляет комментарий, если пользователь является его автором."""
     comment = get_object_or_404(Comment, id=comment_id, post_id=post_id)
-    if comment.author != request.user:
+    if comment.author_id != request.user.id:
         return redirect('blog:post_detail', post_id=post_id)
 
     if request.method == 'POST':
-        comment.delete()
+        comment.soft_delete()
         return redirect('blog:post_detail', post_id=post_id)
 
     return render(
@@ -130,6 +163,7 @@ def delete_comment(request, post_id, comment_id):
 
 
 @login_required
+@ratelimit('comment')
 def add_comment(request, post_id):
     """Добавляет комментарий к посту."""
     post = get_object_or_404(Post, id=post_id)
@@ -140,11 +174,24 @@ def add_comment(request, post_id):
         comment.post = post
         comment.author = request.user
         comment.save()
+        if post.author_id != request.user.id:
+            # Письмо не отправляем: уведомления собираются в дайджесты
+            # командой send_comment_digests.
+            CommentNotification.objects.create(
+                recipient_id=post.author_id, comment=comment
+            )
         return redirect('blog:post_detail', post_id=post.id)
 
     return render(request, 'detail.html', {'form': form, 'post': post})
 
 
+def comment_stream(request, post_id):
+    """Заглушка: поток комментариев отдаёт ASGI-приложение (blog.streams)."""
+    return HttpResponse(
+        'Поток комментариев доступен только под ASGI.', status=503
+    )
+
+
 class PostDetailView(DetailView):
     """Отображает детальную информацию о посте."""
 
@@ -154,26 +201,29 @@ class PostDetailView(DetailView):
 
     def get_object(self, queryset=None):
         """Возвращает пост с проверкой условий отображения."""
-        post = get_object_or_404(
-            Post.objects.select_related('author', 'category', 'location'),
-            id=self.kwargs['post_id']
+        return get_visible_post_or_404(
+            self.kwargs['post_id'], self.request.user
         )
 
-        if post.author != self.request.user and (
-            not post.is_published
-            or not post.category.is_published
-            or post.pub_date > timezone.now()
-        ):
-            raise Http404("Пост не найден")
-        return post
+    def get_comments(self):
+        """Возвращает комментарии; в brownout — только последние."""
+        comments = (Comment.objects.filter(post=self.kwargs['post_id'])
+                    .select_related('author'))
+        if not is_brownout():
+            return comments
+        limit = settings.BROWNOUT_COMMENTS_LIMIT
+        return list(comments.order_by('-id')[:limit])[::-1]
 
     def get_context_data(self, **kwargs):
         """Добавляет комментарии и форму в контекст."""
         return super().get_context_data(
             **kwargs,
-            comments=Comment.objects
-            .filter(post=self.kwargs['post_id']).select_related('author'),
-            form=CommentCreateForm()
+            comments=self.get_comments(),
+            form=CommentCreateForm(),
+            comment_stream_url=(
+                reverse('blog:comment_stream', args=[self.object.id])
+                if settings.COMMENT_STREAM_ENABLED else None
+            )
         )
 
 
@@ -193,8 +243,10 @@ class CategoryPostListView(ListView):
 
     def get_queryset(self):
         """Возвращает queryset с постами категории."""
-        return (get_published_posts(self.get_category_or_404().posts)
-                .order_by('-pub_date'))
+        return get_published_posts(
+            self.get_category_or_404().posts,
+            use_annotation=not is_brownout()
+        )
 
     def get_context_data(self, **kwargs):
         """Добавляет категорию в контекст."""
@@ -204,6 +256,7 @@ class CategoryPostListView(ListView):
         )
 
 
+@method_decorator(ratelimit('post'), name='dispatch')
 class PostCreateView(LoginRequiredMixin, CreateView):
     """Создает новый пост."""
 
@@ -242,8 +295,10 @@ class UserDetailView(ListView):
     template_name = 'blog/profile.html'
 
     def get_user(self):
-        """Возвращает пользователя по username."""
-        return get_object_or_404(User, username=self.kwargs['username'])
+        """Возвращает активного пользователя по username."""
+        return get_object_or_404(
+            User, username=self.kwargs['username'], is_active=True
+        )
 
     def get_queryset(self):
         """Возвращает queryset с постами пользователя."""
@@ -252,16 +307,48 @@ class UserDetailView(ListView):
             user.posts,
             use_filtering=self.request.user != user,
             use_select_related=True,
-            use_annotation=True
+            use_annotation=not is_brownout()
         )
 
     def get_context_data(self, **kwargs):
-        """Добавляет профиль пользователя в контекст."""
+        """Добавляет профиль пользователя и подписку на него в контекст."""
         context = super().get_context_data(**kwargs)
-        context['profile'] = self.get_user()
+        context['profile'] = profile = self.get_user()
+        context['is_following'] = (
+            self.request.user.is_authenticated
+            and Follow.objects.filter(
+                user=self.request.user, author=profile
+            ).exists()
+        )
         return context
 
 
+@login_required
+def follow_author(request, username):
+    """Подписывает текущего пользователя на автора."""
+    author = get_object_or_404(User, username=username)
+    if request.method == 'POST' and author != request.user:
+        follow(request.user, author)
+    return redirect('blog:profile', username)
+
+
+@login_required
+def unfollow_author(request, username):
+    """Отписывает текущего пользователя от автора."""
+    author = get_object_or_404(User, username=username)
+    if request.method == 'POST':
+        unfollow(request.user, author)
+    return redirect('blog:profile', username)
+
+
+@login_required
+def follow_feed(request):
+    """Отображает ленту постов авторов, на которых подписан пользователь."""
+    page = get_paginator_page(request, get_feed_post_ids(request.user))
+    page.object_list = get_feed_posts(page.object_list)
+    return render(request, 'blog/follow.html', {'page_obj': page})
+
+
 @login_required
 def edit_profile(request):
     """Редактирует профиль пользователя."""
@@ -12,5 +12,10 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
+os.environ.setdefault('BLOGICUM_ASYNC_READ_VIEWS', '1')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from blog.streams import CommentStreamRouter  # noqa: E402
+
+application = CommentStreamRouter(django_application)
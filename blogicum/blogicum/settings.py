@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -35,6 +36,7 @@ ALLOWED_HOSTS = [
 INSTALLED_APPS = [
     'blog.apps.BlogConfig',
     'pages.apps.PagesConfig',
+    'core.apps.CoreConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -46,10 +48,16 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.metrics.MetricsMiddleware',
+    'core.sql.QueryInstrumentationMiddleware',
+    'core.static.StaticFilesMiddleware',
+    'core.loadshed.LoadSheddingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.timing.ServerTimingMiddleware',
+    'core.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -69,6 +77,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.brownout',
             ],
         },
     },
@@ -88,6 +97,28 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Ограничения частоты запросов хранят счётчики в кеше, поэтому в
+# продакшене он должен быть общим для процессов: адрес memcached задаёт
+# переменная окружения BLOGICUM_MEMCACHED (например, 127.0.0.1:11211).
+# С кешем процесса и DEBUG = False core.ratelimit не даёт запуститься.
+
+if os.environ.get('BLOGICUM_MEMCACHED'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.MeteredPyMemcacheCache',
+            'LOCATION': os.environ['BLOGICUM_MEMCACHED'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.MeteredLocMemCache',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -126,6 +157,12 @@ USE_TZ = True
 
 STATIC_URL = '/static_dev/'
 
+# Сюда collectstatic складывает файлы с хешами в именах и их сжатые
+# варианты (.gz, .br); раздаёт их core.static.StaticFilesMiddleware.
+STATIC_ROOT = BASE_DIR / 'static'
+
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -146,7 +183,158 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 USE_L10N = False
 
-# Подключаем бэкенд filebased.EmailBackend:
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Ограничения частоты запросов (core.ratelimit): для каждой области —
+# корзины по пользователю, по IP и общая на адрес ('endpoint').
+# Лимит '10/m' — не больше 10 запросов за любые 60 секунд.
+RATELIMIT_ENABLED = True
+RATELIMITS = {
+    'comment': {'user': '20/m', 'ip': '120/m', 'endpoint': '600/m'},
+    'post': {'user': '10/m', 'ip': '60/m', 'endpoint': '300/m'},
+    'registration': {'ip': '10/h', 'endpoint': '300/h'},
+}
+
+# Бюджеты представлений (core.budgets) по имени URL: число запросов к БД
+# и время ответа в миллисекундах на тестовых данных. Проверяются
+# тестами tests/test_budgets.py; время — только с --budget-time-factor.
+VIEW_BUDGETS = {
+    'blog:index': {'queries': 4, 'time_ms': 250},
+    'blog:post_detail': {'queries': 4, 'time_ms': 250},
+    'blog:category_posts': {'queries': 6, 'time_ms': 250},
+    'blog:profile': {'queries': 7, 'time_ms': 250},
+    'blog:follow_feed': {'queries': 6, 'time_ms': 250},
+    'blog:add_comment': {'queries': 6, 'time_ms': 150},
+    'blog:api_posts': {'queries': 3, 'time_ms': 100},
+    'blog:api_post_detail': {'queries': 4, 'time_ms': 100},
+    'blog:feed_rss': {'queries': 2, 'time_ms': 100},
+}
+
+# Сброс нагрузки (core.loadshed): если в процессе больше
+# LOADSHED_MAX_IN_FLIGHT запросов или среднее время ответа страницы
+# превышает LOADSHED_LATENCY_THRESHOLD секунд, второстепенные запросы
+# получают 503. Страницы из LOADSHED_PROTECTED_VIEWS не отклоняются никогда.
+# Среднее время ответа затухает вдвое за LOADSHED_LATENCY_HALF_LIFE секунд
+# без новых замеров, чтобы страница, которой отказывают, снова получала
+# запросы.
+LOADSHED_ENABLED = True
+LOADSHED_MAX_IN_FLIGHT = 32
+LOADSHED_LATENCY_THRESHOLD = 2.0
+LOADSHED_LATENCY_HALF_LIFE = 30
+LOADSHED_DEEP_PAGE = 5
+LOADSHED_LOW_PRIORITY_VIEWS = ()
+LOADSHED_PROTECTED_VIEWS = ('login', 'blog:add_comment')
+LOADSHED_RETRY_AFTER = 5
+
+# Профилирование запросов (core.profiling): сотрудники включают его для
+# запроса заголовком X-Profile или параметром ?profile=1, кроме того
+# профилируется доля PROFILING_SAMPLE_RATE всех запросов. Режим 'cprofile'
+# пишет .prof, 'sampling' — свёрнутые стеки с шагом
+# PROFILING_SAMPLE_INTERVAL секунд. Выключенное профилирование ничего
+# не стоит: middleware не подключается.
+PROFILING_ENABLED = False
+PROFILING_MODE = 'cprofile'
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_SAMPLE_INTERVAL = 0.005
+PROFILING_DIR = BASE_DIR / 'profiles'
+
+# Учёт SQL-запросов (core.sql): число и время запросов по представлениям,
+# журнал запросов дольше SQL_SLOW_QUERY_THRESHOLD секунд и предупреждение
+# о N+1, если один и тот же запрос повторился SQL_NPLUSONE_THRESHOLD раз.
+SQL_INSTRUMENTATION_ENABLED = True
+SQL_SLOW_QUERY_THRESHOLD = 0.1
+SQL_NPLUSONE_THRESHOLD = 5
+
+# Метрики Prometheus (core.metrics) на /metrics: процессы сбрасывают свои
+# метрики в METRICS_DIR не чаще раза в METRICS_FLUSH_INTERVAL секунд.
+# Метрики доступны сотрудникам и сборщику с заголовком
+# «Authorization: Bearer <METRICS_TOKEN>»; без токена — только сотрудникам.
+METRICS_ENABLED = True
+METRICS_DIR = BASE_DIR / 'metrics'
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = os.environ.get('BLOGICUM_METRICS_TOKEN', '')
+
+# Заголовок Server-Timing (core.timing) при SERVER_TIMING_ENABLED: только
+# сотрудникам или, без SERVER_TIMING_STAFF_ONLY, всем. При
+# TEMPLATE_METRICS_ENABLED (и METRICS_ENABLED) время шаблонов по именам и
+# местам {% include %} собирается в метрики для всех запросов. Если оба
+# выключены, отрисовка шаблонов не замеряется совсем.
+SERVER_TIMING_ENABLED = False
+SERVER_TIMING_STAFF_ONLY = True
+TEMPLATE_METRICS_ENABLED = False
+
+# Ленты RSS/Atom: число записей и срок хранения готовой ленты в кеше, с.
+# Кеш сбрасывается и раньше — при любом изменении постов: версия
+# содержимого (blog.caching) хранится в общем для процессов файле.
+FEED_ITEMS = 20
+FEED_CACHE_TIMEOUT = 60 * 60
+CONTENT_VERSION_PATH = BASE_DIR / 'state' / 'content-version.json'
+
+# Карта сайта (blog.sitemaps): файлы собирает команда build_sitemaps в
+# SITEMAP_ROOT, посты и профили делятся на части по SITEMAP_SHARD_SIZE id.
+SITEMAP_ROOT = BASE_DIR / 'sitemaps'
+SITEMAP_SHARD_SIZE = 10000
+
+# Лента подписок (blog.following): посты авторов с числом подписчиков не
+# больше FEED_FANOUT_MAX_FOLLOWERS раскладываются по входящим подписчиков
+# при публикации, посты более популярных авторов подмешиваются при чтении.
+# Во входящих хранится не больше FEED_INBOX_SIZE постов на пользователя.
+FEED_FANOUT_MAX_FOLLOWERS = 1000
+FEED_INBOX_SIZE = 500
+
+# Очистка мягко удалённых постов, комментариев и пользователей
+# (purge_deleted): сколько строк удалять за одну транзакцию.
+PURGE_BATCH_SIZE = 500
+
+# Режим brownout (core.brownout): 'on', 'off' или 'auto' — включать, когда
+# среднее время ответа страницы выше BROWNOUT_LATENCY_SLO секунд. Время
+# ответа копит core.loadshed.LoadSheddingMiddleware (в режиме 'auto' — даже
+# при LOADSHED_ENABLED = False) и затухает по LOADSHED_LATENCY_HALF_LIFE.
+# Включённый режим держится не меньше BROWNOUT_HOLD секунд; состояние
+# проверяется раз в BROWNOUT_CHECK_INTERVAL секунд. Флаги режима, общие
+# для всех процессов, лежат в BROWNOUT_DIR.
+BROWNOUT_MODE = 'auto'
+BROWNOUT_DIR = BASE_DIR / 'brownout'
+BROWNOUT_LATENCY_SLO = 1.0
+BROWNOUT_HOLD = 30
+BROWNOUT_CHECK_INTERVAL = 1
+BROWNOUT_COMMENTS_LIMIT = 20
+
+# Асинхронные представления чтения ленты и постов включаются при запуске
+# под ASGI (см. blogicum/asgi.py); работа с БД идёт в пуле из
+# ASYNC_DB_POOL_SIZE потоков.
+ASYNC_READ_VIEWS = os.environ.get('BLOGICUM_ASYNC_READ_VIEWS') == '1'
+ASYNC_DB_POOL_SIZE = 8
+
+# Поток новых комментариев (SSE) обслуживается только приложением ASGI:
+# один опрос БД раз в COMMENT_STREAM_POLL_INTERVAL секунд на пост.
+COMMENT_STREAM_ENABLED = ASYNC_READ_VIEWS
+COMMENT_STREAM_POLL_INTERVAL = 2
+COMMENT_STREAM_HEARTBEAT = 15
+COMMENT_STREAM_QUEUE_SIZE = 100
+
+# Письма ставятся в очередь в БД и не задерживают запрос; команда
+# send_queued_mail отправляет их пачками бэкендом filebased.EmailBackend:
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+QUEUED_EMAIL_DELIVERY_BACKEND = (
+    'django.core.mail.backends.filebased.EmailBackend'
+)
+QUEUED_EMAIL_BATCH_SIZE = 100
+QUEUED_EMAIL_MAX_ATTEMPTS = 5
+# Пауза перед повторной отправкой, с; удваивается с каждой попыткой.
+QUEUED_EMAIL_RETRY_DELAY = 60
+# На сколько секунд команда забирает пачку: другие экземпляры её не
+# отправят, а после падения отправителя письма вернутся в очередь.
+QUEUED_EMAIL_CLAIM_TIMEOUT = 600
 # Указываем директорию, в которую будут сохраняться файлы писем:
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
+
+# Адрес сайта для ссылок в письмах.
+SITE_URL = 'http://127.0.0.1:8000'
+
+# Дайджесты комментариев (send_comment_digests): не чаще одного письма
+# автору за интервал в секундах, не больше стольких комментариев в письме.
+# Уведомления забираются пачками по COMMENT_DIGEST_BATCH_SIZE авторов на
+# COMMENT_DIGEST_CLAIM_TIMEOUT секунд, как письма очереди.
+COMMENT_DIGEST_INTERVAL = 60 * 60
+COMMENT_DIGEST_MAX_COMMENTS = 20
+COMMENT_DIGEST_BATCH_SIZE = 100
+COMMENT_DIGEST_CLAIM_TIMEOUT = 600
@@ -0,0 +1,22 @@
+"""
+Настройки для нагрузочных замеров (benchmarks/blog_views.py).
+
+Совпадают с обычными, кроме режима отладки, ограничения частоты
+запросов и базы данных: путь к базе с синтетическим набором данных
+передаётся в переменной окружения BLOGICUM_BENCHMARK_DB.
+"""
+import os
+
+from .settings import *  # noqa: F401, F403
+from .settings import ALLOWED_HOSTS, DATABASES
+
+# В режиме отладки Django хранит текст каждого запроса к БД
+# и показывает подробные страницы ошибок: замеры были бы завышены.
+DEBUG = False
+# Клиент django.test.Client обращается к серверу testserver.
+ALLOWED_HOSTS = [*ALLOWED_HOSTS, 'testserver']
+
+DATABASES['default']['NAME'] = os.environ['BLOGICUM_BENCHMARK_DB']
+
+# Замер add_comment отправляет сотни комментариев от одного пользователя.
+RATELIMIT_ENABLED = False
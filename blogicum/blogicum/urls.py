@@ -7,6 +7,8 @@ from django.views.generic.edit import CreateView
 from django.urls import include, path, reverse_lazy, path, include
 
 from blog.views import UserLoginView
+from core.metrics import metrics_view
+from core.ratelimit import ratelimit
 
 handler404 = 'pages.views.error404'
 handler500 = 'pages.views.error500'
@@ -15,14 +17,15 @@ urlpatterns = [
     path('', include('blog.urls', namespace='blog')),
     path('pages/', include('pages.urls', namespace='pages')),
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
 
     path(
         'auth/registration/',
-        CreateView.as_view(
+        ratelimit('registration')(CreateView.as_view(
             template_name='registration/registration_form.html',
             form_class=UserCreationForm,
             success_url=reverse_lazy('blog:index'),
-        ),
+        )),
         name='registration',
     ),
 
@@ -0,0 +1,18 @@
+from django.contrib import admin
+
+from .models import QueuedEmail
+
+
+@admin.register(QueuedEmail)
+class QueuedEmailAdmin(admin.ModelAdmin):
+    """QueuedEmailAdmin."""
+
+    list_display = (
+        'recipients',
+        'created_at',
+        'next_attempt_at',
+        'attempts',
+        'is_dead',
+    )
+    list_filter = ('is_dead',)
+    readonly_fields = ('message',)
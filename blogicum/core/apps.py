@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core'
+    verbose_name = 'Инфраструктура'
+
+    def ready(self):
+        from . import ratelimit, sql
+        ratelimit.check_shared_cache()
+        if settings.SQL_INSTRUMENTATION_ENABLED:
+            connection_created.connect(
+                sql.install_wrapper, dispatch_uid='core.sql.install_wrapper'
+            )
@@ -0,0 +1,114 @@
+"""
+Режим частичного отключения дорогих элементов страниц (brownout).
+
+В режиме brownout шаблоны не показывают счётчики комментариев в
+карточках и полный список комментариев к посту, а пагинатор — только
+соседние страницы. Режим задаётся настройкой BROWNOUT_MODE или флагом
+в каталоге BROWNOUT_DIR (команда brownout); в режиме 'auto' он
+включается, когда затухающее среднее время ответа какой-либо страницы
+(его копит
+LoadSheddingMiddleware из core.loadshed, подключённый в MIDDLEWARE;
+при BROWNOUT_MODE = 'auto' он работает и без LOADSHED_ENABLED)
+превышает BROWNOUT_LATENCY_SLO, и выключается, когда среднее затухнет
+или снизится.
+
+Флаги хранятся в файлах (core.sharedstate), а не в кеше: кеш у каждого
+процесса свой, и флаг, выставленный командой, не увидел бы ни один
+воркер.
+"""
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+from .loadshed import tracker
+from .sharedstate import read_state, write_state
+
+ACTIVE_FLAG = 'active'
+FORCED_FLAG = 'forced'
+# Выключаем режим, только когда время ответа опустится заметно ниже SLO,
+# чтобы он не переключался туда-обратно на границе.
+RECOVERY_RATIO = 0.5
+
+
+def flag_path(name):
+    return Path(settings.BROWNOUT_DIR) / f'{name}.json'
+
+
+def set_flag(name, value, timeout=None):
+    """Записывает флаг, видимый всем процессам."""
+    write_state(flag_path(name), {
+        'value': value,
+        'expires_at': time.time() + timeout if timeout else None,
+    })
+
+
+def get_flag(name):
+    """Значение флага или None, если его нет или срок истёк."""
+    flag = read_state(flag_path(name))
+    if flag is None:
+        return None
+    if flag['expires_at'] is not None and flag['expires_at'] <= time.time():
+        return None
+    return flag['value']
+
+
+def clear_flags(*names):
+    for name in names:
+        flag_path(name).unlink(missing_ok=True)
+
+
+class BrownoutController:
+    """Решает, включён ли режим, проверяя состояние не чаще интервала."""
+
+    def __init__(self):
+        self.active = False
+        self.checked_at = None
+
+    def is_active(self):
+        now = time.monotonic()
+        if (
+            self.checked_at is None
+            or now - self.checked_at >= settings.BROWNOUT_CHECK_INTERVAL
+        ):
+            self.checked_at = now
+            self.active = self.evaluate()
+        return self.active
+
+    def evaluate(self):
+        mode = get_flag(FORCED_FLAG) or settings.BROWNOUT_MODE
+        if mode != 'auto':
+            return mode == 'on'
+        slo = settings.BROWNOUT_LATENCY_SLO
+        threshold = slo * RECOVERY_RATIO if self.active else slo
+        if tracker.max_latency() > threshold:
+            # Флаг включает режим во всех процессах и держит его не
+            # меньше BROWNOUT_HOLD секунд.
+            set_flag(ACTIVE_FLAG, True, settings.BROWNOUT_HOLD)
+            return True
+        return bool(get_flag(ACTIVE_FLAG))
+
+    def reset(self):
+        self.checked_at = None
+
+
+controller = BrownoutController()
+
+
+def is_brownout():
+    """Включён ли сейчас режим brownout."""
+    return controller.is_active()
+
+
+def force(mode, timeout=None):
+    """
+    Переключает режим во всех процессах через флаг в BROWNOUT_DIR.
+
+    :param mode: 'on', 'off' или 'auto' — вернуть автоматическое управление.
+    :param timeout: Через сколько секунд снять принудительный режим.
+    """
+    if mode == 'auto':
+        clear_flags(FORCED_FLAG, ACTIVE_FLAG)
+    else:
+        set_flag(FORCED_FLAG, mode, timeout)
+    controller.reset()
@@ -0,0 +1,71 @@
+"""
+Бюджеты представлений: сколько запросов к БД и миллисекунд допустимо
+на ответ страницы с тестовыми данными.
+
+Бюджеты задаются в settings.VIEW_BUDGETS по имени URL и проверяются
+в тестах фикстурой view_budget (tests/fixtures/budgets.py): число
+запросов — всегда, время — только с ненулевым --budget-time-factor,
+потому что на общих машинах оно нестабильно. Сообщение
+о превышении перечисляет выполненные запросы и повторяющиеся отпечатки.
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+Budget = namedtuple('Budget', 'queries time_ms')
+
+
+def get_budget(view_name):
+    """Бюджет представления из settings.VIEW_BUDGETS."""
+    try:
+        return Budget(**settings.VIEW_BUDGETS[view_name])
+    except KeyError:
+        raise ImproperlyConfigured(
+            f'Для {view_name} нет бюджета в VIEW_BUDGETS'
+        )
+
+
+def format_queries(log):
+    """Строки отчёта: каждый запрос журнала и повторяющиеся отпечатки."""
+    lines = [
+        f'{number:3}. {duration * 1000:7.2f} мс  {sql}'
+        for number, (sql, duration) in enumerate(log.queries, 1)
+    ]
+    repeated = [
+        (key, count) for key, count in log.fingerprints.most_common()
+        if count > 1
+    ]
+    if repeated:
+        lines.append('Повторяющиеся запросы:')
+        lines.extend(f'{count:5} × {key}' for key, count in repeated)
+    return lines
+
+
+def check_budget(view_name, log, duration, time_factor=1.0):
+    """
+    Сравнивает запрос с бюджетом представления.
+
+    :param log: QueryLog запроса.
+    :param duration: Время ответа в секундах.
+    :param time_factor: Множитель бюджета времени для медленных машин.
+    :return: Описание превышений или пустая строка.
+    """
+    budget = get_budget(view_name)
+    problems = []
+    if log.count > budget.queries:
+        problems.append(
+            f'{log.count} запросов к БД при бюджете {budget.queries}'
+        )
+    time_ms = duration * 1000
+    if time_ms > budget.time_ms * time_factor:
+        problems.append(
+            f'ответ за {time_ms:.0f} мс при бюджете '
+            f'{budget.time_ms * time_factor:.0f} мс'
+        )
+    if not problems:
+        return ''
+    return '\n'.join([
+        f'{view_name}: ' + '; '.join(problems),
+        *format_queries(log),
+    ])
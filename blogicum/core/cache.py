@@ -0,0 +1,53 @@
+"""
+Кеши со счётчиками попаданий и промахов для core.metrics.
+
+Время обращений к кешу идёт в Server-Timing (core.timing).
+"""
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import PyMemcacheCache
+
+from .metrics import registry
+from .timing import record_cache
+
+MISSING = object()
+
+
+def namespace(key):
+    """Пространство ключа — первые две части имени через двоеточие."""
+    return ':'.join(str(key).split(':', 2)[:2])
+
+
+class MeteredCacheMixin:
+    """
+    Считает попадания и промахи get по пространствам ключей.
+
+    get_many базового класса сам вызывает get для каждого ключа.
+    """
+
+    def get(self, key, default=None, version=None):
+        started = time.perf_counter()
+        value = super().get(key, MISSING, version)
+        record_cache(time.perf_counter() - started)
+        hit = value is not MISSING
+        registry.inc(
+            'blogicum_cache_hits_total' if hit
+            else 'blogicum_cache_misses_total',
+            (('namespace', namespace(key)),)
+        )
+        return value if hit else default
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        started = time.perf_counter()
+        super().set(key, value, timeout, version)
+        record_cache(time.perf_counter() - started)
+
+
+class MeteredLocMemCache(MeteredCacheMixin, LocMemCache):
+    pass
+
+
+class MeteredPyMemcacheCache(MeteredCacheMixin, PyMemcacheCache):
+    """Общий для процессов кеш; нужен пакет pymemcache."""
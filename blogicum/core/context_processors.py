@@ -0,0 +1,6 @@
+from .brownout import is_brownout
+
+
+def brownout(request):
+    """Передаёт в шаблоны признак режима brownout."""
+    return {'brownout': is_brownout()}
@@ -0,0 +1,163 @@
+"""
+Сброс нагрузки: быстрый отказ низкоприоритетным запросам при перегрузке.
+
+Процесс считает запросы в обработке и скользящее среднее времени ответа
+для каждого представления. Когда запросов слишком много или страница
+отвечает дольше порога, второстепенные запросы (глубокая пагинация для
+анонимов, поиск, выгрузки) получают 503 с Retry-After, а вход на сайт и
+отправка комментариев продолжают работать.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+
+# Вес нового замера в скользящем среднем времени ответа.
+EWMA_ALPHA = 0.2
+SEARCH_PARAMS = ('q', 'search')
+
+
+class LoadTracker:
+    """
+    Счётчик запросов в обработке и времени ответа по представлениям.
+
+    Среднее время ответа затухает со временем с полупериодом
+    LOADSHED_LATENCY_HALF_LIFE: отказы не обновляют среднее, и без
+    затухания представление, которому отказывают во всех запросах,
+    не смогло бы выйти из перегрузки. Затухшее среднее опускается ниже
+    порога, следующий запрос проходит и даёт свежий замер.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        # Представление -> (среднее время ответа, момент замера).
+        self.latency = {}
+
+    def started(self):
+        with self.lock:
+            self.in_flight += 1
+
+    def finished(self, view_name, duration):
+        with self.lock:
+            self.in_flight -= 1
+        if view_name is not None:
+            self.observe(view_name, duration)
+
+    def observe(self, view_name, duration):
+        now = time.monotonic()
+        with self.lock:
+            previous = self.decayed(self.latency.get(view_name), now)
+            self.latency[view_name] = (
+                duration if previous is None
+                else previous + EWMA_ALPHA * (duration - previous),
+                now,
+            )
+
+    @staticmethod
+    def decayed(entry, now):
+        if entry is None:
+            return None
+        value, measured_at = entry
+        return value * 0.5 ** (
+            (now - measured_at) / settings.LOADSHED_LATENCY_HALF_LIFE
+        )
+
+    def latency_of(self, view_name):
+        """Затухшее среднее время ответа представления, с."""
+        return self.decayed(
+            self.latency.get(view_name), time.monotonic()
+        ) or 0
+
+    def max_latency(self):
+        """Наибольшее затухшее среднее время ответа по представлениям."""
+        now = time.monotonic()
+        return max(
+            (self.decayed(entry, now) for entry in list(
+                self.latency.values()
+            )),
+            default=0
+        )
+
+    def overloaded(self, view_name):
+        """Перегружен ли процесс в целом или конкретное представление."""
+        return (
+            self.in_flight > settings.LOADSHED_MAX_IN_FLIGHT
+            or self.latency_of(view_name)
+            > settings.LOADSHED_LATENCY_THRESHOLD
+        )
+
+
+tracker = LoadTracker()
+
+
+def is_low_priority(request, view_name):
+    """Можно ли отказать запросу первым при перегрузке."""
+    if view_name in settings.LOADSHED_PROTECTED_VIEWS:
+        return False
+    if view_name in settings.LOADSHED_LOW_PRIORITY_VIEWS:
+        return True
+    if any(param in request.GET for param in SEARCH_PARAMS):
+        return True
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        return False
+    return (
+        page > settings.LOADSHED_DEEP_PAGE
+        and not request.user.is_authenticated
+    )
+
+
+class LoadSheddingMiddleware(MiddlewareMixin):
+    """
+    Отвечает 503 на второстепенные запросы, пока процесс перегружен.
+
+    Время ответа копится и при выключенном сбросе нагрузки, если
+    core.brownout работает в режиме 'auto' и читает его из tracker.
+    """
+
+    def __init__(self, get_response):
+        if not (
+            settings.LOADSHED_ENABLED or settings.BROWNOUT_MODE == 'auto'
+        ):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def process_request(self, request):
+        request._loadshed_started = time.perf_counter()
+        tracker.started()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_name = request.resolver_match.view_name
+        if not settings.LOADSHED_ENABLED:
+            return None
+        if tracker.overloaded(view_name) and is_low_priority(
+            request, view_name
+        ):
+            request._loadshed_shed = True
+            response = HttpResponse(
+                'Сервер перегружен, повторите запрос позже.',
+                status=503,
+                content_type='text/plain; charset=utf-8'
+            )
+            response['Retry-After'] = str(settings.LOADSHED_RETRY_AFTER)
+            return response
+        return None
+
+    def process_response(self, request, response):
+        started = getattr(request, '_loadshed_started', None)
+        if started is None:
+            return response
+        match = request.resolver_match
+        # Быстрые отказы не должны улучшать статистику времени ответа.
+        view_name = (
+            match.view_name
+            if match and not getattr(request, '_loadshed_shed', False)
+            else None
+        )
+        tracker.finished(view_name, time.perf_counter() - started)
+        return response
@@ -0,0 +1,186 @@
+"""Отложенная отправка писем через очередь в базе данных."""
+import logging
+from datetime import timedelta
+from email import message_from_bytes
+from email.generator import BytesGenerator
+from email.message import Message
+from io import BytesIO
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection as db_connection, transaction
+from django.utils import timezone
+
+from .models import QueuedEmail
+
+logger = logging.getLogger(__name__)
+
+
+class StoredMIMEMessage(Message):
+    """MIME-сообщение, восстановленное из очереди."""
+
+    def as_bytes(self, unixfrom=False, linesep='\n'):
+        """Сериализует письмо с заданным разделителем строк, как Django."""
+        buffer = BytesIO()
+        BytesGenerator(buffer, mangle_from_=False).flatten(
+            self, unixfrom=unixfrom, linesep=linesep
+        )
+        return buffer.getvalue()
+
+
+class QueuedEmailMessage(EmailMessage):
+    """Готовое письмо из очереди, которое отправляется без изменений."""
+
+    def __init__(self, queued):
+        self.raw = bytes(queued.message)
+        parsed = self.message()
+        super().__init__(
+            subject=parsed.get('Subject', ''),
+            from_email=queued.from_email,
+            to=queued.recipients.split('\n'),
+        )
+
+    def message(self):
+        return message_from_bytes(self.raw, _class=StoredMIMEMessage)
+
+    def recipients(self):
+        return self.to
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """
+    Бэкенд, который только ставит письма в очередь.
+
+    Отправкой занимается команда send_queued_mail: она забирает письма
+    пачками и передаёт их бэкенду QUEUED_EMAIL_DELIVERY_BACKEND через одно
+    соединение.
+    """
+
+    def send_messages(self, email_messages):
+        now = timezone.now()
+        queued = [
+            QueuedEmail(
+                from_email=message.from_email,
+                recipients='\n'.join(message.recipients()),
+                message=message.message().as_bytes(linesep='\n'),
+                next_attempt_at=now,
+            )
+            for message in email_messages
+            if message.recipients()
+        ]
+        try:
+            QueuedEmail.objects.bulk_create(queued)
+        except Exception:
+            if not self.fail_silently:
+                raise
+            return 0
+        return len(queued)
+
+
+def retry_delay(attempts):
+    """Возвращает паузу до следующей попытки: растёт экспоненциально."""
+    return timedelta(
+        seconds=settings.QUEUED_EMAIL_RETRY_DELAY * 2 ** (attempts - 1)
+    )
+
+
+def claim_batch(limit):
+    """
+    Забирает до limit писем, которым пора уйти, и откладывает их.
+
+    Забранные письма получают next_attempt_at через
+    QUEUED_EMAIL_CLAIM_TIMEOUT, поэтому параллельно запущенная команда
+    их не увидит, а если отправитель упадёт, письма вернутся в очередь
+    по истечении этого срока. Где СУБД умеет SKIP LOCKED, строки
+    выбираются с блокировкой; иначе каждая строка забирается условным
+    UPDATE, который проходит только у одного отправителя.
+    """
+    now = timezone.now()
+    claimed_until = now + timedelta(
+        seconds=settings.QUEUED_EMAIL_CLAIM_TIMEOUT
+    )
+    due = (
+        QueuedEmail.objects
+        .filter(is_dead=False, next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'id')
+    )
+    if db_connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            batch = list(due.select_for_update(skip_locked=True)[:limit])
+            QueuedEmail.objects.filter(
+                id__in=[queued.id for queued in batch]
+            ).update(next_attempt_at=claimed_until)
+        return batch
+    return [
+        queued for queued in due[:limit]
+        if QueuedEmail.objects.filter(
+            id=queued.id, next_attempt_at=queued.next_attempt_at
+        ).update(next_attempt_at=claimed_until)
+    ]
+
+
+def reopen(connection):
+    """
+    Переоткрывает соединение после ошибки отправки.
+
+    Без этого SMTP-бэкенд открывал бы отдельное соединение на каждое
+    следующее письмо пачки.
+    """
+    connection.close()
+    try:
+        connection.open()
+    except Exception as error:
+        logger.warning('Не удалось переоткрыть соединение: %s', error)
+
+
+def send_queued_batch(batch_size=None):
+    """
+    Отправляет очередную пачку писем через одно соединение.
+
+    Доставленные письма удаляются из очереди, недоставленные получают
+    время следующей попытки, а исчерпавшие попытки помечаются как
+    не доставленные.
+
+    :return: Пара (отправлено, не отправлено).
+    """
+    batch = claim_batch(batch_size or settings.QUEUED_EMAIL_BATCH_SIZE)
+    if not batch:
+        return 0, 0
+    sent, failed = [], []
+    connection = get_connection(settings.QUEUED_EMAIL_DELIVERY_BACKEND)
+    try:
+        connection.open()
+        for queued in batch:
+            try:
+                delivered = connection.send_messages(
+                    [QueuedEmailMessage(queued)]
+                )
+            except Exception as error:
+                logger.warning('Не удалось отправить письмо %s: %s',
+                               queued.id, error)
+                queued.last_error = f'{type(error).__name__}: {error}'
+                failed.append(queued)
+                reopen(connection)
+            else:
+                if delivered:
+                    sent.append(queued.id)
+                else:
+                    queued.last_error = 'Бэкенд не принял письмо'
+                    failed.append(queued)
+    finally:
+        connection.close()
+
+    now = timezone.now()
+    for queued in failed:
+        queued.attempts += 1
+        queued.next_attempt_at = now + retry_delay(queued.attempts)
+        queued.is_dead = (
+            queued.attempts >= settings.QUEUED_EMAIL_MAX_ATTEMPTS
+        )
+    with transaction.atomic():
+        QueuedEmail.objects.filter(id__in=sent).delete()
+        QueuedEmail.objects.bulk_update(
+            failed, ('attempts', 'next_attempt_at', 'last_error', 'is_dead')
+        )
+    return len(sent), len(failed)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from core.brownout import force
+
+
+class Command(BaseCommand):
+    help = (
+        'Включает или выключает режим brownout во всех процессах через '
+        'флаг в BROWNOUT_DIR либо возвращает автоматическое управление.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('mode', choices=('on', 'off', 'auto'))
+        parser.add_argument(
+            '--for',
+            dest='timeout',
+            type=int,
+            help='Через сколько секунд вернуть автоматическое управление.'
+        )
+
+    def handle(self, *args, **options):
+        force(options['mode'], options['timeout'])
+        self.stdout.write(f'Режим brownout: {options["mode"]}')
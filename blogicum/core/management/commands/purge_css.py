@@ -0,0 +1,69 @@
+from pathlib import Path
+
+import django_bootstrap5
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+
+from core.purgecss import (
+    SAFELIST, collect_tokens, purge, recorded_classes, stylesheet_classes
+)
+
+SOURCE_CSS = 'css/bootstrap.min.css'
+PURGED_CSS = 'css/bootstrap.purged.css'
+
+
+class Command(BaseCommand):
+    help = (
+        'Собирает урезанную таблицу стилей Bootstrap только с теми '
+        'классами, которые встречаются в шаблонах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Не писать файл, а проверить, что шаблоны не используют '
+                 'вырезанные классы.'
+        )
+
+    def handle(self, *args, **options):
+        source = finders.find(SOURCE_CSS)
+        if source is None:
+            raise CommandError(f'Не найден исходный файл {SOURCE_CSS}.')
+        css = Path(source).read_text(encoding='utf-8')
+        output = Path(settings.STATICFILES_DIRS[0]) / PURGED_CSS
+        used = self.used_classes(stylesheet_classes(css))
+
+        if options['check']:
+            if not output.is_file():
+                raise CommandError(
+                    f'Нет файла {PURGED_CSS}, выполните purge_css.'
+                )
+            missing = used - recorded_classes(
+                output.read_text(encoding='utf-8')
+            )
+            if missing:
+                raise CommandError(
+                    'Шаблоны используют классы, вырезанные из '
+                    f'{PURGED_CSS}: {", ".join(sorted(missing))}. '
+                    'Пересоберите стили командой purge_css.'
+                )
+            self.stdout.write('Все используемые классы на месте.')
+            return
+
+        purged = purge(css, used)
+        output.write_text(purged, encoding='utf-8')
+        self.stdout.write(
+            f'{PURGED_CSS}: {len(purged) // 1024} КБ вместо '
+            f'{len(css) // 1024} КБ, классов: {len(used)}.'
+        )
+
+    def used_classes(self, known_classes):
+        """Классы Bootstrap, встречающиеся в шаблонах и django_bootstrap5."""
+        sources = [
+            *(template['DIRS'] for template in settings.TEMPLATES),
+            [Path(django_bootstrap5.__file__).parent],
+        ]
+        tokens = collect_tokens(path for paths in sources for path in paths)
+        return (tokens | SAFELIST) & known_classes
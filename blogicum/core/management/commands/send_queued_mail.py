@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.mail import send_queued_batch
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди пачками через одно соединение.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Сколько писем отправлять через одно соединение.'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Работать постоянно, проверяя очередь каждые --interval '
+                 'секунд.'
+        )
+        parser.add_argument('--interval', type=float, default=5)
+
+    def handle(self, *args, **options):
+        while True:
+            total_sent = total_failed = 0
+            while True:
+                sent, failed = send_queued_batch(options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+                # Очередь пуста или пачка целиком не ушла — ждём
+                # следующего прохода.
+                if not sent:
+                    break
+            if total_sent or total_failed:
+                self.stdout.write(
+                    f'Отправлено: {total_sent}, ошибок: {total_failed}'
+                )
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
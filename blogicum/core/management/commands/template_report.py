@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from core.timing import template_stats
+
+SORT_COLUMNS = {'self': 2, 'total': 1, 'renders': 3}
+
+
+class Command(BaseCommand):
+    help = (
+        'Печатает накопленное в метриках время отрисовки шаблонов: по '
+        'именам шаблонов и по местам {% include %}, полное и собственное '
+        '(без вложенных шаблонов).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sort', choices=tuple(SORT_COLUMNS), default='self'
+        )
+        parser.add_argument('--limit', type=int, default=20)
+
+    def handle(self, *args, **options):
+        column = SORT_COLUMNS[options['sort']]
+        templates, includes = template_stats()
+        for title, rows in (
+            ('Шаблоны', templates), ('Места {% include %}', includes)
+        ):
+            rows.sort(key=lambda row: row[column], reverse=True)
+            self.stdout.write(
+                f'{"всего, мс":>11} {"своё, мс":>11} {"отрисовок":>10} '
+                f'{"своё/раз, мс":>13}  {title}'
+            )
+            for name, total, own, renders in rows[:options['limit']]:
+                self.stdout.write(
+                    f'{total * 1000:>11.1f} {own * 1000:>11.1f} '
+                    f'{renders:>10} {own * 1000 / max(renders, 1):>13.3f}  '
+                    f'{name}'
+                )
+            self.stdout.write('')
@@ -0,0 +1,273 @@
+"""
+Метрики в текстовом формате Prometheus, общие для всех процессов.
+
+Каждый процесс копит счётчики и гистограммы в памяти и не чаще раза в
+METRICS_FLUSH_INTERVAL секунд сбрасывает их в свой файл METRICS_DIR/<pid>.json.
+Представление /metrics складывает файлы всех процессов. На горячем пути —
+только поиск корзины гистограммы и обновление словаря под блокировкой.
+"""
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.http import HttpResponse
+
+from .middleware import WrappingMiddleware
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+SIZE_BUCKETS = (
+    10_000, 100_000, 500_000, 1_000_000, 5_000_000, 10_000_000, 50_000_000
+)
+
+# Имя метрики -> (тип, описание, корзины гистограммы).
+METRICS = {
+    'blogicum_request_duration_seconds': (
+        'histogram', 'Время ответа по представлениям.', LATENCY_BUCKETS
+    ),
+    'blogicum_db_queries_total': (
+        'counter', 'Число запросов к БД по представлениям.', None
+    ),
+    'blogicum_db_query_seconds_total': (
+        'counter', 'Время запросов к БД по представлениям.', None
+    ),
+    'blogicum_template_render_seconds': (
+        'histogram',
+        'Время отрисовки шаблона за запрос, с вложенными шаблонами.',
+        LATENCY_BUCKETS
+    ),
+    'blogicum_template_self_seconds_total': (
+        'counter', 'Собственное время шаблонов, без вложенных.', None
+    ),
+    'blogicum_template_renders_total': (
+        'counter', 'Число отрисовок шаблонов.', None
+    ),
+    'blogicum_include_seconds_total': (
+        'counter', 'Время шаблонов по местам {% include %}.', None
+    ),
+    'blogicum_include_self_seconds_total': (
+        'counter', 'Собственное время шаблонов по местам {% include %}.',
+        None
+    ),
+    'blogicum_include_renders_total': (
+        'counter', 'Число отрисовок по местам {% include %}.', None
+    ),
+    'blogicum_cache_hits_total': (
+        'counter', 'Попадания в кеш по пространствам ключей.', None
+    ),
+    'blogicum_cache_misses_total': (
+        'counter', 'Промахи кеша по пространствам ключей.', None
+    ),
+    'blogicum_upload_size_bytes': (
+        'histogram', 'Размер загруженных файлов.', SIZE_BUCKETS
+    ),
+}
+
+
+class MetricsRegistry:
+    """Метрики процесса с периодическим сбросом в файл."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.flushed_at = 0.0
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        key = (name, labels)
+        buckets = METRICS[name][2]
+        with self.lock:
+            series = self.histograms.get(key)
+            if series is None:
+                # Счётчики корзин (последняя — +Inf), сумма, число замеров.
+                series = self.histograms[key] = [
+                    [0] * (len(buckets) + 1), 0.0, 0
+                ]
+            series[0][bisect_left(buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def state(self):
+        with self.lock:
+            return {
+                'counters': [
+                    [name, labels, value]
+                    for (name, labels), value in self.counters.items()
+                ],
+                'histograms': [
+                    [name, labels, list(counts), total, count]
+                    for (name, labels), (counts, total, count)
+                    in self.histograms.items()
+                ],
+            }
+
+    def flush(self):
+        """Атомарно записывает метрики процесса в его файл."""
+        directory = Path(settings.METRICS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(descriptor, 'w') as output:
+            json.dump(self.state(), output)
+        os.replace(temp_path, directory / f'{os.getpid()}.json')
+        self.flushed_at = time.monotonic()
+
+    def maybe_flush(self):
+        if time.monotonic() - self.flushed_at >= (
+            settings.METRICS_FLUSH_INTERVAL
+        ):
+            self.flush()
+
+
+registry = MetricsRegistry()
+
+
+def is_alive(pid):
+    """Жив ли процесс; PermissionError значит, что он чужой, но есть."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect():
+    """
+    Складывает метрики всех процессов из файлов METRICS_DIR.
+
+    Файлы завершившихся процессов удаляются: иначе после перезапусков
+    воркеров каталог рос бы без ограничений. Их счётчики при этом
+    пропадают, и Prometheus видит это как сброс счётчика.
+    """
+    registry.flush()
+    counters, histograms = {}, {}
+    for path in Path(settings.METRICS_DIR).glob('*.json'):
+        if path.stem.isdigit() and not is_alive(int(path.stem)):
+            path.unlink(missing_ok=True)
+            continue
+        try:
+            state = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        for name, labels, value in state['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, counts, total, count in state['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            series = histograms.setdefault(
+                key, [[0] * len(counts), 0.0, 0]
+            )
+            series[0] = [a + b for a, b in zip(series[0], counts)]
+            series[1] += total
+            series[2] += count
+    return counters, histograms
+
+
+def format_labels(labels, **extra):
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"')
+         .replace('\n', r'\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def render():
+    """Метрики всех процессов в текстовом формате Prometheus."""
+    counters, histograms = collect()
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (series_name, labels), value in sorted(counters.items()):
+                if series_name == name:
+                    lines.append(f'{name}{format_labels(labels)} {value}')
+            continue
+        for (series_name, labels), (counts, total, count) in sorted(
+            histograms.items()
+        ):
+            if series_name != name:
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip((*buckets, '+Inf'), counts):
+                cumulative += bucket_count
+                lines.append(
+                    f'{name}_bucket{format_labels(labels, le=bound)} '
+                    f'{cumulative}'
+                )
+            lines.append(f'{name}_sum{format_labels(labels)} {total}')
+            lines.append(f'{name}_count{format_labels(labels)} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def has_metrics_token(request):
+    """Передал ли сборщик токен METRICS_TOKEN в заголовке Authorization."""
+    token = settings.METRICS_TOKEN
+    return bool(token) and hmac.compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+    )
+
+
+def metrics_view(request):
+    """
+    Отдаёт метрики сборщику с токеном или сотруднику.
+
+    Адрес клиента не проверяется: за обратным прокси на той же машине
+    у всех клиентов адрес 127.0.0.1.
+    """
+    if not (has_metrics_token(request) or request.user.is_staff):
+        raise PermissionDenied
+    return HttpResponse(
+        render(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+class MetricsMiddleware(WrappingMiddleware):
+    """Записывает время ответа, запросы к БД и размеры загрузок."""
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    @contextmanager
+    def measure(self, request):
+        yield time.perf_counter()
+
+    def finish(self, request, response, started):
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        labels = (('view', match.view_name if match else 'unresolved'),)
+        registry.observe('blogicum_request_duration_seconds', labels, duration)
+        query_log = getattr(request, 'query_log', None)
+        if query_log is not None:
+            registry.inc('blogicum_db_queries_total', labels, query_log.count)
+            registry.inc(
+                'blogicum_db_query_seconds_total', labels, query_log.duration
+            )
+        # Файлы разбираются только при обращении к request.FILES.
+        for upload in getattr(request, '_files', {}).values():
+            registry.observe(
+                'blogicum_upload_size_bytes', labels, upload.size
+            )
+        registry.maybe_flush()
+        return response
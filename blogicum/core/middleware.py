@@ -0,0 +1,62 @@
+"""
+Основа для middleware, которые оборачивают обработку запроса.
+
+Django 3.2 оборачивает middleware без async_capable в sync_to_async с
+thread_sensitive=True, и под ASGI все запросы выполняются по очереди в
+одном потоке. Наследники этого класса работают в обоих режимах: логика
+до и после ответа описывается методами prepare, measure — контекстным
+менеджером вокруг get_response — и finish.
+"""
+import asyncio
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+
+
+class WrappingMiddleware:
+    sync_capable = True
+    async_capable = True
+    # prepare или finish обращается к БД (например, к request.user) и под
+    # ASGI выполняется в потоке.
+    prepare_uses_db = False
+    finish_uses_db = False
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Так же помечает асинхронные экземпляры MiddlewareMixin.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        self.prepare(request)
+        with self.measure(request) as state:
+            response = self.get_response(request)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        if self.prepare_uses_db:
+            await sync_to_async(
+                self.prepare, thread_sensitive=False
+            )(request)
+        else:
+            self.prepare(request)
+        with self.measure(request) as state:
+            response = await self.get_response(request)
+        if self.finish_uses_db:
+            return await sync_to_async(
+                self.finish, thread_sensitive=False
+            )(request, response, state)
+        return self.finish(request, response, state)
+
+    def prepare(self, request):
+        pass
+
+    @contextmanager
+    def measure(self, request):
+        yield None
+
+    def finish(self, request, response, state):
+        return response
@@ -0,0 +1,35 @@
+from django.db import models
+
+
+class QueuedEmail(models.Model):
+    """Письмо в очереди на отправку."""
+
+    from_email = models.CharField('Отправитель', max_length=254)
+    recipients = models.TextField(
+        'Получатели',
+        help_text='Адреса получателей, по одному в строке.'
+    )
+    message = models.BinaryField('Письмо в формате MIME')
+    created_at = models.DateTimeField('Добавлено', auto_now_add=True)
+    next_attempt_at = models.DateTimeField('Следующая попытка')
+    attempts = models.PositiveSmallIntegerField('Попыток отправки', default=0)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    is_dead = models.BooleanField(
+        'Не доставлено',
+        default=False,
+        help_text='Письмо исчерпало попытки отправки и больше не отправляется.'
+    )
+
+    class Meta:
+        verbose_name = 'письмо в очереди'
+        verbose_name_plural = 'Очередь писем'
+        ordering = ('next_attempt_at',)
+        indexes = (
+            models.Index(
+                fields=('is_dead', 'next_attempt_at'),
+                name='queued_email_due_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'Письмо для {", ".join(self.recipients.split())}'
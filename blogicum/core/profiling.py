@@ -0,0 +1,139 @@
+"""
+Профилирование отдельных запросов.
+
+Запрос профилируется, если его пометил сотрудник (заголовок X-Profile или
+параметр ?profile=1) или он попал в случайную долю PROFILING_SAMPLE_RATE.
+В режиме 'cprofile' сохраняется .prof для pstats/snakeviz, в режиме
+'sampling' — свёрнутые стеки (.folded) для flamegraph.pl и speedscope.
+Отчёты складываются в PROFILING_DIR/<имя представления>/. Выключенное
+профилирование не подключается к цепочке middleware вовсе.
+"""
+import cProfile
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .middleware import WrappingMiddleware
+
+REPORT_HEADER = 'X-Profile-Report'
+
+
+class StackSampler:
+    """Статистический профилировщик: периодически снимает стек потока."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f'{code.co_name} ({Path(code.co_filename).name}:'
+                    f'{code.co_firstlineno})'
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as output:
+            for stack, count in self.stacks.most_common():
+                output.write(f'{stack} {count}\n')
+
+
+def report_path(request, extension):
+    """Путь отчёта: каталог по имени представления, файл по времени."""
+    match = request.resolver_match
+    view_name = match.view_name if match else 'unresolved'
+    directory = Path(settings.PROFILING_DIR) / view_name.replace(':', '-')
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    return directory / (
+        f'{stamp}-{os.getpid()}-{threading.get_ident()}.{extension}'
+    )
+
+
+class ProfilingMiddleware(WrappingMiddleware):
+    """
+    Профилирует помеченные и выбранные случайно запросы.
+
+    Под ASGI профилируется поток цикла событий: асинхронные представления
+    видны целиком, а синхронные выполняются в потоке адаптера.
+    """
+
+    # Пометку сотрудника проверяет request.user.
+    prepare_uses_db = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def should_profile(self, request):
+        flagged = (
+            request.headers.get('X-Profile')
+            or request.GET.get('profile')
+        )
+        if flagged and request.user.is_staff:
+            return True
+        return random.random() < settings.PROFILING_SAMPLE_RATE
+
+    def prepare(self, request):
+        request.is_profiled = self.should_profile(request)
+        request.shows_profile = (
+            request.is_profiled and request.user.is_staff
+        )
+
+    @contextmanager
+    def measure(self, request):
+        if not request.is_profiled:
+            yield None
+            return
+        if settings.PROFILING_MODE == 'sampling':
+            profiler = StackSampler(
+                threading.get_ident(), settings.PROFILING_SAMPLE_INTERVAL
+            )
+            profiler.start()
+            try:
+                yield profiler
+            finally:
+                profiler.stop()
+            path = report_path(request, 'folded')
+            profiler.dump(path)
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield profiler
+            finally:
+                profiler.disable()
+            path = report_path(request, 'prof')
+            profiler.dump_stats(path)
+        request.profile_report = path
+
+    def finish(self, request, response, profiler):
+        if request.shows_profile:
+            response[REPORT_HEADER] = request.profile_report.name
+        return response
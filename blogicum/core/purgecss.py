@@ -0,0 +1,131 @@
+"""Удаление из таблицы стилей правил с классами, которых нет в шаблонах."""
+import re
+from pathlib import Path
+
+TOKEN_RE = re.compile(r'[A-Za-z0-9_-]+')
+CLASS_RE = re.compile(r'\.(-?[_a-zA-Z][\w-]*)')
+COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+HEADER_RE = re.compile(r'\s*(?:@charset[^;]*;)?\s*(?:/\*!.*?\*/)?', re.S)
+USED_CLASSES_RE = re.compile(r'/\* purge_css used: ([\w\s-]*?) \*/')
+# At-правила, внутри которых лежат обычные правила со своими селекторами.
+NESTED_AT_RULES = ('@media', '@supports', '@document', '@layer')
+
+# Классы, которые могут появиться без упоминания в шаблонах
+# (например, добавляются скриптами Bootstrap).
+SAFELIST = frozenset({'active', 'show', 'fade', 'collapsing', 'disabled'})
+
+
+def collect_tokens(paths, suffixes=('.html', '.py', '.txt')):
+    """Собирает все слова из файлов, которые могут оказаться классами."""
+    tokens = set()
+    for root in paths:
+        root = Path(root)
+        files = [root] if root.is_file() else root.rglob('*')
+        for path in files:
+            if path.is_file() and path.suffix in suffixes:
+                tokens.update(
+                    TOKEN_RE.findall(path.read_text(encoding='utf-8'))
+                )
+    return tokens
+
+
+def split_blocks(css):
+    """Разбивает CSS на пары (прелюдия, тело блока) верхнего уровня."""
+    blocks = []
+    position = 0
+    while True:
+        start = css.find('{', position)
+        if start == -1:
+            break
+        prelude = css[position:start].strip()
+        depth = 1
+        end = start + 1
+        quote = None
+        while depth and end < len(css):
+            char = css[end]
+            if quote:
+                if char == '\\':
+                    end += 1
+                elif char == quote:
+                    quote = None
+            elif char in '"\'':
+                quote = char
+            elif char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+            end += 1
+        blocks.append((prelude, css[start + 1:end - 1]))
+        position = end
+    return blocks
+
+
+def split_selectors(prelude):
+    """Делит список селекторов по запятым вне скобок."""
+    selectors, depth, current = [], 0, ''
+    for char in prelude:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        if char == ',' and not depth:
+            selectors.append(current.strip())
+            current = ''
+        else:
+            current += char
+    selectors.append(current.strip())
+    return selectors
+
+
+def stylesheet_classes(css):
+    """Возвращает множество классов, упомянутых в селекторах таблицы."""
+    classes = set()
+    for prelude, body in split_blocks(COMMENT_RE.sub('', css)):
+        if prelude.startswith(NESTED_AT_RULES):
+            classes |= stylesheet_classes(body)
+        elif not prelude.startswith('@'):
+            classes.update(CLASS_RE.findall(prelude))
+    return classes
+
+
+def purge(css, used):
+    """
+    Оставляет в таблице стилей только применимые правила.
+
+    Селектор сохраняется, если все его классы есть в ``used``; правило —
+    если сохранился хотя бы один селектор. Остальные at-правила
+    (@font-face, @keyframes и т. п.) переносятся без изменений.
+    Объявление @charset и лицензионный комментарий остаются в начале.
+    """
+    header = HEADER_RE.match(css)
+    return (
+        header.group(0).strip()
+        + f'/* purge_css used: {" ".join(sorted(used))} */'
+        + purge_rules(css[header.end():], used)
+    )
+
+
+def recorded_classes(purged_css):
+    """Возвращает классы, с учётом которых собиралась урезанная таблица."""
+    match = USED_CLASSES_RE.search(purged_css)
+    return set(match.group(1).split()) if match else set()
+
+
+def purge_rules(css, used):
+    """Фильтрует правила блока CSS без учёта его заголовка."""
+    output = []
+    for prelude, body in split_blocks(COMMENT_RE.sub('', css)):
+        if prelude.startswith(NESTED_AT_RULES):
+            inner = purge_rules(body, used)
+            if inner:
+                output.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@'):
+            output.append(f'{prelude}{{{body}}}')
+        else:
+            selectors = [
+                selector for selector in split_selectors(prelude)
+                if set(CLASS_RE.findall(selector)) <= used
+            ]
+            if selectors:
+                output.append(f'{",".join(selectors)}{{{body}}}')
+    return ''.join(output)
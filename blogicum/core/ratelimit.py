@@ -0,0 +1,209 @@
+"""
+Ограничение частоты запросов скользящим окном на атомарных счётчиках.
+
+Для каждой корзины в общем кеше хранятся счётчики текущего и прошлого
+окна длиной в период лимита; число запросов за последний период
+оценивается как текущий счётчик плюс доля прошлого. Счётчики меняются
+только атомарными cache.add и cache.incr, поэтому лимит соблюдается при
+одновременных запросах и в нескольких процессах. Если корзина оказалась
+полной, процесс запоминает, когда в ней освободится место, и до этого
+момента отклоняет запросы по этому ключу без обращения к кешу.
+"""
+import math
+import time
+from functools import lru_cache, wraps
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.shortcuts import render
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+# Ключ корзины -> момент (time.monotonic), до которого она заведомо полна.
+# Обращения к словарю атомарны, блокировка не нужна.
+_empty_until = {}
+MAX_LOCAL_KEYS = 10000
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """Разбирает лимит вида '10/m' в пару (число запросов, период в с)."""
+    capacity, period = rate.split('/')
+    return int(capacity), PERIODS[period]
+
+
+def client_ip(request):
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def bucket_keys(scope, request):
+    """Возвращает пары (ключ корзины, лимит) для запроса."""
+    limits = settings.RATELIMITS.get(scope, {})
+    identities = {
+        'endpoint': 'all',
+        'ip': client_ip(request),
+        'user': (
+            request.user.pk if request.user.is_authenticated else None
+        ),
+    }
+    return [
+        (f'ratelimit:{scope}:{kind}:{identities[kind]}', rate)
+        for kind, rate in limits.items()
+        if identities[kind] is not None
+    ]
+
+
+class Window:
+    """Скользящее окно корзины на момент now."""
+
+    def __init__(self, key, rate, now):
+        self.capacity, self.period = parse_rate(rate)
+        number, self.elapsed = divmod(now / self.period, 1)
+        self.current_key = f'{key}:{int(number)}'
+        self.previous_key = f'{key}:{int(number) - 1}'
+        self.key = key
+
+    def estimate(self, current, previous):
+        """Оценка числа запросов за последний период."""
+        return current + previous * (1 - self.elapsed)
+
+    def wait(self, current, previous):
+        """
+        Через сколько секунд в окне будет место для ещё одного запроса.
+
+        :return: 0, если место есть уже сейчас.
+        """
+        if self.estimate(current, previous) + 1 <= self.capacity:
+            return 0
+        free = self.capacity - 1 - current
+        if previous and free >= 0:
+            # Вклад прошлого окна убывает линейно до конца текущего.
+            elapsed_needed = 1 - free / previous
+            return max(
+                (elapsed_needed - self.elapsed) * self.period, 0.001
+            )
+        return (1 - self.elapsed) * self.period
+
+    def increment(self):
+        """Атомарно учитывает запрос; возвращает новый счётчик окна."""
+        timeout = self.period * 2 + 1
+        cache.add(self.current_key, 0, timeout)
+        try:
+            return cache.incr(self.current_key)
+        except ValueError:
+            # Ключ истёк между add и incr.
+            cache.add(self.current_key, 1, timeout)
+            return 1
+
+    def decrement(self):
+        try:
+            cache.decr(self.current_key)
+        except ValueError:
+            pass
+
+
+def consume(windows, counts):
+    """
+    Учитывает запрос во всех окнах.
+
+    Если одновременные запросы заполнили окно после чтения счётчиков,
+    уже сделанные увеличения откатываются.
+
+    :return: Окна, в которых не хватило места, и время ожидания.
+    """
+    incremented = []
+    for window in windows:
+        current = window.increment()
+        incremented.append(window)
+        wait = window.wait(current - 1, counts.get(window.previous_key, 0))
+        if wait:
+            for done in incremented:
+                done.decrement()
+            return {window: wait}
+    return {}
+
+
+def check_shared_cache():
+    """
+    Не даёт запустить лимиты на кеше процесса вне режима отладки.
+
+    У каждого воркера были бы свои счётчики, и настоящий лимит оказался
+    бы во столько раз больше, сколько запущено процессов.
+    """
+    if (
+        settings.RATELIMIT_ENABLED and not settings.DEBUG
+        and isinstance(caches['default'], (LocMemCache, DummyCache))
+    ):
+        raise ImproperlyConfigured(
+            'Ограничения частоты запросов требуют общего для процессов '
+            'кеша: задайте BLOGICUM_MEMCACHED или RATELIMIT_ENABLED = False'
+        )
+
+
+def check_ratelimit(scope, request):
+    """
+    Возвращает, через сколько секунд можно повторить запрос, или 0.
+
+    Запрос учитывается в корзинах области, только если ни одна из них
+    не полна.
+    """
+    if not settings.RATELIMIT_ENABLED:
+        return 0
+    now = time.monotonic()
+    windows = [
+        Window(key, rate, time.time())
+        for key, rate in bucket_keys(scope, request)
+    ]
+    wait = max(
+        (_empty_until.get(window.key, 0) - now for window in windows),
+        default=0
+    )
+    if wait > 0:
+        return wait
+    counts = cache.get_many(
+        [window.current_key for window in windows]
+        + [window.previous_key for window in windows]
+    )
+    waits = {
+        window: window.wait(
+            counts.get(window.current_key, 0),
+            counts.get(window.previous_key, 0),
+        )
+        for window in windows
+    }
+    waits = {window: wait for window, wait in waits.items() if wait}
+    if not waits:
+        waits = consume(windows, counts)
+    for window, wait in waits.items():
+        if len(_empty_until) >= MAX_LOCAL_KEYS:
+            _empty_until.clear()
+        _empty_until[window.key] = now + wait
+    return max(waits.values(), default=0)
+
+
+def ratelimit(scope, methods=('POST',)):
+    """
+    Декоратор представления: ограничивает частоту запросов области scope.
+
+    Лимиты области берутся из settings.RATELIMITS. При превышении
+    представление не вызывается, а клиент получает ответ 429.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method in methods:
+                wait = check_ratelimit(scope, request)
+                if wait:
+                    retry_after = math.ceil(wait)
+                    response = render(
+                        request, 'pages/429.html',
+                        {'retry_after': retry_after}, status=429
+                    )
+                    response['Retry-After'] = str(retry_after)
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
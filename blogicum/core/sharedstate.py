@@ -0,0 +1,31 @@
+"""
+Небольшие JSON-файлы состояния, общие для всех процессов сервера.
+
+Кеш у каждого процесса свой (LocMem), поэтому флаги и версии, которые
+должны видеть все воркеры, хранятся в файлах. Запись атомарна: файл
+пишется рядом и подменяется os.replace, так что читатель видит либо
+старое, либо новое содержимое целиком.
+"""
+import json
+import os
+import tempfile
+from pathlib import Path
+
+
+def write_state(path, data):
+    """Атомарно записывает data в JSON-файл path."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(descriptor, 'w') as output:
+        json.dump(data, output)
+    os.replace(temp_path, path)
+
+
+def read_state(path):
+    """Содержимое JSON-файла path или None, если его нет."""
+    try:
+        with open(path) as source:
+            return json.load(source)
+    except (FileNotFoundError, ValueError):
+        return None
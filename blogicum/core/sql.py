@@ -0,0 +1,188 @@
+"""
+Инструментирование SQL-запросов без DEBUG.
+
+Обёртка execute_wrapper ставится на каждое новое соединение с БД и
+записывает запросы в QueryLog текущего запроса пользователя (или блока
+capture_queries). По журналу считается число и время запросов по
+отпечаткам: медленные запросы пишутся в журнал со стеком вызова из кода
+проекта, а отпечаток, повторённый SQL_NPLUSONE_THRESHOLD раз за запрос, —
+как возможный N+1. Итоги по представлениям накапливаются в stats.
+"""
+import logging
+import re
+import sysconfig
+import threading
+import time
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .middleware import WrappingMiddleware
+
+logger = logging.getLogger(__name__)
+
+IN_LIST = re.compile(r'\bIN \([^()]*\)', re.IGNORECASE)
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+WHITESPACE = re.compile(r'\s+')
+# Сколько кадров стека проекта показывать в журнале.
+STACK_DEPTH = 8
+# Кадры из стандартной библиотеки и установленных пакетов не показываются.
+LIBRARY_PATHS = tuple({
+    sysconfig.get_paths()[name]
+    for name in ('stdlib', 'platstdlib', 'purelib', 'platlib')
+})
+
+current_log = ContextVar('query_log', default=None)
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """Нормализованный текст запроса: без литералов и длины списков IN."""
+    sql = IN_LIST.sub('IN (...)', sql)
+    sql = STRING.sub('?', sql)
+    sql = NUMBER.sub('?', sql)
+    return WHITESPACE.sub(' ', sql).strip()
+
+
+def project_stack():
+    """Кадры стека из кода проекта, без библиотек и этого модуля."""
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if not frame.filename.startswith(LIBRARY_PATHS)
+        and frame.filename != __file__
+    ]
+    return ''.join(traceback.format_list(frames[-STACK_DEPTH:]))
+
+
+class QueryLog:
+    """
+    Запросы к БД, выполненные за один запрос пользователя.
+
+    Журнал вложенного блока capture_queries пишет запросы и в журнал
+    внешнего блока (parent).
+    """
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.queries = []
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self.repeated = {}
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    def add(self, sql, key, duration):
+        self.queries.append((sql, duration))
+        self.duration += duration
+        self.fingerprints[key] += 1
+        if self.fingerprints[key] == settings.SQL_NPLUSONE_THRESHOLD:
+            self.repeated[key] = project_stack()
+        if self.parent is not None:
+            self.parent.add(sql, key, duration)
+
+    def record(self, sql, duration):
+        self.add(sql, fingerprint(sql), duration)
+        if duration >= settings.SQL_SLOW_QUERY_THRESHOLD:
+            logger.warning(
+                'Медленный запрос (%.1f мс): %s\n%s',
+                duration * 1000, sql, project_stack()
+            )
+
+    def report_repeated(self, view_name):
+        for key, stack in self.repeated.items():
+            logger.warning(
+                'Возможный N+1 в %s: %d одинаковых запросов %s\n%s',
+                view_name, self.fingerprints[key], key, stack
+            )
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """Обёртка соединения: пишет запрос в журнал, если он собирается."""
+    log = current_log.get()
+    if log is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        log.record(sql, time.perf_counter() - started)
+
+
+def install_wrapper(sender, connection, **kwargs):
+    """Обработчик connection_created."""
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+@contextmanager
+def capture_queries():
+    """Собирает запросы блока кода в QueryLog."""
+    log = QueryLog(parent=current_log.get())
+    token = current_log.set(log)
+    try:
+        yield log
+    finally:
+        current_log.reset(token)
+
+
+class QueryStats:
+    """Накопленные по процессу число и время запросов по представлениям."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def record(self, view_name, log):
+        with self.lock:
+            requests, queries, duration, repeated = self.views.get(
+                view_name, (0, 0, 0.0, 0)
+            )
+            self.views[view_name] = (
+                requests + 1,
+                queries + log.count,
+                duration + log.duration,
+                repeated + len(log.repeated),
+            )
+
+    def snapshot(self):
+        """
+        Возвращает накопленные итоги по представлениям.
+
+        :return: Словарь имя представления -> (запросы пользователей,
+            запросы к БД, время БД в секундах, найденные N+1).
+        """
+        with self.lock:
+            return dict(self.views)
+
+
+stats = QueryStats()
+
+
+class QueryInstrumentationMiddleware(WrappingMiddleware):
+    """Собирает запросы к БД в request.query_log и в stats."""
+
+    def __init__(self, get_response):
+        if not settings.SQL_INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    @contextmanager
+    def measure(self, request):
+        with capture_queries() as log:
+            request.query_log = log
+            yield log
+
+    def finish(self, request, response, log):
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        stats.record(view_name, log)
+        log.report_repeated(view_name)
+        return response
@@ -0,0 +1,148 @@
+import mimetypes
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import (
+    MiddlewareNotUsed, SuspiciousFileOperation
+)
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.http import http_date, parse_http_date_safe
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+MUTABLE_CACHE_CONTROL = 'public, max-age=300'
+# Порядок важен: предпочитаем brotli, затем gzip.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class StaticFile:
+    """Собранный статический файл и его заранее сжатые варианты."""
+
+    def __init__(self, path, immutable):
+        self.path = path
+        self.immutable = immutable
+        stat = os.stat(path)
+        self.size = stat.st_size
+        self.last_modified = http_date(stat.st_mtime)
+        self.content_type = (
+            mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        )
+        self.variants = [
+            (encoding, path + suffix)
+            for encoding, suffix in ENCODINGS
+            if os.path.isfile(path + suffix)
+        ]
+
+    def choose(self, accept_encoding):
+        """Возвращает (кодировка, путь) лучшего варианта для клиента."""
+        accepted = parse_accept_encoding(accept_encoding)
+        for encoding, path in self.variants:
+            if accepted.get(encoding, accepted.get('*', 0)) > 0:
+                return encoding, path
+        return None, self.path
+
+
+def parse_accept_encoding(header):
+    """
+    Разбирает Accept-Encoding в словарь {кодировка: q}.
+
+    Кодировки с q=0 клиент явно отклоняет; «*» задаёт вес всех
+    неперечисленных кодировок.
+    """
+    accepted = {}
+    for item in header.split(','):
+        encoding, *params = [part.strip() for part in item.split(';')]
+        if not encoding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[encoding.lower()] = quality
+    return accepted
+
+
+class StaticFilesMiddleware(MiddlewareMixin):
+    """
+    Раздаёт собранную collectstatic статику из STATIC_ROOT.
+
+    Выбирает заранее сжатый вариант файла по Accept-Encoding и помечает
+    файлы с хешем в имени как неизменяемые. Ничего не сжимает на лету;
+    файлы, которых нет в STATIC_ROOT, пропускает дальше по цепочке.
+    """
+
+    def __init__(self, get_response):
+        if not settings.STATIC_ROOT or not settings.STATIC_URL:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.root = str(Path(settings.STATIC_ROOT).resolve())
+        self.prefix = settings.STATIC_URL
+        self.hashed_names = set(
+            getattr(staticfiles_storage, 'hashed_files', {}).values()
+        )
+        self.files = {}
+
+    def process_request(self, request):
+        if (
+            request.method in ('GET', 'HEAD')
+            and request.path_info.startswith(self.prefix)
+        ):
+            static_file = self.find(request.path_info[len(self.prefix):])
+            if static_file is not None:
+                return self.serve(request, static_file)
+        return None
+
+    def find(self, name):
+        """
+        Ищет файл в STATIC_ROOT, запоминая найденные файлы.
+
+        Промахи не запоминаются: иначе запросы к случайным несуществующим
+        путям заполняли бы словарь без ограничений.
+        """
+        try:
+            return self.files[name]
+        except KeyError:
+            pass
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            # Путь за пределами STATIC_ROOT: пусть его обработают дальше.
+            return None
+        if not os.path.isfile(path):
+            return None
+        static_file = self.files[name] = StaticFile(
+            path, name in self.hashed_names
+        )
+        return static_file
+
+    def serve(self, request, static_file):
+        """Отдаёт файл с заголовками долговременного кеширования."""
+        if_modified_since = parse_http_date_safe(
+            request.META.get('HTTP_IF_MODIFIED_SINCE', '')
+        )
+        last_modified = parse_http_date_safe(static_file.last_modified)
+        if if_modified_since and if_modified_since >= last_modified:
+            response = HttpResponseNotModified()
+        else:
+            encoding, path = static_file.choose(
+                request.META.get('HTTP_ACCEPT_ENCODING', '')
+            )
+            response = FileResponse(
+                open(path, 'rb'), content_type=static_file.content_type
+            )
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['Last-Modified'] = static_file.last_modified
+        response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = (
+            IMMUTABLE_CACHE_CONTROL if static_file.immutable
+            else MUTABLE_CACHE_CONTROL
+        )
+        return response
@@ -0,0 +1,67 @@
+import gzip
+from pathlib import Path
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.map', '.svg', '.ico', '.txt', '.xml', '.json', '.html'
+)
+MIN_COMPRESS_SIZE = 256
+# Сжатую копию храним, только если она заметно меньше исходного файла.
+MAX_COMPRESSED_RATIO = 0.95
+
+
+def compressed_variants(data):
+    """Возвращает пары (расширение, сжатые данные) для доступных кодеков."""
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(
+            ('.br', brotli.compress(data, mode=brotli.MODE_TEXT))
+        )
+    return variants
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Хранилище статики с хешами в именах и заранее сжатыми копиями.
+
+    При collectstatic рядом с каждым текстовым файлом кладутся варианты
+    .gz и .br (последний — если установлен пакет brotli), чтобы
+    ни один запрос не сжимал файлы на лету.
+    """
+
+    manifest_strict = False
+
+    def stored_name(self, name):
+        """Пока манифест не собран, отдаёт исходные имена файлов."""
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        """Хеширует файлы, а затем сохраняет их сжатые варианты."""
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            self.compress(name)
+
+    def compress(self, name):
+        """Сохраняет рядом с файлом его сжатые копии."""
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return
+        path = Path(self.path(name))
+        if not path.is_file():
+            return
+        data = path.read_bytes()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        for suffix, compressed in compressed_variants(data):
+            if len(compressed) <= len(data) * MAX_COMPRESSED_RATIO:
+                path.with_name(path.name + suffix).write_bytes(compressed)
@@ -0,0 +1,15 @@
+from django import template
+
+register = template.Library()
+
+# Сколько соседних страниц показывать в сокращённом пагинаторе.
+NEARBY_PAGES = 2
+
+
+@register.filter
+def nearby_pages(page_obj):
+    """Номера страниц рядом с текущей вместо полного page_range."""
+    return range(
+        max(1, page_obj.number - NEARBY_PAGES),
+        min(page_obj.paginator.num_pages, page_obj.number + NEARBY_PAGES) + 1
+    )
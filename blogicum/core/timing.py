@@ -0,0 +1,244 @@
+"""
+Заголовок Server-Timing с разбивкой времени ответа и время шаблонов.
+
+Пока идёт запрос, RequestTimings копит время обращений к кешу и отрисовки
+шаблонов (всех, включая include): по именам шаблонов и по местам
+{% include %} (шаблон:строка) — полное время и собственное, без вложенных
+шаблонов. Родитель {% extends %} отрисовывается внутри дочернего шаблона и
+входит в его собственное время. Вместе с журналом SQL из core.sql это даёт
+разбивку: БД, кеш, шаблоны, карточки постов и логика представления —
+остаток общего времени. Части могут пересекаться: запросы к БД из шаблона
+входят и в БД, и в шаблоны. При TEMPLATE_METRICS_ENABLED время шаблонов
+каждого запроса попадает в core.metrics; отчёт по ним печатает команда
+template_report.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .metrics import collect, registry
+from .middleware import WrappingMiddleware
+
+current_timings = ContextVar('request_timings', default=None)
+
+POST_CARD_TEMPLATE = 'includes/post_card.html'
+
+
+class RequestTimings:
+    """Время кеша и шаблонов за один запрос пользователя."""
+
+    def __init__(self):
+        self.cache = 0.0
+        self.cache_calls = 0
+        # Время шаблонов верхнего уровня: вложенные входят в него.
+        self.template = 0.0
+        # Имя шаблона или (место include, имя) -> [полное время,
+        # собственное время, число отрисовок].
+        self.templates = {}
+        self.includes = {}
+        # Время вложенных шаблонов для каждого отрисовываемого сейчас.
+        self.stack = []
+        self.include_site = None
+
+    def add_template(self, name, duration, own, site=None):
+        keys = [(self.templates, name)]
+        if site is not None:
+            keys.append((self.includes, (site, name)))
+        for stats, key in keys:
+            entry = stats.setdefault(key, [0.0, 0.0, 0])
+            entry[0] += duration
+            entry[1] += own
+            entry[2] += 1
+        if self.stack:
+            self.stack[-1] += duration
+        else:
+            self.template += duration
+
+
+def record_cache(duration):
+    timings = current_timings.get()
+    if timings is not None:
+        timings.cache += duration
+        timings.cache_calls += 1
+
+
+def instrument_templates():
+    """
+    Замеряет отрисовку каждого шаблона, пока собираются замеры.
+
+    Место {% include %} запоминается в include_site и достаётся первому
+    шаблону, отрисованному внутри тега.
+    """
+    from django.template.base import Template
+    from django.template.loader_tags import IncludeNode
+
+    if getattr(Template.render, 'instrumented', False):
+        return
+    render = Template.render
+    render_include = IncludeNode.render
+
+    @wraps(render)
+    def timed_render(self, context):
+        timings = current_timings.get()
+        if timings is None:
+            return render(self, context)
+        site, timings.include_site = timings.include_site, None
+        timings.stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            duration = time.perf_counter() - started
+            children = timings.stack.pop()
+            timings.add_template(
+                self.origin.template_name or self.origin.name,
+                duration, duration - children, site
+            )
+
+    @wraps(render_include)
+    def tracked_include(self, context):
+        timings = current_timings.get()
+        if timings is None:
+            return render_include(self, context)
+        previous = timings.include_site
+        timings.include_site = (
+            f'{self.origin.template_name or self.origin.name}:'
+            f'{self.token.lineno}'
+        )
+        try:
+            return render_include(self, context)
+        finally:
+            timings.include_site = previous
+
+    timed_render.instrumented = True
+    Template.render = timed_render
+    IncludeNode.render = tracked_include
+
+
+def template_metrics_enabled():
+    return settings.METRICS_ENABLED and settings.TEMPLATE_METRICS_ENABLED
+
+
+def record_metrics(timings):
+    """Добавляет время шаблонов запроса в метрики процесса."""
+    for name, (duration, own, count) in timings.templates.items():
+        labels = (('template', name),)
+        registry.observe('blogicum_template_render_seconds', labels, duration)
+        registry.inc('blogicum_template_self_seconds_total', labels, own)
+        registry.inc('blogicum_template_renders_total', labels, count)
+    for (site, name), (duration, own, count) in timings.includes.items():
+        labels = (('site', site), ('template', name))
+        registry.inc('blogicum_include_seconds_total', labels, duration)
+        registry.inc('blogicum_include_self_seconds_total', labels, own)
+        registry.inc('blogicum_include_renders_total', labels, count)
+
+
+def template_stats():
+    """
+    Накопленное во всех процессах время шаблонов из core.metrics.
+
+    :return: Два списка строк (имя, полное время, собственное время,
+        отрисовки) — по шаблонам и по местам {% include %}.
+    """
+    counters, histograms = collect()
+    templates, includes = {}, {}
+    for (name, labels), (_, total, _) in histograms.items():
+        if name == 'blogicum_template_render_seconds':
+            templates.setdefault(labels, [0.0, 0.0, 0])[0] = total
+    columns = {
+        'blogicum_template_self_seconds_total': (templates, 1),
+        'blogicum_template_renders_total': (templates, 2),
+        'blogicum_include_seconds_total': (includes, 0),
+        'blogicum_include_self_seconds_total': (includes, 1),
+        'blogicum_include_renders_total': (includes, 2),
+    }
+    for (name, labels), value in counters.items():
+        if name in columns:
+            stats, column = columns[name]
+            stats.setdefault(labels, [0.0, 0.0, 0])[column] = value
+    return [
+        [
+            (' → '.join(value for _, value in labels), *values)
+            for labels, values in stats.items()
+        ]
+        for stats in (templates, includes)
+    ]
+
+
+def server_timing(total, timings, query_log=None):
+    """Значение заголовка Server-Timing; время в миллисекундах."""
+    entries = []
+    db = 0.0
+    if query_log is not None:
+        db = query_log.duration
+        entries.append(
+            f'db;dur={db * 1000:.1f};desc="{query_log.count} queries"'
+        )
+    entries.append(
+        f'cache;dur={timings.cache * 1000:.1f};'
+        f'desc="{timings.cache_calls} calls"'
+    )
+    entries.append(f'tpl;dur={timings.template * 1000:.1f}')
+    cards, _, count = timings.templates.get(
+        POST_CARD_TEMPLATE, (0.0, 0.0, 0)
+    )
+    if count:
+        entries.append(
+            f'post_card;dur={cards * 1000:.1f};desc="{count} cards"'
+        )
+    view = max(total - db - timings.cache - timings.template, 0.0)
+    entries.append(f'view;dur={view * 1000:.1f}')
+    entries.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(entries)
+
+
+class ServerTimingMiddleware(WrappingMiddleware):
+    """
+    Собирает время кеша и шаблонов запроса.
+
+    При SERVER_TIMING_ENABLED добавляет заголовок Server-Timing
+    (сотрудникам или всем — по SERVER_TIMING_STAFF_ONLY); время шаблонов
+    при TEMPLATE_METRICS_ENABLED попадает в метрики. Замер шаблонов
+    ставится, только когда middleware используется.
+    """
+
+    def __init__(self, get_response):
+        if not (
+            settings.SERVER_TIMING_ENABLED or template_metrics_enabled()
+        ):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        instrument_templates()
+        # Проверка is_staff загружает сессию и пользователя из БД.
+        self.finish_uses_db = (
+            settings.SERVER_TIMING_ENABLED
+            and settings.SERVER_TIMING_STAFF_ONLY
+        )
+
+    @contextmanager
+    def measure(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            yield timings, started
+        finally:
+            current_timings.reset(token)
+
+    def finish(self, request, response, state):
+        timings, started = state
+        if template_metrics_enabled():
+            record_metrics(timings)
+        if settings.SERVER_TIMING_ENABLED and (
+            not settings.SERVER_TIMING_STAFF_ONLY or request.user.is_staff
+        ):
+            response['Server-Timing'] = server_timing(
+                time.perf_counter() - started,
+                timings,
+                getattr(request, 'query_log', None)
+            )
+        return response
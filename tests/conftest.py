@@ -92,6 +92,7 @@ pytest_plugins = [
     "fixtures.locations",
     "fixtures.categories",
     "fixtures.comments",
+    "fixtures.budgets",
     "adapters.comment",
 ]
 
@@ -0,0 +1,43 @@
+import time
+from contextlib import contextmanager
+
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--budget-time-factor",
+        type=float,
+        default=0.0,
+        help="Множитель бюджетов времени ответа из VIEW_BUDGETS. По "
+             "умолчанию 0: время на общих CI-машинах нестабильно, и "
+             "жёстко проверяется только число запросов к БД.",
+    )
+
+
+@pytest.fixture
+def view_budget(request):
+    """
+    Проверяет, что запросы блока укладываются в бюджет представления.
+
+        with view_budget("blog:profile"):
+            client.get(url)
+    """
+    from core.budgets import check_budget
+    from core.sql import capture_queries
+
+    time_factor = request.config.getoption("--budget-time-factor")
+
+    @contextmanager
+    def check(view_name):
+        with capture_queries() as log:
+            started = time.perf_counter()
+            yield log
+            duration = time.perf_counter() - started
+        problems = check_budget(
+            view_name, log, duration if time_factor else 0, time_factor
+        )
+        if problems:
+            pytest.fail(problems, pytrace=False)
+
+    return check
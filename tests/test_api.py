@@ -0,0 +1,79 @@
+import base64
+from http import HTTPStatus
+
+import pytest
+
+from conftest import N_PER_PAGE
+
+
+@pytest.mark.django_db
+def test_api_feed_cursor_pagination(
+        client, many_posts_with_published_locations,
+        posts_with_unpublished_category):
+    seen, cursor = [], None
+    while True:
+        url = f"/api/posts/?limit={N_PER_PAGE // 2}&fields=id,title"
+        if cursor:
+            url += f"&cursor={cursor}"
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert all(set(item) == {"id", "title"} for item in data["results"])
+        seen.extend(item["id"] for item in data["results"])
+        cursor = data["next"]
+        if not cursor:
+            break
+    expected = sorted(
+        many_posts_with_published_locations,
+        key=lambda post: (post.pub_date, post.id), reverse=True,
+    )
+    assert seen == [post.id for post in expected], (
+        "Убедитесь, что API отдаёт ленту по курсору без пропусков и"
+        " повторов и скрывает посты неопубликованных категорий."
+    )
+
+
+@pytest.mark.django_db
+def test_api_post_detail_visibility_and_etag(
+        client, user_client, unpublished_posts_with_published_locations,
+        post_with_published_location):
+    hidden = unpublished_posts_with_published_locations[0]
+    url = f"/api/posts/{hidden.id}/"
+    assert client.get(url).status_code == HTTPStatus.NOT_FOUND
+    assert user_client.get(url).status_code == HTTPStatus.OK
+
+    url = f"/api/posts/{post_with_published_location.id}/"
+    response = client.get(url)
+    assert response.json()["comment_count"] == 0
+    assert response.json()["image"].startswith("/media/")
+    cached = client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert cached.status_code == HTTPStatus.NOT_MODIFIED
+
+
+@pytest.mark.django_db
+def test_api_rejects_unknown_fields(client):
+    response = client.get("/api/posts/?fields=id,password")
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "url, raw",
+    [
+        ("/api/posts/", '["garbage", 1]'),
+        ("/api/posts/", '[1, 1]'),
+        ("/api/posts/", '{"a": 1}'),
+        ("/api/posts/", '["2020-01-01T00:00:00+00:00"]'),
+        ("/api/posts/{post.id}/comments/", '{"a": 1}'),
+        ("/api/posts/{post.id}/comments/", '["x"]'),
+        ("/api/posts/{post.id}/comments/", '[1, 2]'),
+        ("/api/posts/{post.id}/comments/", '"1"'),
+    ],
+)
+def test_api_rejects_malformed_cursor(
+        client, post_with_published_location, url, raw):
+    cursor = base64.urlsafe_b64encode(raw.encode()).decode()
+    url = url.format(post=post_with_published_location)
+    response = client.get(f"{url}?cursor={cursor}")
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {"error": "Некорректный курсор"}
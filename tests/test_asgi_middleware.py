@@ -0,0 +1,67 @@
+import asyncio
+import pstats
+import time
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse
+from django.test import AsyncClient
+from django.urls import path
+
+SLEEP = 0.3
+CONCURRENCY = 4
+
+
+async def slow_view(request):
+    await asyncio.sleep(SLEEP)
+    return HttpResponse("ok")
+
+
+urlpatterns = [path("slow/", slow_view)]
+
+
+@pytest.mark.urls(__name__)
+@pytest.mark.parametrize("staff_only", [False, True])
+def test_middleware_keeps_async_requests_concurrent(settings, staff_only):
+    settings.SERVER_TIMING_ENABLED = True
+    settings.SERVER_TIMING_STAFF_ONLY = staff_only
+
+    async def run():
+        client = AsyncClient()
+        started = time.perf_counter()
+        responses = await asyncio.gather(
+            *(client.get("/slow/") for _ in range(CONCURRENCY))
+        )
+        return time.perf_counter() - started, responses
+
+    elapsed, responses = async_to_sync(run)()
+    assert all(response.status_code == 200 for response in responses)
+    assert all(
+        ("Server-Timing" in response) is not staff_only
+        for response in responses
+    )
+    assert elapsed < SLEEP * 2, (
+        "Middleware проекта не должны выполнять асинхронные запросы "
+        "по очереди в одном потоке."
+    )
+
+
+@pytest.mark.urls(__name__)
+def test_profiling_sees_async_view(settings, tmp_path):
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_DIR = tmp_path
+    settings.PROFILING_SAMPLE_RATE = 1.0
+
+    async def run():
+        return await AsyncClient().get("/slow/")
+
+    response = async_to_sync(run)()
+    assert response.status_code == 200
+    reports = list(tmp_path.glob("*/*.prof"))
+    assert len(reports) == 1
+    functions = {
+        name for _, _, name in pstats.Stats(str(reports[0])).stats
+    }
+    assert "slow_view" in functions, (
+        "Под ASGI профиль должен содержать само асинхронное представление."
+    )
@@ -0,0 +1,31 @@
+from http import HTTPStatus
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory
+
+from blog import async_views
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_read_views(
+        user, post_with_published_location, published_category):
+    post = post_with_published_location
+    cases = (
+        (async_views.post_list, "/", {}),
+        (async_views.post_detail, f"/posts/{post.id}/", {"post_id": post.id}),
+        (async_views.profile, f"/profile/{user.username}/",
+         {"username": user.username}),
+        (async_views.category_posts,
+         f"/category/{published_category.slug}/",
+         {"category_slug": published_category.slug}),
+    )
+    for view, url, kwargs in cases:
+        request = RequestFactory().get(url)
+        request.user = user
+        response = async_to_sync(view)(request, **kwargs)
+        assert response.status_code == HTTPStatus.OK, (
+            f"Убедитесь, что асинхронный вариант страницы {url}"
+            " отображается без ошибок."
+        )
+        assert post.title in response.content.decode("utf-8")
@@ -0,0 +1,114 @@
+import time
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+
+from core.brownout import (
+    ACTIVE_FLAG, BrownoutController, clear_flags, controller
+)
+from core.loadshed import tracker
+
+
+@pytest.fixture
+def brownout_mode(settings, tmp_path):
+    settings.BROWNOUT_DIR = tmp_path
+
+    def switch(mode):
+        settings.BROWNOUT_MODE = mode
+        controller.reset()
+
+    yield switch
+    tracker.latency.clear()
+    clear_flags(ACTIVE_FLAG)
+    controller.reset()
+
+
+@pytest.mark.django_db
+def test_brownout_hides_expensive_parts(
+        brownout_mode, settings, user_client, mixer, user,
+        post_with_published_location):
+    post = post_with_published_location
+    settings.BROWNOUT_COMMENTS_LIMIT = 2
+    mixer.cycle(3).blend("blog.Comment", post=post, author=user)
+
+    brownout_mode("off")
+    assert "Комментарии (3)" in user_client.get("/").content.decode()
+    response = user_client.get(f"/posts/{post.id}/")
+    assert len(list(response.context["comments"])) == 3
+
+    brownout_mode("on")
+    assert "Комментарии (" not in user_client.get("/").content.decode(), (
+        "Убедитесь, что в режиме brownout счётчики комментариев в ленте"
+        " не вычисляются."
+    )
+    response = user_client.get(f"/posts/{post.id}/")
+    assert len(response.context["comments"]) == 2, (
+        "Убедитесь, что в режиме brownout на странице поста выводятся"
+        " только последние комментарии."
+    )
+
+
+def test_auto_brownout_follows_latency(brownout_mode, settings):
+    brownout_mode("auto")
+    settings.BROWNOUT_LATENCY_SLO = 1.0
+    tracker.observe("blog:index", 5.0)
+    assert controller.evaluate()
+    tracker.latency.clear()
+    tracker.observe("blog:index", 0.1)
+    clear_flags(ACTIVE_FLAG)
+    controller.active = controller.evaluate()
+    assert not controller.active
+
+
+def test_brownout_command_reaches_other_processes(brownout_mode):
+    brownout_mode("off")
+    call_command("brownout", "on")
+    # Кеш у каждого процесса свой: флаг не должен зависеть от него.
+    cache.clear()
+    assert BrownoutController().is_active(), (
+        "Убедитесь, что команда brownout переключает режим во всех"
+        " процессах, а не только в своём."
+    )
+    call_command("brownout", "auto")
+    assert not BrownoutController().is_active()
+
+
+def test_auto_brownout_ends_when_latency_decays(brownout_mode, settings):
+    brownout_mode("auto")
+    settings.BROWNOUT_LATENCY_SLO = 1.0
+    settings.LOADSHED_LATENCY_HALF_LIFE = 0.05
+    tracker.observe("blog:rarely_used", 5.0)
+    assert controller.evaluate()
+    clear_flags(ACTIVE_FLAG)
+    time.sleep(0.4)
+    controller.active = controller.evaluate()
+    assert not controller.active, (
+        "Один медленный запрос к редкой странице не должен держать "
+        "режим brownout бесконечно."
+    )
+
+
+@pytest.mark.django_db
+def test_brownout_paginator_shows_nearby_pages(
+        brownout_mode, client, mixer, published_category):
+    mixer.cycle(80).blend(
+        "blog.Post", category=published_category, is_published=True,
+        pub_date=timezone.now() - timedelta(days=1),
+    )
+    brownout_mode("on")
+    content = client.get("/?page=4").content.decode()
+    assert all(f'href="?page={page}"' in content for page in (2, 3, 5, 6))
+    assert 'href="?page=7"' not in content
+    assert 'href="?page=8"' in content
+
+
+@pytest.mark.django_db
+def test_latency_tracked_for_auto_brownout_without_shedding(
+        brownout_mode, settings, client):
+    settings.LOADSHED_ENABLED = False
+    brownout_mode("auto")
+    client.get("/")
+    assert tracker.latency_of("blog:index") > 0
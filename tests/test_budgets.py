@@ -0,0 +1,86 @@
+import pytest
+from django.urls import reverse
+
+from blog.following import follow
+from conftest import N_PER_PAGE
+from core.budgets import check_budget
+from core.sql import QueryLog
+
+COMMENTS_PER_POST = 3
+
+BUDGET_REQUESTS = {
+    "blog:index": ("get", lambda post: reverse("blog:index")),
+    "blog:post_detail": (
+        "get", lambda post: reverse("blog:post_detail", args=[post.id])
+    ),
+    "blog:category_posts": (
+        "get",
+        lambda post: reverse("blog:category_posts", args=[post.category.slug]),
+    ),
+    "blog:profile": (
+        "get",
+        lambda post: reverse("blog:profile", args=[post.author.username]),
+    ),
+    "blog:follow_feed": ("get", lambda post: reverse("blog:follow_feed")),
+    "blog:add_comment": (
+        "post", lambda post: reverse("blog:add_comment", args=[post.id])
+    ),
+    "blog:api_posts": ("get", lambda post: reverse("blog:api_posts")),
+    "blog:api_post_detail": (
+        "get", lambda post: reverse("blog:api_post_detail", args=[post.id])
+    ),
+    "blog:feed_rss": ("get", lambda post: reverse("blog:feed_rss")),
+}
+
+
+@pytest.fixture
+def budget_post(mixer, user, another_user):
+    """Полная страница постов одного автора с комментариями."""
+    category = mixer.blend("blog.Category", is_published=True)
+    location = mixer.blend("blog.Location", is_published=True)
+    posts = mixer.cycle(N_PER_PAGE + 1).blend(
+        "blog.Post", author=another_user, category=category,
+        location=location, is_published=True,
+    )
+    for post in posts:
+        mixer.cycle(COMMENTS_PER_POST).blend(
+            "blog.Comment", post=post, author=mixer.SELECT
+        )
+    follow(user, another_user)
+    return posts[-1]
+
+
+def test_every_budget_is_checked(settings):
+    assert set(settings.VIEW_BUDGETS) == set(BUDGET_REQUESTS)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("view_name", sorted(BUDGET_REQUESTS))
+def test_view_fits_budget(view_name, budget_post, user_client, view_budget):
+    method, url = BUDGET_REQUESTS[view_name]
+    data = {"text": "Комментарий"} if method == "post" else None
+    # Первый запрос заполняет кэши, проверяется второй.
+    getattr(user_client, method)(url(budget_post), data)
+    with view_budget(view_name):
+        response = getattr(user_client, method)(url(budget_post), data)
+    assert response.status_code < 400
+
+
+@pytest.mark.django_db
+def test_budget_failure_lists_queries(settings, user_client, view_budget):
+    settings.VIEW_BUDGETS = {
+        **settings.VIEW_BUDGETS,
+        "blog:index": {"queries": 0, "time_ms": 10_000},
+    }
+    with pytest.raises(pytest.fail.Exception) as error:
+        with view_budget("blog:index"):
+            user_client.get(reverse("blog:index"))
+    message = str(error.value)
+    assert "запросов к БД при бюджете 0" in message
+    assert "  1. " in message and "SELECT" in message
+
+
+def test_time_budget_checked_only_with_factor():
+    log = QueryLog()
+    assert check_budget("blog:index", log, 0) == ""
+    assert "мс при бюджете" in check_budget("blog:index", log, 10, 1.0)
@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+
+from blog.models import CommentNotification
+from blog.notifications import send_comment_digests
+
+
+class RejectingBackend(EmailBackend):
+    """Не принимает письма для адресов в домене rejected.example.com."""
+
+    def send_messages(self, messages):
+        if any(
+            address.endswith("@rejected.example.com")
+            for message in messages for address in message.to
+        ):
+            raise ConnectionError("recipient refused")
+        return super().send_messages(messages)
+
+
+@pytest.mark.django_db
+def test_comment_digest(
+        user, user_client, another_user_client, post_with_published_location):
+    post = post_with_published_location
+    user.email = "author@example.com"
+    user.save()
+    url = f"/posts/{post.id}/comment/"
+    another_user_client.post(url, data={"text": "Первый"})
+    another_user_client.post(url, data={"text": "Второй"})
+    user_client.post(url, data={"text": "Свой комментарий"})
+    assert CommentNotification.objects.count() == 2, (
+        "Убедитесь, что комментарий к чужому посту записывает уведомление"
+        " для автора поста, а к своему — нет."
+    )
+    assert not mail.outbox
+
+    call_command("send_comment_digests")
+    assert len(mail.outbox) == 1, (
+        "Убедитесь, что уведомления объединяются в один дайджест на автора."
+    )
+    assert mail.outbox[0].to == [user.email]
+    assert "Первый" in mail.outbox[0].body
+    assert "Второй" in mail.outbox[0].body
+
+    another_user_client.post(url, data={"text": "Третий"})
+    assert send_comment_digests() == 0, (
+        "Убедитесь, что автор получает не больше одного дайджеста"
+        " за интервал."
+    )
+    assert send_comment_digests(timedelta(0)) == 1
+
+
+@pytest.mark.django_db
+def test_comment_digests_sent_in_batches_and_only_delivered_marked(
+        settings, mixer, user, another_user, post_with_published_location):
+    settings.EMAIL_BACKEND = "test_comment_digests.RejectingBackend"
+    settings.COMMENT_DIGEST_BATCH_SIZE = 1
+    author = mixer.blend("auth.User", email="author@example.com")
+    user.email = "author@rejected.example.com"
+    user.save()
+    other_post = mixer.blend(
+        "blog.Post", author=author,
+        category=post_with_published_location.category,
+    )
+    for post in (post_with_published_location, other_post):
+        comment = mixer.blend("blog.Comment", post=post, author=another_user)
+        CommentNotification.objects.create(
+            recipient=post.author, comment=comment
+        )
+
+    assert send_comment_digests() == 1
+    assert [message.to for message in mail.outbox] == [[author.email]]
+    assert CommentNotification.objects.filter(
+        recipient=user, sent_at__isnull=True
+    ).exists(), (
+        "Убедитесь, что уведомления недоставленного дайджеста не"
+        " помечаются отправленными."
+    )
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+
+from blog.models import Comment
+from blog.streams import CommentStreamRouter
+
+
+async def django_stub(scope, receive, send):
+    raise AssertionError("Запрос к потоку не должен доходить до Django.")
+
+
+def run_stream(router, post_id, clients, on_subscribed):
+    """Подключает клиентов к потоку и собирает отправленные им данные."""
+    async def scenario():
+        received = [[] for _ in range(clients)]
+        disconnect = asyncio.Event()
+
+        async def receive():
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        def sender(chunks):
+            async def send(message):
+                chunks.append(message)
+            return send
+
+        scope = {"type": "http", "method": "GET", "headers": [],
+                 "path": f"/posts/{post_id}/comments/stream/"}
+        tasks = [
+            asyncio.create_task(router(scope, receive, sender(chunks)))
+            for chunks in received
+        ]
+        while (
+            post_id not in router.brokers
+            or len(router.brokers[post_id].subscribers) < clients
+        ):
+            await asyncio.sleep(0.01)
+        await sync_to_async(on_subscribed, thread_sensitive=False)()
+        for _ in range(200):
+            if all(len(chunks) > 2 for chunks in received):
+                break
+            await asyncio.sleep(0.02)
+        disconnect.set()
+        await asyncio.wait_for(asyncio.gather(*tasks), 5)
+        # Опрашивающий брокер останавливается, когда слушателей не осталось.
+        await asyncio.sleep(0.2)
+        return received
+
+    return asyncio.run(scenario())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_new_comment_pushed_to_all_clients(
+        settings, user, post_with_published_location):
+    settings.COMMENT_STREAM_POLL_INTERVAL = 0.05
+    post = post_with_published_location
+    router = CommentStreamRouter(django_stub)
+
+    received = run_stream(
+        router, post.id, clients=3,
+        on_subscribed=lambda: Comment.objects.create(
+            post=post, author=user, text="Свежий комментарий"
+        ),
+    )
+    for chunks in received:
+        assert chunks[0]["status"] == 200
+        body = b"".join(chunk.get("body", b"") for chunk in chunks[1:])
+        assert b"event: comment" in body, (
+            "Убедитесь, что новый комментарий отправляется всем"
+            " подключённым к потоку клиентам."
+        )
+        assert "Свежий комментарий".encode() in body
+    assert not router.brokers
+
+
+def test_stream_stub_without_asgi(client, settings):
+    response = client.get("/posts/1/comments/stream/")
+    assert isinstance(response, HttpResponse)
+    assert response.status_code == 503
@@ -0,0 +1,94 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from blog.caching import get_content_version
+from core.sharedstate import write_state
+
+
+@pytest.mark.django_db
+def test_feeds_list_published_posts(
+        client, post_with_published_location, posts_with_unpublished_category,
+        published_category, user):
+    post = post_with_published_location
+    hidden = posts_with_unpublished_category[0]
+    for url in (
+        "/feeds/rss/",
+        "/feeds/atom/",
+        f"/feeds/category/{published_category.slug}/rss/",
+        f"/feeds/profile/{user.username}/atom/",
+    ):
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f"Убедитесь, что лента {url} отдаётся без ошибок."
+        )
+        content = response.content.decode("utf-8")
+        assert post.title in content
+        assert hidden.title not in content
+
+
+@pytest.mark.django_db
+def test_feed_conditional_get_and_invalidation(
+        client, post_with_published_location):
+    response = client.get("/feeds/rss/")
+    with CaptureQueriesContext(connection) as queries:
+        not_modified = client.get(
+            "/feeds/rss/", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        cached = client.get("/feeds/rss/")
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+    assert cached.content == response.content
+    assert not queries.captured_queries, (
+        "Убедитесь, что повторный опрос ленты не обращается к БД."
+    )
+
+    post_with_published_location.title = "Новый заголовок"
+    post_with_published_location.save()
+    response = client.get("/feeds/rss/", HTTP_IF_NONE_MATCH=response["ETag"])
+    assert response.status_code == HTTPStatus.OK
+    assert "Новый заголовок" in response.content.decode("utf-8")
+
+
+@pytest.mark.django_db
+def test_feed_version_is_shared_between_processes(
+        settings, tmp_path, client, post_with_published_location):
+    settings.CONTENT_VERSION_PATH = tmp_path / "content-version.json"
+    response = client.get("/feeds/rss/")
+    version, changed_at = get_content_version()
+    # Другой процесс изменил содержимое и записал новую версию.
+    write_state(settings.CONTENT_VERSION_PATH, {
+        "version": version + 1, "changed_at": changed_at + 1,
+        "next_scheduled": None,
+    })
+    response = client.get("/feeds/rss/", HTTP_IF_NONE_MATCH=response["ETag"])
+    assert response.status_code == HTTPStatus.OK, (
+        "Убедитесь, что версия содержимого общая для всех процессов."
+    )
+
+
+@pytest.mark.django_db
+def test_feed_of_missing_category_is_not_found(client):
+    response = client.get("/feeds/rss/")
+    response = client.get(
+        "/feeds/category/missing/rss/", HTTP_IF_NONE_MATCH=response["ETag"]
+    )
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_feed_cache_key_ignores_query_string(
+        client, monkeypatch, post_with_published_location):
+    keys = []
+    set_value = cache.set
+    monkeypatch.setattr(
+        cache, "set",
+        lambda key, *args, **kwargs: (
+            keys.append(key), set_value(key, *args, **kwargs)
+        ),
+    )
+    for number in range(3):
+        client.get(f"/feeds/rss/?x={number}")
+    assert len({key for key in keys if key.startswith("blog:feed:")}) == 1
@@ -0,0 +1,101 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+
+from blog.following import follow, get_feed_post_ids, trim_inboxes, unfollow
+from blog.models import FollowerCount, InboxEntry
+
+
+@pytest.mark.django_db
+def test_follow_feed_fans_out_new_posts(
+        mixer, user_client, another_user, published_category):
+    response = user_client.post(f"/profile/{another_user.username}/follow/")
+    assert response.status_code == HTTPStatus.FOUND
+
+    post = mixer.blend(
+        "blog.Post", author=another_user, category=published_category,
+        is_published=True, pub_date="2020-01-01T00:00:00Z"
+    )
+    assert InboxEntry.objects.filter(post=post).count() == 1
+    feed = user_client.get("/follow/")
+    assert [p.id for p in feed.context["page_obj"]] == [post.id]
+
+    user_client.post(f"/profile/{another_user.username}/unfollow/")
+    assert not user_client.get("/follow/").context["page_obj"].object_list
+
+
+@pytest.mark.django_db
+def test_follow_feed_fans_in_popular_authors(
+        settings, mixer, user_client, another_user, published_category):
+    settings.FEED_FANOUT_MAX_FOLLOWERS = 0
+    user_client.post(f"/profile/{another_user.username}/follow/")
+    post = mixer.blend(
+        "blog.Post", author=another_user, category=published_category,
+        is_published=True, pub_date="2020-01-01T00:00:00Z"
+    )
+    assert not InboxEntry.objects.exists()
+    feed = user_client.get("/follow/")
+    assert [p.id for p in feed.context["page_obj"]] == [post.id]
+
+
+@pytest.mark.django_db
+def test_trim_feed_inboxes(
+        settings, mixer, user, another_user, published_category):
+    follow(user, another_user)
+    mixer.cycle(5).blend(
+        "blog.Post", author=another_user, category=published_category,
+        is_published=True, pub_date=mixer.sequence(
+            lambda n: f"2020-01-0{n + 1}T00:00:00Z"
+        )
+    )
+    settings.FEED_INBOX_SIZE = 2
+    assert trim_inboxes() == 3
+    assert InboxEntry.objects.filter(user=user).count() == 2
+
+
+@pytest.mark.django_db
+def test_follower_count_is_maintained(user, another_user):
+    follow(user, another_user)
+    assert FollowerCount.objects.get(author=another_user).count == 1
+    unfollow(user, another_user)
+    assert FollowerCount.objects.get(author=another_user).count == 0
+
+    follow(user, another_user)
+    user.delete()
+    assert FollowerCount.objects.get(author=another_user).count == 0, (
+        "Убедитесь, что счётчик уменьшается и при каскадном удалении"
+        " подписок."
+    )
+
+    FollowerCount.objects.filter(author=another_user).update(count=7)
+    call_command("recount_followers")
+    assert FollowerCount.objects.get(author=another_user).count == 0
+
+
+@pytest.mark.django_db
+def test_feed_keeps_posts_when_author_crosses_threshold(
+        settings, mixer, user, another_user, published_category):
+    settings.FEED_FANOUT_MAX_FOLLOWERS = 1
+    third = mixer.blend("auth.User")
+    follow(user, another_user)
+    follow(third, another_user)
+    popular_post = mixer.blend(
+        "blog.Post", author=another_user, category=published_category,
+        is_published=True, pub_date="2020-01-01T00:00:00Z"
+    )
+    assert get_feed_post_ids(user) == [popular_post.id]
+
+    unfollow(third, another_user)
+    assert get_feed_post_ids(user) == [popular_post.id], (
+        "Убедитесь, что посты, подмешанные при чтении, не пропадают из"
+        " ленты, когда автор возвращается под порог."
+    )
+    fanned_out_post = mixer.blend(
+        "blog.Post", author=another_user, category=published_category,
+        is_published=True, pub_date="2020-01-02T00:00:00Z"
+    )
+
+    follow(third, another_user)
+    assert get_feed_post_ids(user) == [fanned_out_post.id, popular_post.id]
+    assert get_feed_post_ids(third) == [fanned_out_post.id, popular_post.id]
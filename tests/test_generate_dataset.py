@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+
+from blog.models import Category, Comment, Location, Post, TimelineEntry, User
+
+GENERATE_ARGS = (
+    "generate_dataset", "--posts=300", "--categories=5", "--locations=5",
+    "--seed=7", "--batch-size=100", "--now=2024-01-01T12:00",
+)
+
+
+def generated_rows():
+    return (
+        list(Post.objects.order_by("id").values_list(
+            "title", "pub_date", "created_at", "is_published", "hidden_by"
+        )),
+        list(User.objects.order_by("id").values_list(
+            "username", "password"
+        )),
+    )
+
+
+@pytest.mark.django_db
+def test_generate_dataset_fills_denormalized_fields():
+    call_command(*GENERATE_ARGS)
+    assert Post.objects.count() == 300
+    assert Comment.objects.exists()
+    assert Post.objects.filter(
+        pub_date__gt=timezone.make_aware(datetime(2024, 1, 1, 12))
+    ).exists()
+    assert Post.objects.filter(is_published=False).exists()
+    assert not Post.objects.filter(
+        is_published=True, category__is_published=True
+    ).exclude(hidden_by=0).exists()
+    assert TimelineEntry.objects.count() == (
+        Post.objects.filter(hidden_by=0).count()
+    )
+    entry = TimelineEntry.objects.order_by("-comment_count").first()
+    assert entry.comment_count == entry.post.comments.count()
+
+
+@pytest.mark.django_db
+def test_generate_dataset_is_deterministic_by_seed():
+    call_command(*GENERATE_ARGS)
+    first_posts, first_users = generated_rows()
+    for model in (User, Category, Location):
+        model.objects.all().delete()
+    call_command(*GENERATE_ARGS)
+    second_posts, second_users = generated_rows()
+    assert first_posts == second_posts, (
+        "Убедитесь, что посты и их даты определяются --seed и --now."
+    )
+    assert first_users == second_users, (
+        "Убедитесь, что хеши паролей не зависят от случайной соли."
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_generate_dataset_restores_sqlite_synchronous():
+    if connection.vendor != "sqlite":
+        pytest.skip("PRAGMA synchronous есть только у SQLite")
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA synchronous")
+        before = cursor.fetchone()[0]
+    call_command(*GENERATE_ARGS)
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA synchronous")
+        assert cursor.fetchone()[0] == before
@@ -0,0 +1,23 @@
+import pytest
+
+
+@pytest.mark.django_db
+def test_placeholder_built_on_upload(post_with_published_location):
+    post = post_with_published_location
+    assert post.image_placeholder.startswith("data:image/jpeg;base64,"), (
+        "Убедитесь, что при загрузке изображения поста строится его"
+        " размытое превью."
+    )
+    assert post.image_aspect_ratio == 1.0
+    assert len(post.image_placeholder) < 2048
+
+
+@pytest.mark.django_db
+def test_placeholder_rendered(user_client, post_with_published_location):
+    post = post_with_published_location
+    for url in ("/", f"/posts/{post.id}/"):
+        content = user_client.get(url).content.decode("utf-8")
+        assert post.image_placeholder in content, (
+            f"Убедитесь, что на странице {url} превью изображения выводится"
+            " фоном до загрузки оригинала."
+        )
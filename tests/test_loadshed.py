@@ -0,0 +1,47 @@
+import time
+from http import HTTPStatus
+
+import pytest
+
+from core.brownout import controller
+from core.loadshed import tracker
+
+
+@pytest.fixture
+def slow_index(settings):
+    settings.BROWNOUT_MODE = "off"
+    controller.reset()
+    tracker.observe("blog:index", 60.0)
+    yield
+    tracker.latency.clear()
+    controller.reset()
+
+
+@pytest.mark.django_db
+def test_deep_pages_shed_under_load(slow_index, client, user_client):
+    response = client.get("/?page=6")
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE, (
+        "Убедитесь, что при перегрузке глубокие страницы ленты для"
+        " анонимов получают быстрый отказ 503."
+    )
+    assert response["Retry-After"]
+    assert client.get("/").status_code == HTTPStatus.OK
+    assert user_client.get("/?page=6").status_code == HTTPStatus.NOT_FOUND
+    assert tracker.in_flight == 0
+
+
+@pytest.mark.django_db
+def test_no_shedding_without_load(client):
+    assert client.get("/?page=6").status_code == HTTPStatus.NOT_FOUND
+
+
+def test_shed_view_latency_decays(settings):
+    settings.LOADSHED_LATENCY_HALF_LIFE = 0.05
+    tracker.observe("blog:search", 10.0)
+    assert tracker.overloaded("blog:search")
+    time.sleep(0.4)
+    assert not tracker.overloaded("blog:search"), (
+        "Среднее время ответа представления, которому отказывают во всех "
+        "запросах, должно затухать, чтобы запросы снова проходили."
+    )
+    tracker.latency.clear()
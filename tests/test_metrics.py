@@ -0,0 +1,92 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture
+def metrics_dir(settings, tmp_path):
+    settings.METRICS_DIR = tmp_path
+    return tmp_path
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_aggregates_processes(
+        settings, metrics_dir, client, post_with_published_location):
+    settings.TEMPLATE_METRICS_ENABLED = True
+    # Файл живого процесса — иначе collect() его удалит.
+    (metrics_dir / f"{os.getppid()}.json").write_text(
+        '{"counters": [["blogicum_db_queries_total", '
+        '[["view", "blog:index"]], 1000]], "histograms": []}'
+    )
+    client.get("/")
+    cache.get("blog:feed:missing")
+    settings.METRICS_TOKEN = "secret"
+    content = client.get(
+        "/metrics", HTTP_AUTHORIZATION="Bearer secret"
+    ).content.decode()
+
+    assert 'blogicum_request_duration_seconds_count{view="blog:index"}' in (
+        content
+    )
+    queries = next(
+        line for line in content.splitlines()
+        if line.startswith('blogicum_db_queries_total{view="blog:index"}')
+    )
+    assert float(queries.split()[-1]) > 1000, (
+        "Счётчики других процессов должны складываться."
+    )
+    assert 'blogicum_cache_misses_total{namespace="blog:feed"}' in content
+    assert 'blogicum_template_render_seconds_bucket{template=' in content
+
+
+def test_metrics_require_token_or_staff(settings, client, admin_client):
+    settings.METRICS_TOKEN = "secret"
+    assert client.get("/metrics").status_code == 403, (
+        "Адрес 127.0.0.1 не должен открывать доступ к метрикам: за "
+        "обратным прокси он у всех клиентов."
+    )
+    assert client.get(
+        "/metrics", HTTP_AUTHORIZATION="Bearer wrong"
+    ).status_code == 403
+    assert client.get(
+        "/metrics", HTTP_AUTHORIZATION="Bearer secret"
+    ).status_code == 200
+    settings.METRICS_TOKEN = ""
+    assert client.get(
+        "/metrics", HTTP_AUTHORIZATION="Bearer "
+    ).status_code == 403
+    assert admin_client.get("/metrics").status_code == 200
+
+
+def test_files_of_dead_processes_are_removed(metrics_dir):
+    from core.metrics import collect
+
+    finished = subprocess.Popen([sys.executable, "-c", "pass"])
+    finished.wait()
+    dead = metrics_dir / f"{finished.pid}.json"
+    dead.write_text('{"counters": [], "histograms": []}')
+    collect()
+    assert not dead.exists(), (
+        "Файлы завершившихся процессов должны удаляться."
+    )
+    assert (metrics_dir / f"{os.getpid()}.json").exists()
+
+
+def test_hot_path_does_not_write_files(settings, metrics_dir, monkeypatch):
+    from core.metrics import registry
+
+    settings.METRICS_FLUSH_INTERVAL = 60
+    registry.flush()
+    writes = []
+    monkeypatch.setattr(registry, "flush", lambda: writes.append(1))
+    labels = (("view", "blog:index"),)
+    for _ in range(1000):
+        registry.observe("blogicum_request_duration_seconds", labels, 0.02)
+        registry.inc("blogicum_db_queries_total", labels, 5)
+        registry.maybe_flush()
+    assert not writes, (
+        "Запись файла метрик не должна происходить на каждом запросе."
+    )
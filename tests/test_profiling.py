@@ -0,0 +1,37 @@
+import pstats
+
+import pytest
+
+
+@pytest.fixture
+def profiling(settings, tmp_path):
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_DIR = tmp_path
+    return settings
+
+
+@pytest.mark.django_db
+def test_staff_flag_writes_cprofile_report(profiling, client, admin_user):
+    client.force_login(admin_user)
+    response = client.get("/?profile=1")
+    reports = list((profiling.PROFILING_DIR / "blog-index").glob("*.prof"))
+    assert len(reports) == 1
+    assert response["X-Profile-Report"] == reports[0].name
+    assert pstats.Stats(str(reports[0])).total_calls > 0
+
+
+@pytest.mark.django_db
+def test_flag_is_ignored_for_regular_users(profiling, user_client):
+    response = user_client.get("/?profile=1", HTTP_X_PROFILE="1")
+    assert "X-Profile-Report" not in response
+    assert not any(profiling.PROFILING_DIR.iterdir())
+
+
+@pytest.mark.django_db
+def test_sampled_requests_write_folded_stacks(profiling, client):
+    profiling.PROFILING_MODE = "sampling"
+    profiling.PROFILING_SAMPLE_RATE = 1.0
+    profiling.PROFILING_SAMPLE_INTERVAL = 0.0005
+    client.get("/")
+    reports = list((profiling.PROFILING_DIR / "blog-index").glob("*.folded"))
+    assert len(reports) == 1
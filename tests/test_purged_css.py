@@ -0,0 +1,18 @@
+import pytest
+from django.core.management import CommandError, call_command
+
+
+def test_templates_use_only_kept_classes():
+    try:
+        call_command("purge_css", check=True)
+    except CommandError as e:
+        raise AssertionError(str(e))
+
+
+def test_check_detects_purged_class(tmp_path, settings):
+    template_dir = tmp_path / "templates"
+    template_dir.mkdir()
+    (template_dir / "new.html").write_text('<div class="progress-bar-striped">')
+    settings.TEMPLATES = [{**settings.TEMPLATES[0], "DIRS": [template_dir]}]
+    with pytest.raises(CommandError, match="progress-bar-striped"):
+        call_command("purge_css", check=True)
@@ -0,0 +1,152 @@
+import socketserver
+import threading
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.backends.smtp import EmailBackend as SMTPBackend
+from django.core.management import call_command
+
+from core.mail import claim_batch
+from core.models import QueuedEmail
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError("relay is down")
+
+
+class FlakySMTPBackend(SMTPBackend):
+    """SMTP-бэкенд, у которого обрывается отправка первого письма."""
+
+    failed = False
+
+    def send_messages(self, email_messages):
+        if not FlakySMTPBackend.failed:
+            FlakySMTPBackend.failed = True
+            raise ConnectionError("connection reset")
+        return super().send_messages(email_messages)
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Минимальный SMTP-сервер: принимает письма и считает соединения."""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.connections = 0
+        self.messages = []
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 stand-in")
+        while True:
+            command = self.rfile.readline().decode("ascii").strip().upper()
+            if not command or command.startswith("QUIT"):
+                self.reply("221 bye")
+                return
+            if command.startswith("DATA"):
+                self.reply("354 go ahead")
+                lines = []
+                for line in iter(self.rfile.readline, b".\r\n"):
+                    lines.append(line)
+                self.server.messages.append(b"".join(lines))
+            self.reply("250 ok")
+
+
+@pytest.fixture
+def smtp_server(settings):
+    server = SMTPStandIn()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    settings.EMAIL_BACKEND = "core.mail.QueuedEmailBackend"
+    settings.QUEUED_EMAIL_DELIVERY_BACKEND = (
+        "django.core.mail.backends.smtp.EmailBackend"
+    )
+    settings.EMAIL_HOST, settings.EMAIL_PORT = server.server_address
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.django_db
+def test_queued_mail_sent_in_batch(smtp_server):
+    for number in range(3):
+        mail.send_mail(
+            f"Тема {number}", "Текст", "blog@example.com", ["u@example.com"]
+        )
+    assert QueuedEmail.objects.count() == 3, (
+        "Убедитесь, что письма ставятся в очередь, а не отправляются сразу."
+    )
+    assert smtp_server.connections == 0
+
+    call_command("send_queued_mail")
+
+    assert len(smtp_server.messages) == 3
+    assert b"Subject: =?utf-8?" in smtp_server.messages[0]
+    assert smtp_server.connections == 1, (
+        "Убедитесь, что пачка писем отправляется через одно соединение."
+    )
+    assert not QueuedEmail.objects.exists()
+
+
+@pytest.mark.django_db
+def test_failed_mail_retried_then_dead(settings):
+    settings.EMAIL_BACKEND = "core.mail.QueuedEmailBackend"
+    settings.QUEUED_EMAIL_DELIVERY_BACKEND = (
+        "test_queued_email.FailingBackend"
+    )
+    settings.QUEUED_EMAIL_MAX_ATTEMPTS = 2
+    settings.QUEUED_EMAIL_RETRY_DELAY = 0
+    mail.send_mail("Тема", "Текст", "blog@example.com", ["u@example.com"])
+
+    call_command("send_queued_mail")
+    queued = QueuedEmail.objects.get()
+    assert queued.attempts == 1 and not queued.is_dead
+    assert "relay is down" in queued.last_error
+
+    call_command("send_queued_mail")
+    queued.refresh_from_db()
+    assert queued.is_dead, (
+        "Убедитесь, что письмо, исчерпавшее попытки, помечается"
+        " как не доставленное."
+    )
+
+
+@pytest.mark.django_db
+def test_connection_reopened_once_after_failure(smtp_server, settings):
+    settings.QUEUED_EMAIL_DELIVERY_BACKEND = (
+        "test_queued_email.FlakySMTPBackend"
+    )
+    FlakySMTPBackend.failed = False
+    for number in range(4):
+        mail.send_mail(
+            f"Тема {number}", "Текст", "blog@example.com", ["u@example.com"]
+        )
+
+    call_command("send_queued_mail")
+
+    assert len(smtp_server.messages) == 3
+    assert smtp_server.connections == 2, (
+        "Убедитесь, что после ошибки соединение переоткрывается один раз,"
+        " а не на каждое следующее письмо."
+    )
+
+
+@pytest.mark.django_db
+def test_claimed_mail_is_not_sent_twice(settings):
+    settings.EMAIL_BACKEND = "core.mail.QueuedEmailBackend"
+    mail.send_mail("Тема", "Текст", "blog@example.com", ["u@example.com"])
+
+    assert len(claim_batch(10)) == 1
+    assert claim_batch(10) == [], (
+        "Убедитесь, что письма, забранные одним отправителем, не достаются"
+        " другому."
+    )
@@ -0,0 +1,92 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+
+from blog.models import Comment
+from core import ratelimit
+
+
+@pytest.fixture
+def clean_buckets():
+    cache.clear()
+    ratelimit._empty_until.clear()
+    yield
+    cache.clear()
+    ratelimit._empty_until.clear()
+
+
+@pytest.mark.django_db
+def test_comment_rate_limited(
+        settings, clean_buckets, user_client, post_with_published_location):
+    settings.RATELIMITS = {"comment": {"user": "2/m"}}
+    url = f"/posts/{post_with_published_location.id}/comment/"
+    for _ in range(2):
+        response = user_client.post(url, data={"text": "Комментарий"})
+        assert response.status_code == HTTPStatus.FOUND
+    response = user_client.post(url, data={"text": "Лишний"})
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+        "Убедитесь, что при превышении лимита возвращается ответ 429."
+    )
+    assert int(response["Retry-After"]) > 0
+    assert Comment.objects.count() == 2, (
+        "Убедитесь, что запрос сверх лимита не доходит до записи в БД."
+    )
+
+
+@pytest.mark.django_db
+def test_registration_rate_limited_by_ip(settings, clean_buckets, client):
+    settings.RATELIMITS = {"registration": {"ip": "1/h"}}
+    client.post("/auth/registration/", data={})
+    response = client.post("/auth/registration/", data={})
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert client.get("/auth/registration/").status_code == HTTPStatus.OK
+
+
+def limited_request(user, ip="10.0.0.1"):
+    from django.test import RequestFactory
+
+    request = RequestFactory().post("/", REMOTE_ADDR=ip)
+    request.user = user
+    return request
+
+
+@pytest.mark.django_db
+def test_concurrent_burst_does_not_exceed_limit(settings, clean_buckets, user):
+    from concurrent.futures import ThreadPoolExecutor
+
+    settings.RATELIMITS = {"comment": {"user": "5/m"}}
+    with ThreadPoolExecutor(8) as executor:
+        waits = list(executor.map(
+            lambda _: ratelimit.check_ratelimit(
+                "comment", limited_request(user)
+            ),
+            range(40),
+        ))
+    assert waits.count(0) == 5
+
+
+@pytest.mark.django_db
+def test_rejected_request_does_not_charge_other_buckets(
+        settings, clean_buckets, user):
+    settings.RATELIMITS = {"comment": {"user": "2/m", "ip": "1/m"}}
+    assert not ratelimit.check_ratelimit("comment", limited_request(user))
+    assert ratelimit.check_ratelimit("comment", limited_request(user))
+    # Второй запрос отклонён корзиной IP и не занял место в корзине
+    # пользователя: с другого адреса проходит ещё один.
+    assert not ratelimit.check_ratelimit(
+        "comment", limited_request(user, ip="10.0.0.2")
+    )
+
+
+def test_ratelimit_refuses_process_local_cache(settings):
+    settings.DEBUG = False
+    settings.RATELIMIT_ENABLED = True
+    with pytest.raises(ImproperlyConfigured):
+        ratelimit.check_shared_cache()
+    settings.RATELIMIT_ENABLED = False
+    ratelimit.check_shared_cache()
+    settings.RATELIMIT_ENABLED = True
+    settings.DEBUG = True
+    ratelimit.check_shared_cache()
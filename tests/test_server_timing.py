@@ -0,0 +1,74 @@
+from io import StringIO
+
+import pytest
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+
+from core import timing
+from core.timing import template_stats
+
+
+def parse_server_timing(header):
+    metrics = {}
+    for entry in header.split(", "):
+        name, *params = entry.split(";")
+        metrics[name] = dict(param.split("=", 1) for param in params)
+    return metrics
+
+
+@pytest.mark.django_db
+def test_server_timing_breakdown_for_staff(
+        settings, admin_client, many_posts_with_published_locations):
+    settings.SERVER_TIMING_ENABLED = True
+    response = admin_client.get("/")
+    metrics = parse_server_timing(response["Server-Timing"])
+    assert {"db", "cache", "tpl", "post_card", "view", "total"} <= set(
+        metrics
+    )
+    assert metrics["post_card"]["desc"] == '"10 cards"'
+    assert float(metrics["post_card"]["dur"]) <= float(metrics["tpl"]["dur"])
+    assert int(metrics["db"]["desc"].strip('"').split()[0]) > 0
+
+
+@pytest.mark.django_db
+def test_server_timing_is_off_for_visitors(settings, client, admin_client):
+    assert "Server-Timing" not in admin_client.get("/")
+    settings.SERVER_TIMING_ENABLED = True
+    assert "Server-Timing" not in client.get("/")
+    settings.SERVER_TIMING_STAFF_ONLY = False
+    assert "Server-Timing" in client.get("/")
+
+
+@pytest.mark.django_db
+def test_template_times_per_include_site(
+        settings, tmp_path, client, many_posts_with_published_locations):
+    settings.METRICS_DIR = tmp_path
+    settings.TEMPLATE_METRICS_ENABLED = True
+    client.get("/")
+    templates, includes = template_stats()
+    templates = {name: values for name, *values in templates}
+    includes = {name: values for name, *values in includes}
+    total, own, renders = templates["includes/post_card.html"]
+    assert renders >= 10
+    assert 0 < own <= total
+    page_total, page_own, _ = templates["blog/index.html"]
+    assert page_own < page_total
+    assert "blog/index.html:8 → includes/post_card.html" in includes
+
+    output = StringIO()
+    call_command("template_report", "--limit=5", stdout=output)
+    assert "blog/index.html:8 → includes/post_card.html" in output.getvalue()
+
+
+def test_templates_are_not_instrumented_when_disabled(settings, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        timing, "instrument_templates", lambda: calls.append(1)
+    )
+    settings.SERVER_TIMING_ENABLED = False
+    settings.TEMPLATE_METRICS_ENABLED = False
+    with pytest.raises(MiddlewareNotUsed):
+        timing.ServerTimingMiddleware(lambda request: None)
+    settings.TEMPLATE_METRICS_ENABLED = True
+    timing.ServerTimingMiddleware(lambda request: None)
+    assert calls == [1]
@@ -0,0 +1,90 @@
+import gzip
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.fixture
+def sitemap_root(settings, tmp_path):
+    settings.SITEMAP_ROOT = tmp_path
+    settings.SITEMAP_SHARD_SIZE = 2
+    return tmp_path
+
+
+@pytest.mark.django_db
+def test_sitemaps_are_served_from_prebuilt_files(
+        client, sitemap_root, post_with_published_location,
+        posts_with_unpublished_category):
+    post = post_with_published_location
+    hidden = posts_with_unpublished_category[0]
+    assert client.get("/sitemap.xml").status_code == HTTPStatus.NOT_FOUND
+    call_command("build_sitemaps", "--full")
+
+    with CaptureQueriesContext(connection) as queries:
+        index = client.get("/sitemap.xml")
+        index_content = index.content.decode()
+    assert index.status_code == HTTPStatus.OK
+    assert not queries.captured_queries, (
+        "Карта сайта должна отдаваться из файлов без запросов к БД."
+    )
+    shard_url = f"/sitemap-posts-{post.id // 2}.xml"
+    assert shard_url in index_content
+
+    response = client.get(shard_url, HTTP_ACCEPT_ENCODING="gzip")
+    assert response["Content-Encoding"] == "gzip"
+    content = gzip.decompress(b"".join(response.streaming_content)).decode()
+    assert f"/posts/{post.id}/" in content
+    assert f"/posts/{hidden.id}/" not in content
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("accept_encoding", ["", "gzip;q=0, deflate"])
+def test_plain_sitemap_has_correct_length(
+        client, sitemap_root, post_with_published_location, accept_encoding):
+    call_command("build_sitemaps", "--full")
+    response = client.get(
+        f"/sitemap-posts-{post_with_published_location.id // 2}.xml",
+        HTTP_ACCEPT_ENCODING=accept_encoding,
+    )
+    assert not response.has_header("Content-Encoding")
+    assert int(response["Content-Length"]) == len(response.content), (
+        "Content-Length должен соответствовать распакованному телу."
+    )
+    assert response.content.decode().rstrip().endswith("</urlset>")
+
+
+@pytest.mark.django_db
+def test_sitemaps_rebuild_only_dirty_shards(
+        sitemap_root, post_with_published_location):
+    from blog.models import SitemapShard
+
+    call_command("build_sitemaps", "--full")
+    assert not SitemapShard.objects.filter(is_dirty=True).exists()
+    post = post_with_published_location
+    post.is_published = False
+    post.save()
+    shard = SitemapShard.objects.get(section="posts", number=post.id // 2)
+    assert shard.is_dirty
+
+    call_command("build_sitemaps")
+    assert not SitemapShard.objects.filter(is_dirty=True).exists()
+    assert not (sitemap_root / f"sitemap-posts-{post.id // 2}.xml.gz").exists()
+
+
+@pytest.mark.django_db
+def test_login_does_not_dirty_profile_sitemap(sitemap_root, user, client):
+    from blog.models import SitemapShard
+
+    call_command("build_sitemaps", "--full")
+    client.force_login(user)
+    assert not SitemapShard.objects.filter(is_dirty=True).exists(), (
+        "Вход в систему не должен помечать карту профилей для пересборки."
+    )
+    user.username = "renamed"
+    user.save(update_fields=["username"])
+    assert SitemapShard.objects.filter(
+        section="profiles", is_dirty=True
+    ).exists()
@@ -0,0 +1,58 @@
+from http import HTTPStatus
+
+import pytest
+
+from blog.deletion import purge_batch, soft_delete_user
+from blog.models import Comment, Post, TimelineEntry
+
+
+@pytest.mark.django_db
+def test_deleted_post_is_hidden_then_purged(
+        mixer, user_client, post_with_published_location):
+    post = post_with_published_location
+    mixer.cycle(2).blend("blog.Comment", post=post)
+    response = user_client.post(f"/posts/{post.id}/delete/")
+    assert response.status_code == HTTPStatus.FOUND
+    assert Post.all_objects.filter(id=post.id).exists()
+    assert user_client.get(f"/posts/{post.id}/").status_code == (
+        HTTPStatus.NOT_FOUND
+    )
+    assert post.title not in user_client.get("/").content.decode("utf-8")
+
+    assert purge_batch() == 2
+    assert not Comment.all_objects.exists()
+    while purge_batch():
+        pass
+    assert not Post.all_objects.filter(id=post.id).exists()
+
+
+@pytest.mark.django_db
+def test_deleted_user_content_is_hidden_and_purged_in_batches(
+        mixer, client, user, another_user, published_category):
+    posts = mixer.cycle(3).blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date="2020-01-01T00:00:00Z"
+    )
+    other_post = mixer.blend(
+        "blog.Post", author=another_user, category=published_category,
+        is_published=True, pub_date="2020-01-01T00:00:00Z"
+    )
+    mixer.cycle(4).blend("blog.Comment", author=user, post=other_post)
+    assert TimelineEntry.objects.get(post=other_post).comment_count == 4
+
+    soft_delete_user(user)
+    assert not Post.objects.filter(author=user).exists()
+    assert not Comment.objects.filter(author=user).exists()
+    assert TimelineEntry.objects.get(post=other_post).comment_count == 0
+    assert client.get(f"/profile/{user.username}/").status_code == (
+        HTTPStatus.NOT_FOUND
+    )
+
+    batches = 0
+    while purge_batch(batch_size=2):
+        batches += 1
+    assert batches > 3
+    assert not Post.all_objects.filter(id__in=[p.id for p in posts]).exists()
+    assert not Comment.all_objects.exists()
+    assert not type(user).objects.filter(id=user.id).exists()
+    assert Post.objects.filter(id=other_post.id).exists()
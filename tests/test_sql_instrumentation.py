@@ -0,0 +1,53 @@
+import logging
+
+import pytest
+
+from blog.models import Category, Comment
+from core.sql import capture_queries, fingerprint, stats
+
+
+def test_fingerprint_ignores_literals_and_in_lists():
+    assert fingerprint(
+        "SELECT * FROM blog_post WHERE id IN (1, 2, 3) AND title = 'a''b'"
+    ) == fingerprint(
+        "SELECT *  FROM blog_post WHERE id IN (7) AND title = 'c'"
+    )
+
+
+@pytest.mark.django_db
+def test_repeated_queries_are_reported_as_n_plus_one(
+        settings, caplog, mixer):
+    settings.SQL_NPLUSONE_THRESHOLD = 3
+    mixer.cycle(3).blend("blog.Comment")
+    with capture_queries() as log:
+        for comment in Comment.objects.all():
+            comment.author.username
+    assert log.count == 4
+    assert len(log.repeated) == 1
+    assert "test_sql_instrumentation.py" in next(iter(log.repeated.values()))
+
+
+@pytest.mark.django_db
+def test_middleware_counts_queries_per_view(
+        client, caplog, admin_client, mixer):
+    mixer.cycle(6).blend("blog.Comment")
+    before = stats.snapshot().get("admin:blog_comment_changelist")
+    with caplog.at_level(logging.WARNING, logger="core.sql"):
+        response = admin_client.get("/admin/blog/comment/")
+    assert response.wsgi_request.query_log.count > 0
+    assert "N+1" not in caplog.text, (
+        "Список комментариев в админке не должен подгружать автора и пост "
+        "каждого комментария отдельным запросом."
+    )
+    after = stats.snapshot()["admin:blog_comment_changelist"]
+    assert after[0] == (before[0] if before else 0) + 1
+
+
+@pytest.mark.django_db
+def test_nested_capture_records_into_outer_log():
+    with capture_queries() as outer:
+        Category.objects.count()
+        with capture_queries() as inner:
+            Category.objects.exists()
+    assert inner.count == 1
+    assert outer.count == 2
@@ -0,0 +1,78 @@
+import pytest
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from core.static import IMMUTABLE_CACHE_CONTROL, StaticFilesMiddleware
+
+
+@pytest.fixture
+def collected_static(tmp_path):
+    with override_settings(STATIC_ROOT=tmp_path):
+        call_command("collectstatic", interactive=False, verbosity=0)
+        yield tmp_path
+
+
+def test_collectstatic_precompresses(collected_static):
+    hashed = staticfiles_storage.stored_name("css/bootstrap.min.css")
+    assert hashed != "css/bootstrap.min.css", (
+        "Убедитесь, что collectstatic добавляет хеш в имена файлов статики."
+    )
+    assert (collected_static / f"{hashed}.gz").is_file(), (
+        "Убедитесь, что collectstatic сохраняет gzip-вариант CSS."
+    )
+
+
+def test_middleware_serves_precompressed(collected_static, settings):
+    hashed = staticfiles_storage.stored_name("css/bootstrap.min.css")
+    middleware = StaticFilesMiddleware(lambda request: HttpResponse())
+    request = RequestFactory().get(
+        settings.STATIC_URL + hashed, HTTP_ACCEPT_ENCODING="gzip, deflate"
+    )
+    response = middleware(request)
+    assert response["Content-Encoding"] == "gzip"
+    assert response["Content-Type"] == "text/css"
+    assert response["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+    assert response["Vary"] == "Accept-Encoding"
+
+    request = RequestFactory().get(settings.STATIC_URL + "css/missing.css")
+    assert middleware(request).content == b"", (
+        "Убедитесь, что отсутствующие файлы передаются дальше по цепочке."
+    )
+    assert "css/missing.css" not in middleware.files, (
+        "Промахи не должны запоминаться: словарь рос бы без ограничений."
+    )
+
+
+def test_middleware_passes_traversal_down_the_chain(
+        collected_static, settings):
+    middleware = StaticFilesMiddleware(
+        lambda request: HttpResponse("next")
+    )
+    request = RequestFactory().get(settings.STATIC_URL + "../../etc/passwd")
+    assert middleware(request).content == b"next", (
+        "Убедитесь, что путь за пределами STATIC_ROOT передаётся дальше"
+        " по цепочке."
+    )
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip;q=0, deflate", None),
+        ("gzip; q=0.5, br;q=0", "gzip"),
+        ("*;q=0", None),
+        ("*", "gzip"),
+        ("identity", None),
+        ("GZIP", "gzip"),
+    ],
+)
+def test_middleware_honours_accept_encoding_quality(
+        collected_static, settings, accept_encoding, expected):
+    hashed = staticfiles_storage.stored_name("css/bootstrap.min.css")
+    middleware = StaticFilesMiddleware(lambda request: HttpResponse())
+    request = RequestFactory().get(
+        settings.STATIC_URL + hashed, HTTP_ACCEPT_ENCODING=accept_encoding
+    )
+    assert middleware(request).get("Content-Encoding") == expected
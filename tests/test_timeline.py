@@ -0,0 +1,96 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.models import (
+    HIDDEN_CATEGORY, HIDDEN_UNPUBLISHED, Category, Post, TimelineEntry
+)
+
+
+@pytest.mark.django_db
+def test_timeline_follows_post_and_category_changes(
+        mixer, client, post_with_published_location):
+    post = post_with_published_location
+    mixer.blend("blog.Comment", post=post)
+    entry = TimelineEntry.objects.get(post=post)
+    assert entry.title == post.title
+    assert entry.comment_count == 1
+
+    post.title = "Новый заголовок"
+    post.save()
+    assert TimelineEntry.objects.get(post=post).title == "Новый заголовок"
+
+    post.category.is_published = False
+    post.category.save()
+    assert not TimelineEntry.objects.filter(post=post).exists()
+    post.category.is_published = True
+    post.category.save()
+    assert TimelineEntry.objects.get(post=post).comment_count == 1
+
+    post.pub_date = timezone.now() + timedelta(days=1)
+    post.save()
+    assert post.title not in client.get("/").content.decode("utf-8")
+
+
+@pytest.mark.django_db
+def test_index_reads_only_timeline_table(
+        client, many_posts_with_published_locations):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get("/")
+    assert len(response.context["page_obj"]) == 10
+    feed_queries = [
+        query["sql"] for query in queries.captured_queries
+        if "blog_" in query["sql"]
+    ]
+    assert all("JOIN" not in sql for sql in feed_queries)
+    assert all("blog_timelineentry" in sql for sql in feed_queries)
+
+
+@pytest.mark.django_db
+def test_category_visibility_is_denormalized_on_posts(
+        posts_with_unpublished_category):
+    post = posts_with_unpublished_category[0]
+    assert Post.objects.get(id=post.id).hidden_by
+    post.category.is_published = True
+    post.category.save()
+    assert Post.objects.filter(category=post.category, hidden_by=0).exists()
+
+    with CaptureQueriesContext(connection) as queries:
+        list(Post.objects.filter(hidden_by=0, pub_date__lt=timezone.now()))
+    assert "JOIN" not in queries.captured_queries[0]["sql"]
+
+
+@pytest.mark.django_db
+def test_rebuild_timeline_backfills_hidden_by(mixer):
+    visible, unpublished, hidden_category = mixer.cycle(3).blend(
+        "blog.Post", is_published=True, category__is_published=True,
+        pub_date=timezone.now() - timedelta(days=1),
+    )
+    Post.objects.filter(id=unpublished.id).update(is_published=False)
+    Category.objects.filter(
+        id=hidden_category.category_id
+    ).update(is_published=False)
+    Post.all_objects.update(hidden_by=0)
+
+    call_command("rebuild_timeline", stdout=StringIO())
+    assert dict(Post.objects.values_list("id", "hidden_by")) == {
+        visible.id: 0,
+        unpublished.id: HIDDEN_UNPUBLISHED,
+        hidden_category.id: HIDDEN_CATEGORY,
+    }
+    assert list(
+        TimelineEntry.objects.values_list("post_id", flat=True)
+    ) == [visible.id]
+
+
+@pytest.mark.django_db
+def test_post_save_reads_category_state_fresh(mixer):
+    post = mixer.blend("blog.Post", category__is_published=True)
+    Category.objects.filter(id=post.category_id).update(is_published=False)
+    post.save()
+    assert post.hidden_by == HIDDEN_CATEGORY